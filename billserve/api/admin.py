@@ -15,3 +15,6 @@ admin.site.register(Party)
 admin.site.register(BillSummary)
 admin.site.register(Committee)
 admin.site.register(LegislativeSubject)
+admin.site.register(PolicyAreaPartySplit)
+admin.site.register(LegislatorCollaboration)
+admin.site.register(BillSignature)
@@ -0,0 +1,375 @@
+import os
+import shutil
+import datetime
+
+import numpy as np
+from scipy import sparse
+from django.conf import settings
+
+from billserve.api.enumerations import LegislativeSubjectActivityType
+
+
+class SponsorshipSnapshot:
+    """
+    A compact, array-backed copy of the bill, legislator, party, state, subject and policy area relations.
+
+    Bills and legislators are addressed by their position in the sorted bill_pks and legislator_pks arrays. Every other
+    array either holds one value per bill, one value per legislator, or one value per edge, which lets grouped counts
+    be answered with numpy.bincount instead of ORM aggregation. Missing foreign keys are stored as 0.
+    """
+    array_names = ('bill_pks', 'bill_congresses', 'bill_policy_areas',
+                   'legislator_pks', 'legislator_parties', 'legislator_states',
+                   'edge_bills', 'edge_legislators', 'edge_roles', 'edge_original',
+                   'subject_bills', 'subject_pks')
+    current_link_name = 'current'
+    snapshots_kept = 2
+
+    def __init__(self, **arrays):
+        """
+        Initializes a snapshot from its arrays.
+        :param arrays: One numpy array for each name in array_names
+        """
+        for name in self.array_names:
+            setattr(self, name, arrays[name])
+
+    @classmethod
+    def build(cls):
+        """
+        Reads every relation the snapshot covers from the database with flat values_list queries.
+        :return: A freshly built snapshot
+        """
+        from billserve.api.models import Bill, Senator, Representative, Cosponsorship
+
+        bills = list(Bill.objects.order_by('pk').values_list('pk', 'congress', 'policy_area'))
+        bill_pks = np.array([pk for pk, _, _ in bills], dtype=np.int64)
+        bill_congresses = np.array([congress or 0 for _, congress, _ in bills], dtype=np.int32)
+        bill_policy_areas = np.array([policy_area or 0 for _, _, policy_area in bills], dtype=np.int32)
+
+        legislators = sorted(
+            list(Senator.objects.values_list('pk', 'party', 'state')) +
+            list(Representative.objects.values_list('pk', 'party', 'state')))
+        legislator_pks = np.array([pk for pk, _, _ in legislators], dtype=np.int64)
+        legislator_parties = np.array([party or 0 for _, party, _ in legislators], dtype=np.int32)
+        legislator_states = np.array([state or 0 for _, _, state in legislators], dtype=np.int32)
+
+        sponsorships = Bill.sponsors.through.objects.values_list('bill', 'legislator')
+        sponsorships = np.array(list(sponsorships), dtype=np.int64).reshape(-1, 2)
+        cosponsorships = Cosponsorship.objects.values_list('bill', 'legislator', 'is_original_cosponsor')
+        cosponsorships = np.array(list(cosponsorships), dtype=np.int64).reshape(-1, 3)
+        memberships = Bill.legislative_subjects.through.objects.values_list('bill', 'legislativesubject')
+        memberships = np.array(list(memberships), dtype=np.int64).reshape(-1, 2)
+
+        edge_bill_pks = np.concatenate([sponsorships[:, 0], cosponsorships[:, 0]])
+        edge_legislator_pks = np.concatenate([sponsorships[:, 1], cosponsorships[:, 1]])
+        edge_roles = np.concatenate([
+            np.full(len(sponsorships), LegislativeSubjectActivityType.sponsorship.value, dtype=np.int8),
+            np.full(len(cosponsorships), LegislativeSubjectActivityType.cosponsorship.value, dtype=np.int8)])
+        edge_original = np.concatenate([np.zeros(len(sponsorships), dtype=np.bool_),
+                                        cosponsorships[:, 2].astype(np.bool_)])
+
+        # Plain legislators without a senator or representative row have no party or state, so their edges are dropped
+        # rather than counted against a placeholder.
+        known = np.isin(edge_legislator_pks, legislator_pks) & np.isin(edge_bill_pks, bill_pks)
+
+        return cls(bill_pks=bill_pks,
+                   bill_congresses=bill_congresses,
+                   bill_policy_areas=bill_policy_areas,
+                   legislator_pks=legislator_pks,
+                   legislator_parties=legislator_parties,
+                   legislator_states=legislator_states,
+                   edge_bills=np.searchsorted(bill_pks, edge_bill_pks[known]).astype(np.int32),
+                   edge_legislators=np.searchsorted(legislator_pks, edge_legislator_pks[known]).astype(np.int32),
+                   edge_roles=edge_roles[known],
+                   edge_original=edge_original[known],
+                   subject_bills=np.searchsorted(bill_pks, memberships[:, 0]).astype(np.int32),
+                   subject_pks=memberships[:, 1].astype(np.int32))
+
+    @staticmethod
+    def default_directory():
+        """
+        :return: The directory snapshots are persisted to, taken from the ANALYTICS_SNAPSHOT_DIR setting
+        """
+        return settings.ANALYTICS_SNAPSHOT_DIR
+
+    def save(self, directory=None):
+        """
+        Persists the snapshot as one .npy file per array and atomically points the 'current' link at it, so that
+        workers loading concurrently never see a half written snapshot. Older snapshots are pruned.
+        :param directory: The snapshot directory. Defaults to the ANALYTICS_SNAPSHOT_DIR setting
+        :return: The path of the directory the snapshot was written to
+        """
+        directory = directory or self.default_directory()
+        name = datetime.datetime.utcnow().strftime('%Y%m%d%H%M%S%f')
+        path = os.path.join(directory, name)
+        os.makedirs(path)
+
+        for array_name in self.array_names:
+            np.save(os.path.join(path, array_name + '.npy'), getattr(self, array_name))
+
+        link = os.path.join(directory, self.current_link_name)
+        temporary_link = '{link}.{pid}'.format(link=link, pid=os.getpid())
+        os.symlink(name, temporary_link)
+        os.replace(temporary_link, link)
+
+        snapshots = sorted(entry for entry in os.listdir(directory)
+                           if os.path.isdir(os.path.join(directory, entry)) and not os.path.islink(
+                               os.path.join(directory, entry)))
+        for stale in snapshots[:-self.snapshots_kept]:
+            shutil.rmtree(os.path.join(directory, stale), ignore_errors=True)
+
+        return path
+
+    @classmethod
+    def load(cls, directory=None):
+        """
+        Memory maps the current snapshot. Pages are shared between every worker process that loads the same snapshot.
+        :param directory: The snapshot directory. Defaults to the ANALYTICS_SNAPSHOT_DIR setting
+        :return: The loaded snapshot
+        """
+        directory = directory or cls.default_directory()
+        path = os.path.join(directory, os.readlink(os.path.join(directory, cls.current_link_name)))
+        return cls(**{name: np.load(os.path.join(path, name + '.npy'), mmap_mode='r') for name in cls.array_names})
+
+    def bill_index(self, bill_pk):
+        """
+        :param bill_pk: The primary key of a bill
+        :return: The position of the bill in the snapshot's per-bill arrays
+        """
+        index = int(np.searchsorted(self.bill_pks, bill_pk))
+        if index >= len(self.bill_pks) or self.bill_pks[index] != bill_pk:
+            raise KeyError('Bill {pk} is not in the snapshot'.format(pk=bill_pk))
+        return index
+
+    def edge_mask(self, role=None, bills=None):
+        """
+        Selects (co)sponsorship edges.
+        :param role: An optional LegislativeSubjectActivityType to restrict the edges to
+        :param bills: An optional boolean mask over bills to restrict the edges to
+        :return: A boolean mask over edges
+        """
+        mask = np.ones(len(self.edge_bills), dtype=np.bool_)
+        if role is not None:
+            mask &= self.edge_roles == role.value
+        if bills is not None:
+            mask &= bills[self.edge_bills]
+        return mask
+
+    def bills_with_subject(self, subject_pk):
+        """
+        :param subject_pk: The primary key of a legislative subject
+        :return: A boolean mask over bills that carry the legislative subject
+        """
+        mask = np.zeros(len(self.bill_pks), dtype=np.bool_)
+        mask[self.subject_bills[self.subject_pks == subject_pk]] = True
+        return mask
+
+    def party_counts_by_bill(self, role=None):
+        """
+        Counts the (co)sponsors of every bill by party.
+        :param role: An optional LegislativeSubjectActivityType to restrict the count to
+        :return: A (bill, party pk) matrix of counts
+        """
+        mask = self.edge_mask(role)
+        party_count = int(self.legislator_parties.max(initial=0)) + 1
+        parties = self.legislator_parties[self.edge_legislators[mask]]
+        flat = self.edge_bills[mask].astype(np.int64) * party_count + parties
+        return np.bincount(flat, minlength=len(self.bill_pks) * party_count).reshape(len(self.bill_pks), party_count)
+
+    def party_counts_by_subject(self):
+        """
+        Counts sponsors and cosponsors of the bills in every legislative subject by party, which is what legislative
+        subject support splits hold.
+        :return: A dictionary mapping legislative subject pks to arrays of counts indexed by party pk
+        """
+        bill_parties = self.party_counts_by_bill()
+        subjects, subject_index = np.unique(self.subject_pks, return_inverse=True)
+        counts = np.zeros((len(subjects), bill_parties.shape[1]), dtype=np.int64)
+        for party in range(bill_parties.shape[1]):
+            counts[:, party] = np.bincount(subject_index, weights=bill_parties[self.subject_bills, party],
+                                           minlength=len(subjects))
+        return {int(subject_pk): counts[i] for i, subject_pk in enumerate(subjects)}
+
+    def top_legislators(self, subject_pk, role, count=5):
+        """
+        Finds the legislators who (co)sponsored the most bills in a legislative subject.
+        :param subject_pk: The primary key of the legislative subject
+        :param role: The LegislativeSubjectActivityType to count
+        :param count: The number of legislators to return
+        :return: A list of (legislator pk, bill count) tuples, most active first
+        """
+        mask = self.edge_mask(role, self.bills_with_subject(subject_pk))
+        counts = np.bincount(self.edge_legislators[mask], minlength=len(self.legislator_pks))
+        top = np.argsort(-counts, kind='stable')[:count]
+        return [(int(self.legislator_pks[i]), int(counts[i])) for i in top if counts[i] > 0]
+
+    def activity_by_state(self, role=None):
+        """
+        Counts (co)sponsorships by the state of the legislator.
+        :param role: An optional LegislativeSubjectActivityType to restrict the count to
+        :return: A dictionary mapping state pks to (co)sponsorship counts
+        """
+        states = self.legislator_states[self.edge_legislators[self.edge_mask(role)]]
+        counts = np.bincount(states)
+        return {int(state_pk): int(counts[state_pk]) for state_pk in np.flatnonzero(counts) if state_pk}
+
+    def activity_by_policy_area(self, role=None):
+        """
+        Counts (co)sponsorships by the policy area of the bill.
+        :param role: An optional LegislativeSubjectActivityType to restrict the count to
+        :return: A dictionary mapping policy area pks to (co)sponsorship counts
+        """
+        policy_areas = self.bill_policy_areas[self.edge_bills[self.edge_mask(role)]]
+        counts = np.bincount(policy_areas)
+        return {int(policy_area_pk): int(counts[policy_area_pk]) for policy_area_pk in np.flatnonzero(counts)
+                if policy_area_pk}
+
+    def congresses(self):
+        """
+        :return: A sorted array of every congress with at least one bill in the snapshot
+        """
+        congresses = np.unique(self.bill_congresses)
+        return congresses[congresses > 0]
+
+    def incidence_matrix(self, congress=None):
+        """
+        Builds the legislator by bill incidence matrix. A cell is 1 when the legislator (co)sponsored the bill.
+        :param congress: An optional congress to restrict the bills to
+        :return: A sparse (legislator, bill) CSR matrix
+        """
+        mask = self.edge_mask()
+        if congress is not None:
+            mask &= self.bill_congresses[self.edge_bills] == congress
+        data = np.ones(int(mask.sum()), dtype=np.int32)
+        incidence = sparse.csr_matrix((data, (self.edge_legislators[mask], self.edge_bills[mask])),
+                                      shape=(len(self.legislator_pks), len(self.bill_pks)))
+        # A legislator listed as both sponsor and cosponsor of a bill still only shares that bill once.
+        incidence.data[:] = 1
+        return incidence
+
+    def co_occurrence_matrix(self, congress=None):
+        """
+        Counts how many bills each pair of legislators (co)sponsored together.
+        :param congress: An optional congress to restrict the bills to
+        :return: A sparse (legislator, legislator) CSR matrix of shared bill counts with an empty diagonal
+        """
+        incidence = self.incidence_matrix(congress)
+        co_occurrence = (incidence @ incidence.T).tocsr()
+        co_occurrence = (co_occurrence - sparse.diags(co_occurrence.diagonal())).tocsr()
+        co_occurrence.eliminate_zeros()
+        return co_occurrence
+
+    def top_collaborators(self, congress=None, count=10):
+        """
+        Finds every legislator's most frequent collaborators.
+        :param congress: An optional congress to restrict the bills to
+        :param count: The number of collaborators to keep per legislator
+        :return: A list of (legislator pk, collaborator pk, shared bill count) tuples
+        """
+        co_occurrence = self.co_occurrence_matrix(congress)
+        collaborations = []
+        for row in range(co_occurrence.shape[0]):
+            start, end = co_occurrence.indptr[row], co_occurrence.indptr[row + 1]
+            columns, counts = co_occurrence.indices[start:end], co_occurrence.data[start:end]
+            for i in np.lexsort((columns, -counts))[:count]:
+                collaborations.append((int(self.legislator_pks[row]), int(self.legislator_pks[columns[i]]),
+                                       int(counts[i])))
+        return collaborations
+
+    def sponsor_parties(self):
+        """
+        :return: The party pk of every bill's sponsor, or 0 for bills without a sponsor with a known party
+        """
+        mask = self.edge_mask(LegislativeSubjectActivityType.sponsorship)
+        parties = np.zeros(len(self.bill_pks), dtype=np.int32)
+        parties[self.edge_bills[mask]] = self.legislator_parties[self.edge_legislators[mask]]
+        return parties
+
+    def cross_party_cosponsorships(self):
+        """
+        Finds the cosponsorships of bills sponsored by another party.
+        :return: A tuple of a boolean mask over edges selecting cosponsorships where both parties are known, and a
+        boolean mask over edges that are True for the cross-party ones among them
+        """
+        sponsor_parties = self.sponsor_parties()[self.edge_bills]
+        cosponsor_parties = self.legislator_parties[self.edge_legislators]
+        scored = self.edge_mask(LegislativeSubjectActivityType.cosponsorship) & (sponsor_parties > 0) & (
+            cosponsor_parties > 0)
+        return scored, scored & (sponsor_parties != cosponsor_parties)
+
+    def bill_bipartisanship_scores(self, original_cosponsor_weight=2.0):
+        """
+        Scores every bill by the weighted share of its cosponsors that belong to a different party than its sponsor.
+        Original cosponsors signed on before introduction, so they count original_cosponsor_weight times as much.
+        :param original_cosponsor_weight: The weight of an original cosponsor relative to a later one
+        :return: An array of scores between 0 and 1 per bill. Bills without cosponsors score 0, and bills without a
+        sponsor with a known party are NaN
+        """
+        scored, cross_party = self.cross_party_cosponsorships()
+        weights = np.where(self.edge_original, original_cosponsor_weight, 1.0)
+        total = np.bincount(self.edge_bills[scored], weights=weights[scored], minlength=len(self.bill_pks))
+        cross = np.bincount(self.edge_bills[cross_party], weights=weights[cross_party], minlength=len(self.bill_pks))
+
+        scores = np.divide(cross, total, out=np.zeros(len(self.bill_pks)), where=total > 0)
+        scores[self.sponsor_parties() == 0] = np.nan
+        return scores
+
+    def legislator_bipartisanship_scores(self):
+        """
+        Scores every legislator by the share of their cosponsorships that went to bills sponsored by another party.
+        :return: An array of scores between 0 and 1 per legislator. Legislators without scored cosponsorships are NaN
+        """
+        scored, cross_party = self.cross_party_cosponsorships()
+        total = np.bincount(self.edge_legislators[scored], minlength=len(self.legislator_pks))
+        cross = np.bincount(self.edge_legislators[cross_party], minlength=len(self.legislator_pks))
+        return np.divide(cross, total, out=np.full(len(self.legislator_pks), np.nan), where=total > 0)
+
+
+def connected_components(size, pairs):
+    """
+    Labels the connected components of a graph with union-find, using path halving and union by lowest root so that
+    each component is labelled by its smallest node.
+    :param size: The number of nodes in the graph
+    :param pairs: An iterable of (node, node) edges, where nodes are integers in [0, size)
+    :return: An array holding the smallest node of each node's component
+    """
+    parents = np.arange(size)
+
+    def find(node):
+        while parents[node] != node:
+            parents[node] = parents[parents[node]]
+            node = parents[node]
+        return node
+
+    for first, second in pairs:
+        first_root, second_root = find(first), find(second)
+        if first_root != second_root:
+            parents[max(first_root, second_root)] = min(first_root, second_root)
+
+    for node in range(size):
+        parents[node] = find(node)
+
+    return parents
+
+
+_loaded_snapshot = None
+_loaded_snapshot_path = None
+
+
+def current_snapshot():
+    """
+    Returns the current persisted snapshot, memory mapping it again whenever a newer one has been saved.
+    :return: The current snapshot, or None if no snapshot has been saved yet
+    """
+    global _loaded_snapshot, _loaded_snapshot_path
+
+    directory = SponsorshipSnapshot.default_directory()
+    try:
+        path = os.readlink(os.path.join(directory, SponsorshipSnapshot.current_link_name))
+    except FileNotFoundError:
+        return None
+
+    if path != _loaded_snapshot_path:
+        _loaded_snapshot = SponsorshipSnapshot.load(directory)
+        _loaded_snapshot_path = path
+
+    return _loaded_snapshot
@@ -5,3 +5,6 @@ from django.utils.translation import gettext_lazy as _
 class ApiConfig(AppConfig):
     name = 'billserve.api'
     verbose_name = _("API")
+
+    def ready(self):
+        from billserve.api import search  # noqa: F401 Registers the trigram word similarity lookup
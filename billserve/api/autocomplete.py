@@ -0,0 +1,206 @@
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+
+import numpy as np
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count
+
+from billserve.api.generation import current_generation
+
+
+def normalize(name):
+    """
+    Normalizes a name for prefix matching by stripping accents, lowercasing it and collapsing punctuation to spaces.
+    :param name: A name, such as 'Ocasio-Cortez'
+    :return: The normalized name, such as 'ocasio cortez'
+    """
+    name = unicodedata.normalize('NFKD', name)
+    name = ''.join(character for character in name if not unicodedata.combining(character))
+    return ' '.join(re.split(r'\W+', name.lower())).strip()
+
+
+class PrefixTrie:
+    """
+    A prefix trie flattened into arrays. The children of node i are child_labels[child_offsets[i]:child_offsets[i + 1]],
+    sorted by code point, and lead to the nodes in the same slice of child_nodes. Keys are stored sorted, so the keys
+    under any node form the contiguous slice key_values[starts[i]:ends[i]].
+    """
+    def __init__(self, keys, values):
+        """
+        Builds a trie.
+        :param keys: The strings to index
+        :param values: One integer value for each key
+        """
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        self.key_values = np.array([values[i] for i in order], dtype=np.int32)
+
+        children, starts, ends = [{}], [0], [len(order)]
+        for row, i in enumerate(order):
+            node = 0
+            for character in keys[i]:
+                child = children[node].get(character)
+                if child is None:
+                    child = children[node][character] = len(children)
+                    children.append({})
+                    starts.append(row)
+                    ends.append(row)
+                ends[child] = row + 1
+                node = child
+
+        self.child_offsets = np.cumsum([0] + [len(node_children) for node_children in children]).astype(np.int32)
+        self.child_labels = np.array([ord(character) for node_children in children for character in node_children],
+                                     dtype=np.uint32)
+        self.child_nodes = np.array([child for node_children in children for child in node_children.values()],
+                                    dtype=np.int32)
+        self.starts = np.array(starts, dtype=np.int32)
+        self.ends = np.array(ends, dtype=np.int32)
+
+    def values(self, prefix):
+        """
+        :param prefix: The prefix to look up
+        :return: The values of every key starting with the prefix, as an array slice
+        """
+        node = 0
+        for character in prefix:
+            start, end = self.child_offsets[node], self.child_offsets[node + 1]
+            i = start + np.searchsorted(self.child_labels[start:end], ord(character))
+            if i == end or self.child_labels[i] != ord(character):
+                return self.key_values[:0]
+            node = self.child_nodes[i]
+        return self.key_values[self.starts[node]:self.ends[node]]
+
+
+class AutocompleteIndex:
+    """
+    An in-memory type-ahead index of legislators, legislative subjects, policy areas and committees. Every word suffix
+    of a name is indexed, so 'care' completes 'Health care coverage and access'. Matches are ranked by activity: bills
+    sponsored or cosponsored for legislators, and bills tagged for everything else.
+    """
+    kinds = ('senator', 'representative', 'legislativesubject', 'policyarea', 'committee')
+
+    def __init__(self, entry_kinds, entry_pks, entry_names, entry_activity):
+        """
+        Initializes an index from its entries, building a trie over their names.
+        :param entry_kinds: The index in kinds of each entry's kind
+        :param entry_pks: The primary key of each entry
+        :param entry_names: The display name of each entry
+        :param entry_activity: The activity count of each entry
+        """
+        self.entry_kinds = np.array(entry_kinds, dtype=np.int8)
+        self.entry_pks = np.array(entry_pks, dtype=np.int64)
+        self.entry_names = entry_names
+        self.entry_activity = np.array(entry_activity, dtype=np.int64)
+
+        keys, values = [], []
+        for entry, name in enumerate(entry_names):
+            words = normalize(name).split()
+            for i in range(len(words)):
+                keys.append(' '.join(words[i:]))
+                values.append(entry)
+        self.trie = PrefixTrie(keys, values)
+
+    @classmethod
+    def build(cls):
+        """
+        Reads every entry and its activity count from the database.
+        :return: A freshly built index
+        """
+        from billserve.api.models import Bill, Cosponsorship, Senator, Representative, LegislativeSubject, PolicyArea, \
+            Committee
+
+        legislator_activity = Counter()
+        for through in (Bill.sponsors.through, Cosponsorship):
+            legislator_activity.update(dict(through.objects.order_by().values_list('legislator')
+                                            .annotate(Count('bill'))))
+        rows = (
+            ((pk, '{} {}'.format(first_name, last_name), legislator_activity[pk]) for pk, first_name, last_name
+             in Senator.objects.non_polymorphic().values_list('pk', 'first_name', 'last_name')),
+            ((pk, '{} {}'.format(first_name, last_name), legislator_activity[pk]) for pk, first_name, last_name
+             in Representative.objects.non_polymorphic().values_list('pk', 'first_name', 'last_name')),
+            LegislativeSubject.objects.annotate(activity=Count('bills')).values_list('pk', 'name', 'activity'),
+            PolicyArea.objects.annotate(activity=Count('bills')).values_list('pk', 'name', 'activity'),
+            Committee.objects.annotate(activity=Count('bill')).values_list('pk', 'name', 'activity'),
+        )
+
+        entry_kinds, entry_pks, entry_names, entry_activity = [], [], [], []
+        for kind, kind_rows in enumerate(rows):
+            for pk, name, activity in kind_rows:
+                entry_kinds.append(kind)
+                entry_pks.append(pk)
+                entry_names.append(name)
+                entry_activity.append(activity)
+        return cls(entry_kinds, entry_pks, entry_names, entry_activity)
+
+    def complete(self, prefix, count=10, kinds=None):
+        """
+        Completes a prefix typed by a user.
+        :param prefix: The text typed so far, such as 'schu'
+        :param count: The number of completions to return
+        :param kinds: The kinds of entries to complete, all of them if None
+        :return: A list of (kind, pk, name, activity count) tuples, most active first
+        """
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+
+        entries = np.unique(self.trie.values(prefix))
+        if kinds is not None:
+            entries = entries[np.isin(self.entry_kinds[entries], [self.kinds.index(kind) for kind in kinds])]
+        if len(entries) > count:
+            entries = entries[np.argpartition(-self.entry_activity[entries], count - 1)[:count]]
+        entries = entries[np.lexsort((entries, -self.entry_activity[entries]))]
+
+        return [(self.kinds[self.entry_kinds[entry]], int(self.entry_pks[entry]), self.entry_names[entry],
+                 int(self.entry_activity[entry])) for entry in entries]
+
+
+_index = None
+_index_generation = None
+_index_built_at = None
+_index_lock = threading.Lock()
+_rebuild_thread = None
+
+
+def rebuild_index(generation):
+    """
+    Builds a new autocomplete index and swaps it in for this process' current one. Runs in a background thread started
+    by current_index(), which took _index_lock for it.
+    :param generation: The ingest generation the index is built at
+    """
+    global _index, _index_generation, _index_built_at
+
+    try:
+        index = AutocompleteIndex.build()
+        _index, _index_generation, _index_built_at = index, generation, time.monotonic()
+    finally:
+        connection.close()
+        _index_lock.release()
+
+
+def current_index():
+    """
+    Returns this process' autocomplete index, building it on first use. Once the ingest generation has moved on since
+    it was built, the index keeps being served while a background thread builds a new one. Ingest moves the generation
+    on with every bill, so the index is rebuilt at most once every AUTOCOMPLETE_REBUILD_INTERVAL seconds.
+    :return: The current index
+    """
+    global _index, _index_generation, _index_built_at, _rebuild_thread
+
+    generation = current_generation()
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index, _index_generation, _index_built_at = AutocompleteIndex.build(), generation, time.monotonic()
+        return _index
+
+    index = _index
+    stale = generation != _index_generation
+    if stale and time.monotonic() - _index_built_at >= settings.AUTOCOMPLETE_REBUILD_INTERVAL \
+            and _index_lock.acquire(blocking=False):
+        _rebuild_thread = threading.Thread(target=rebuild_index, args=(generation,), daemon=True)
+        _rebuild_thread.start()
+    return index
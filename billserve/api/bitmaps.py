@@ -0,0 +1,314 @@
+import os
+import shutil
+import threading
+
+import numpy as np
+from django.conf import settings
+
+from billserve.api.generation import current_generation, generation_changed_at
+
+
+def packed_rows(bill_count, positions, values):
+    """
+    Packs one bitmap over bill positions for each distinct value, eight bills to a byte.
+    :param bill_count: The number of bills the bitmaps cover
+    :param positions: The position of the bill on each (bill, value) edge
+    :param values: The value on each edge
+    :return: A tuple of the sorted distinct values and their bitmaps, one row per value
+    """
+    uniques, inverse = np.unique(values, return_inverse=True)
+    bitmaps = np.zeros((len(uniques), (bill_count + 7) // 8), dtype=np.uint8)
+    np.bitwise_or.at(bitmaps, (inverse, positions >> 3), (0x80 >> (positions & 7)).astype(np.uint8))
+    return uniques, bitmaps
+
+
+def keyset_order(pks, keys, descending=False):
+    """
+    Orders bills as KeysetPagination does: by (key, primary key), then the bills whose key is null by primary key.
+    :param pks: The bills' primary keys
+    :param keys: The bills' keys as numbers, NaN where they're null
+    :param descending: Whether to order both the keys and the primary keys descending
+    :return: A tuple of the ordered primary keys and their keys
+    """
+    nulls = np.isnan(keys)
+    keyed = np.flatnonzero(~nulls)
+    keyed = keyed[np.lexsort((pks[keyed], keys[keyed]))]
+    unkeyed = np.flatnonzero(nulls)
+    unkeyed = unkeyed[np.argsort(pks[unkeyed], kind='stable')]
+    if descending:
+        keyed, unkeyed = keyed[::-1], unkeyed[::-1]
+    positions = np.concatenate([keyed, unkeyed])
+    return pks[positions], keys[positions]
+
+
+class BillBitmapIndex:
+    """
+    One packed bitmap over bill positions for every congress, type, policy area, legislative subject, sponsor party and
+    sponsor state, plus the number of distinct cosponsors each bill has from each party, and the keys bills are
+    ordered by.
+
+    Filters are answered with bitwise operations over whole bitmaps: the values of one facet are OR'd together and
+    the facets AND'd, so combining filters costs no joins however many are given. Bills are addressed by their
+    position in the sorted bill_pks array, as in the analytics snapshot, and bill types by their position in
+    type_names. Ordering keys are stored as floats, NaN standing for null: introduction dates as proleptic Gregorian
+    ordinals, see date.toordinal().
+    """
+    facets = ('congress', 'type', 'policy_area', 'legislative_subject', 'sponsor_party', 'sponsor_state')
+    array_names = ('bill_pks', 'keys', 'bitmaps', 'type_names', 'party_pks', 'cosponsor_counts', 'introduction_date',
+                   'bipartisanship_score')
+    ordering_keys = ('introduction_date', 'bipartisanship_score')
+    indexes_kept = 2
+
+    def __init__(self, **arrays):
+        """
+        Initializes an index from its arrays.
+        :param arrays: One numpy array for each name in array_names
+        """
+        for name in self.array_names:
+            setattr(self, name, arrays[name])
+        self.rows = {(int(facet), int(value)): row for row, (facet, value) in enumerate(self.keys)}
+
+    @classmethod
+    def build(cls):
+        """
+        Reads the bills and their facets from the database with flat values_list queries.
+        :return: A freshly built index
+        """
+        from billserve.api.models import Bill, Senator, Representative, Cosponsorship
+
+        bills = list(Bill.objects.order_by('pk').values_list('pk', 'congress', 'type', 'policy_area',
+                                                             'introduction_date', 'bipartisanship_score'))
+        bill_pks = np.array([bill[0] for bill in bills], dtype=np.int64)
+        introduction_date = np.array([np.nan if bill[4] is None else bill[4].toordinal() for bill in bills],
+                                     dtype=np.float64)
+        bipartisanship_score = np.array([np.nan if bill[5] is None else bill[5] for bill in bills], dtype=np.float64)
+        type_names = np.array(sorted({bill[2] for bill in bills if bill[2]}), dtype='<U10')
+        type_positions = {name: position for position, name in enumerate(type_names)}
+
+        legislators = {pk: (party, state) for pk, party, state in
+                       list(Senator.objects.values_list('pk', 'party', 'state')) +
+                       list(Representative.objects.values_list('pk', 'party', 'state'))}
+        party_pks = np.array(sorted({party for party, _ in legislators.values() if party}), dtype=np.int64)
+
+        def edge_arrays(pairs):
+            # Bills added since bill_pks was read are left out, as they would be had they come a moment later
+            pairs = np.array(pairs, dtype=np.int64).reshape(-1, 2)
+            pairs = pairs[np.isin(pairs[:, 0], bill_pks)]
+            return np.searchsorted(bill_pks, pairs[:, 0]), pairs[:, 1]
+
+        edges = {
+            'congress': [(bill[0], bill[1]) for bill in bills if bill[1] is not None],
+            'type': [(bill[0], type_positions[bill[2]]) for bill in bills if bill[2]],
+            'policy_area': [(bill[0], bill[3]) for bill in bills if bill[3] is not None],
+            'legislative_subject': list(Bill.legislative_subjects.through.objects.values_list(
+                'bill', 'legislativesubject')),
+            'sponsor_party': [],
+            'sponsor_state': [],
+        }
+        for bill, legislator in Bill.sponsors.through.objects.values_list('bill', 'legislator'):
+            party, state = legislators.get(legislator, (None, None))
+            if party is not None:
+                edges['sponsor_party'].append((bill, party))
+            if state is not None:
+                edges['sponsor_state'].append((bill, state))
+
+        keys, bitmaps = [], []
+        for code, facet in enumerate(cls.facets):
+            positions, values = edge_arrays(edges[facet])
+            values, rows = packed_rows(len(bill_pks), positions, values)
+            keys.append(np.stack([np.full(len(values), code, dtype=np.int64), values], axis=1))
+            bitmaps.append(rows)
+
+        # A legislator who cosponsors the same bill twice still counts once
+        cosponsorships = set(Cosponsorship.objects.values_list('bill', 'legislator'))
+        positions, parties = edge_arrays([(bill, legislators[legislator][0]) for bill, legislator in cosponsorships
+                                          if legislators.get(legislator, (None, None))[0] is not None])
+        cosponsor_counts = np.zeros((len(bill_pks), len(party_pks)), dtype=np.int32)
+        np.add.at(cosponsor_counts, (positions, np.searchsorted(party_pks, parties)), 1)
+
+        return cls(bill_pks=bill_pks,
+                   keys=np.concatenate(keys),
+                   bitmaps=np.concatenate(bitmaps),
+                   type_names=type_names,
+                   party_pks=party_pks,
+                   cosponsor_counts=cosponsor_counts,
+                   introduction_date=introduction_date,
+                   bipartisanship_score=bipartisanship_score)
+
+    @staticmethod
+    def default_directory():
+        """
+        :return: The directory indexes are persisted to, taken from the BILL_BITMAP_DIR setting
+        """
+        return settings.BILL_BITMAP_DIR
+
+    def save(self, name, directory=None):
+        """
+        Persists the index as one .npy file per array. The files are written to a temporary directory that is renamed
+        into place, so workers never load a half written index, and if another worker got there first its copy is
+        kept. Older indexes are pruned.
+        :param name: The name of the index, unique to the data it was built from
+        :param directory: The index directory. Defaults to the BILL_BITMAP_DIR setting
+        :return: The path of the directory holding the index
+        """
+        directory = directory or self.default_directory()
+        path = os.path.join(directory, name)
+        temporary_path = '{path}.{pid}.{thread}.tmp'.format(path=path, pid=os.getpid(), thread=threading.get_ident())
+        os.makedirs(temporary_path)
+
+        for array_name in self.array_names:
+            np.save(os.path.join(temporary_path, array_name + '.npy'), getattr(self, array_name))
+
+        try:
+            os.rename(temporary_path, path)
+        except OSError:
+            shutil.rmtree(temporary_path, ignore_errors=True)
+            if not os.path.isdir(path):
+                raise
+
+        indexes = sorted((entry for entry in os.listdir(directory) if not entry.endswith('.tmp')),
+                         key=lambda entry: os.path.getmtime(os.path.join(directory, entry)))
+        for stale in indexes[:-self.indexes_kept]:
+            if stale != name:
+                shutil.rmtree(os.path.join(directory, stale), ignore_errors=True)
+
+        return path
+
+    @classmethod
+    def load(cls, name, directory=None):
+        """
+        Memory maps a saved index. Pages are shared between every worker process that loads the same index.
+        :param name: The name the index was saved under
+        :param directory: The index directory. Defaults to the BILL_BITMAP_DIR setting
+        :return: The loaded index, or None if there is no index by that name, or it was saved without some array
+        """
+        paths = {array_name: os.path.join(directory or cls.default_directory(), name, array_name + '.npy')
+                 for array_name in cls.array_names}
+        if not all(os.path.isfile(path) for path in paths.values()):
+            return None
+        return cls(**{array_name: np.load(path, mmap_mode='r') for array_name, path in paths.items()})
+
+    @classmethod
+    def latest_name(cls, directory=None):
+        """
+        :param directory: The index directory. Defaults to the BILL_BITMAP_DIR setting
+        :return: The name of the index saved last, or None if there is none
+        """
+        directory = directory or cls.default_directory()
+        try:
+            names = [entry for entry in os.listdir(directory) if not entry.endswith('.tmp')]
+        except FileNotFoundError:
+            return None
+        if not names:
+            return None
+        return max(names, key=lambda entry: os.path.getmtime(os.path.join(directory, entry)))
+
+    def bitmap(self, facet, values):
+        """
+        :param facet: One of facets
+        :param values: The values to match, compared case-insensitively for types
+        :return: The OR of the bitmaps of the values, which is empty when none of them occur
+        """
+        code = self.facets.index(facet)
+        res = np.zeros(self.bitmaps.shape[1], dtype=np.uint8)
+        for value in values:
+            if facet == 'type':
+                positions = np.flatnonzero(self.type_names == value.upper())
+                if not len(positions):
+                    continue
+                value = positions[0]
+            row = self.rows.get((code, int(value)))
+            if row is not None:
+                res |= self.bitmaps[row]
+        return res
+
+    def match(self, facets, cosponsor_parties=None, min_cosponsors=None):
+        """
+        Finds the bills matching every facet.
+        :param facets: A dictionary from facet names to the values to match, any one of which will do
+        :param cosponsor_parties: Party primary keys whose cosponsors min_cosponsors counts. Defaults to every party
+        :param min_cosponsors: The fewest distinct cosponsors from cosponsor_parties a bill may have
+        :return: The sorted primary keys of the matching bills
+        """
+        res = np.full(self.bitmaps.shape[1], 0xFF, dtype=np.uint8)
+        for facet, values in facets.items():
+            res &= self.bitmap(facet, values)
+        matches = np.unpackbits(res, count=len(self.bill_pks)).astype(np.bool_)
+
+        if cosponsor_parties is not None or min_cosponsors is not None:
+            columns = np.arange(len(self.party_pks))
+            if cosponsor_parties is not None:
+                columns = np.flatnonzero(np.isin(self.party_pks, cosponsor_parties))
+            counts = np.asarray(self.cosponsor_counts[:, columns]).sum(axis=1)
+            matches &= counts >= (1 if min_cosponsors is None else min_cosponsors)
+
+        return self.bill_pks[matches]
+
+    def ordering_key(self, name, pks):
+        """
+        :param name: One of ordering_keys
+        :param pks: Sorted primary keys of indexed bills, as match() returns them
+        :return: The bills' keys, NaN where they're null
+        """
+        return np.asarray(getattr(self, name))[np.searchsorted(self.bill_pks, pks)]
+
+    def order(self, pks, name, descending=False):
+        """
+        Orders bills by one of their keys, see keyset_order().
+        :param pks: Sorted primary keys of indexed bills, as match() returns them
+        :param name: One of ordering_keys
+        :param descending: Whether to order both the keys and the primary keys descending
+        :return: A tuple of the ordered primary keys and their keys
+        """
+        return keyset_order(pks, self.ordering_key(name, pks), descending)
+
+
+def index_name():
+    """
+    Names the index of the current data after the ingest generation and when it was bumped, since the generation
+    counter alone restarts from zero whenever the cache is flushed.
+    :return: The name
+    """
+    changed_at = generation_changed_at()
+    if changed_at is None:
+        return 'generation-{generation}'.format(generation=current_generation())
+    return 'generation-{generation}-{changed_at}'.format(generation=current_generation(),
+                                                         changed_at=changed_at.strftime('%Y%m%d%H%M%S%f'))
+
+
+_index = None
+_index_name = None
+_index_lock = threading.Lock()
+
+
+def build_bitmap_index():
+    """
+    Builds and saves the bill bitmap index of the current ingest generation for every process to share. Run by the
+    rebuild task, never while serving requests.
+    :return: The path of the directory holding the index
+    """
+    return BillBitmapIndex.build().save(index_name())
+
+
+def current_bitmap_index():
+    """
+    Returns this process' bill bitmap index, memory mapped from disk. That's the index of the current ingest
+    generation once the rebuild task has saved it, and until then the last index saved, which may lack bills ingested
+    since. Indexes are never built here, since ingest bumps the generation with every bill.
+    :return: The index, or None if none was ever saved
+    """
+    global _index, _index_name
+
+    name = index_name()
+    if name != _index_name:
+        with _index_lock:
+            if name != _index_name:
+                index = BillBitmapIndex.load(name)
+                if index is None:
+                    name = BillBitmapIndex.latest_name()
+                    if name != _index_name:
+                        index = BillBitmapIndex.load(name) if name is not None else None
+                if name != _index_name:
+                    _index, _index_name = index, name
+
+    return _index
@@ -0,0 +1,270 @@
+import hashlib
+import io
+import time
+from functools import wraps
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIRequest
+from django.http import HttpResponse
+from django.urls import resolve
+from django.utils.http import http_date
+from django.views.decorators.http import condition
+
+from billserve.api.generation import current_generation, generation_changed_at
+
+RESPONSE_KEY_PREFIX = 'api:response'
+HITS_KEY = 'api:response-cache:hits'
+MISSES_KEY = 'api:response-cache:misses'
+STALE_KEY = 'api:response-cache:stale'
+CACHED_CONTENT_TYPES = ('application/json',)
+LOCK_POLL_INTERVAL = 0.05  # Seconds between checks for a response another request is computing
+
+
+def fingerprint(request):
+    """
+    Identifies the representation a request asks for. The absolute URI is used because hyperlinked serializers render
+    absolute URLs, and the Accept header because it picks the renderer.
+    :param request: The request
+    :return: A string that is equal for requests that get byte for byte equal responses within a generation
+    """
+    query = sorted(request.GET.lists())
+    return '{uri}?{query}|{accept}'.format(uri=request.build_absolute_uri(request.path), query=query,
+                                           accept=request.META.get('HTTP_ACCEPT', ''))
+
+
+def response_cache_key(request):
+    """
+    Builds the cache key of a request's response. Entries record the generation they were rendered at, so a response
+    from an earlier generation can still be found, and served while it's recomputed.
+    :param request: The request
+    :return: The cache key
+    """
+    digest = hashlib.md5(fingerprint(request).encode('utf-8')).hexdigest()
+    return '{prefix}:{digest}'.format(prefix=RESPONSE_KEY_PREFIX, digest=digest)
+
+
+def count(key):
+    """
+    Increments a hit or miss counter.
+    :param key: The key of the counter
+    """
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def is_fresh(entry, generation):
+    """
+    :param entry: A cache entry, as stored by store()
+    :param generation: The current data generation
+    :return: Whether the entry was rendered at the generation and within API_RESPONSE_CACHE_TIMEOUT seconds
+    """
+    return entry[0] == generation and time.time() < entry[1] + settings.API_RESPONSE_CACHE_TIMEOUT
+
+
+def store(key, generation, response):
+    """
+    Caches a rendered response if it's a successful JSON one. Entries outlive API_RESPONSE_CACHE_TIMEOUT by
+    API_RESPONSE_STALE_TIMEOUT, during which they may be served stale.
+    :param key: The cache key of the response
+    :param generation: The data generation the response was rendered at
+    :param response: The rendered response
+    """
+    if response.status_code == 200 and response['Content-Type'].startswith(CACHED_CONTENT_TYPES):
+        cache.set(key, (generation, time.time(), response.status_code, response['Content-Type'], response.content),
+                  settings.API_RESPONSE_CACHE_TIMEOUT + settings.API_RESPONSE_STALE_TIMEOUT)
+
+
+def cached_response(entry, status):
+    """
+    :param entry: A cache entry, as stored by store()
+    :param status: The X-Cache header of the response
+    :return: The cached response
+    """
+    _, _, status_code, content_type, content = entry
+    response = HttpResponse(content, status=status_code, content_type=content_type)
+    response['X-Cache'] = status
+    return response
+
+
+def render(view, request, *args, **kwargs):
+    """
+    Calls a view and renders its response right away, rather than on the way out, so it can be cached before any lock
+    on computing it is released.
+    :param view: A view function
+    :param request: The request
+    :return: The rendered response
+    """
+    response = view(request, *args, **kwargs)
+    if hasattr(response, 'render') and callable(response.render) and not response.is_rendered:
+        response.render()
+    return response
+
+
+def lock_key(key):
+    """
+    :param key: The cache key of a response
+    :return: The key of the lock held by whoever is computing the response
+    """
+    return key + ':lock'
+
+
+def compute(view, request, key, generation, *args, **kwargs):
+    """
+    Computes and caches a response at most once at a time across processes. The first request to miss takes the lock
+    and renders the response; requests that miss meanwhile wait for it to be cached rather than rendering it again.
+    Waiting ends after API_RESPONSE_LOCK_TIMEOUT seconds, or as soon as the lock is released without a cacheable
+    response, in which case a waiter takes the lock itself.
+    :param view: A view function
+    :param request: The request
+    :param key: The cache key of the response
+    :param generation: The current data generation
+    :return: The response
+    """
+    lock = lock_key(key)
+    deadline = time.time() + settings.API_RESPONSE_LOCK_TIMEOUT
+    locked = cache.add(lock, True, settings.API_RESPONSE_LOCK_TIMEOUT)
+    while not locked and time.time() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None and is_fresh(entry, generation):
+            count(HITS_KEY)
+            return cached_response(entry, 'HIT')
+        locked = cache.add(lock, True, settings.API_RESPONSE_LOCK_TIMEOUT)
+
+    count(MISSES_KEY)
+    try:
+        response = render(view, request, *args, **kwargs)
+        store(key, generation, response)
+    finally:
+        if locked:
+            cache.delete(lock)
+    response['X-Cache'] = 'MISS'
+    return response
+
+
+def revalidate_later(request, key):
+    """
+    Queues a background recomputation of a request's response, unless one is already running or queued.
+    :param request: The request
+    :param key: The cache key of the response
+    """
+    from billserve.api.tasks import refresh_response
+
+    if cache.add(lock_key(key), True, settings.API_RESPONSE_LOCK_TIMEOUT):
+        refresh_response.delay(request.build_absolute_uri(), request.META.get('HTTP_ACCEPT', ''))
+
+
+def revalidate(uri, accept):
+    """
+    Recomputes and caches the response to a GET request, releasing the lock revalidate_later() took.
+    :param uri: The absolute URI of the request, with its query string
+    :param accept: The Accept header of the request
+    """
+    parts = urlsplit(uri)
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'SCRIPT_NAME': '',
+        'PATH_INFO': parts.path,
+        'QUERY_STRING': parts.query,
+        'HTTP_HOST': parts.netloc,
+        'SERVER_NAME': parts.hostname,
+        'SERVER_PORT': str(parts.port or (443 if parts.scheme == 'https' else 80)),
+        'wsgi.url_scheme': parts.scheme,
+        'wsgi.input': io.BytesIO(),
+    }
+    if accept:
+        environ['HTTP_ACCEPT'] = accept
+    request = WSGIRequest(environ)
+    request.revalidating = True
+    match = resolve(parts.path)
+    match.func(request, *match.args, **match.kwargs)
+
+
+def cached(view, stale_while_revalidate=False):
+    """
+    Caches the successful JSON GET responses of a view until the data generation moves on, so repeated reads between
+    crawls never reach the database. Hits carry an X-Cache: HIT header and misses an X-Cache: MISS one. Concurrent
+    misses on one response compute it once, see compute().
+    :param view: A view function, such as the result of as_view()
+    :param stale_while_revalidate: Whether to answer with the response cached at an earlier generation, or past its
+    timeout, while it's recomputed in the background. Such responses carry an X-Cache: STALE header. Meant for
+    expensive views, where serving slightly old data beats making every client wait
+    :return: The caching view function
+    """
+    @wraps(view)
+    def cached_view(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view(request, *args, **kwargs)
+
+        key, generation = response_cache_key(request), current_generation()
+        if getattr(request, 'revalidating', False):
+            try:
+                response = render(view, request, *args, **kwargs)
+                store(key, generation, response)
+                return response
+            finally:
+                cache.delete(lock_key(key))
+
+        entry = cache.get(key)
+        if entry is not None and is_fresh(entry, generation):
+            count(HITS_KEY)
+            return cached_response(entry, 'HIT')
+
+        if entry is not None and stale_while_revalidate:
+            count(STALE_KEY)
+            revalidate_later(request, key)
+            response = cached_response(entry, 'STALE')
+            # Validators of the stale content, so conditional() doesn't label it with the current generation's
+            response['ETag'] = 'W/"{digest}"'.format(digest=hashlib.md5(response.content).hexdigest())
+            response['Last-Modified'] = http_date(entry[1])
+            return response
+
+        return compute(view, request, key, generation, *args, **kwargs)
+
+    return cached_view
+
+
+def conditional(view):
+    """
+    Answers conditional GETs for a view with strong ETags and Last-Modified headers derived from the data generation,
+    so a client polling an unchanged resource gets a 304 before any serialization, cache lookup or query happens.
+    Ingest bumps the generation whenever it changes an object, so the generation alone tells when a response may have
+    changed.
+    :param view: A view function, such as the result of cached()
+    :return: The conditional view function
+    """
+    def validators(request):
+        if not hasattr(request, 'conditional_validators'):
+            generation = current_generation()
+            tag = '{fingerprint}|{generation}'.format(fingerprint=fingerprint(request), generation=generation)
+            request.conditional_validators = (hashlib.md5(tag.encode('utf-8')).hexdigest(), generation_changed_at())
+        return request.conditional_validators
+
+    def etag(request, *args, **kwargs):
+        return validators(request)[0]
+
+    def last_modified(request, *args, **kwargs):
+        return validators(request)[1]
+
+    return condition(etag_func=etag, last_modified_func=last_modified)(view)
+
+
+def metrics():
+    """
+    :return: A dictionary of the response cache's hit, miss and stale counts, hit rate and current data generation.
+    Stale responses count towards the hit rate, since they too were served without computing them
+    """
+    counts = cache.get_many([HITS_KEY, MISSES_KEY, STALE_KEY])
+    hits, misses, stale = counts.get(HITS_KEY, 0), counts.get(MISSES_KEY, 0), counts.get(STALE_KEY, 0)
+    return {
+        'hits': hits,
+        'misses': misses,
+        'stale': stale,
+        'hit_rate': (hits + stale) / (hits + stale + misses) if hits + stale + misses else None,
+        'generation': current_generation(),
+    }
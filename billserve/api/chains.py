@@ -1,5 +1,5 @@
 from celery import signature
-from billserve.api.tasks import update, rebuild
+from billserve.api.tasks import update, rebuild, warm_cache
 import celery
 
 
@@ -21,7 +21,9 @@ class UpdateChain:
     @staticmethod
     def execute(url):
         """
-        Executes the asynchronous task chain we need to update the bill database and then rebuild support splits.
+        Executes the asynchronous task chain we need to update the bill database, rebuild support splits and then warm
+        the response cache. The update task only lists the bills and queues a task to populate each, so the rebuild
+        is chained to those tasks rather than to it.
         :param url: The URL to start our graph search at
         """
-        update.apply_async((url,), link=rebuild.s())
+        update.delay(url, rebuild.si() | warm_cache.si())
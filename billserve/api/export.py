@@ -0,0 +1,169 @@
+import csv
+import itertools
+from collections import defaultdict
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+EXPORT_CHUNK_SIZE = 2000  # Rows fetched from the server-side cursor at a time
+LIST_SEPARATOR = '|'  # Separates the values of list columns in CSV exports
+
+BILL_COLUMNS = ('id', 'congress', 'type', 'bill_number', 'title', 'introduction_date', 'last_modified',
+                'bipartisanship_score', 'policy_area', 'sponsors', 'cosponsors', 'legislative_subjects')
+LEGISLATOR_COLUMNS = ('id', 'kind', 'first_name', 'last_name', 'party', 'state', 'district', 'bipartisanship_score')
+COSPONSORSHIP_COLUMNS = ('bill', 'legislator', 'is_original_cosponsor', 'cosponsorship_date')
+
+
+def chunked(iterable, size):
+    """
+    Groups an iterable into lists without reading it all.
+    :param iterable: The iterable
+    :param size: The largest number of items per list
+    :return: A generator of lists of consecutive items
+    """
+    iterator = iter(iterable)
+    chunk = list(itertools.islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(itertools.islice(iterator, size))
+
+
+def grouped(pairs):
+    """
+    :param pairs: An iterable of (key, value) tuples
+    :return: A dictionary from each key to the list of its values
+    """
+    res = defaultdict(list)
+    for key, value in pairs:
+        res[key].append(value)
+    return res
+
+
+def values_rows(queryset, columns, lookups, chunk_size):
+    """
+    Reads a queryset as dictionaries through a server-side cursor, in primary key order.
+    :param queryset: The queryset
+    :param columns: The keys of each dictionary
+    :param lookups: The field lookups giving the value of each column
+    :param chunk_size: The number of rows fetched from the cursor at a time
+    :return: A generator of dictionaries
+    """
+    for values in queryset.order_by('pk').values_list(*lookups).iterator(chunk_size=chunk_size):
+        yield dict(zip(columns, values))
+
+
+def bill_rows(chunk_size=EXPORT_CHUNK_SIZE, using=None):
+    """
+    Reads every bill along with its sponsors, cosponsors, legislative subjects and policy area. Bills come from a
+    server-side cursor, and the relations of each chunk of bills are read in one query per relation.
+    :param chunk_size: The number of bills read at a time
+    :param using: The alias of the database to read from. Defaults to the one the router picks
+    :return: A generator of dictionaries with the keys in BILL_COLUMNS
+    """
+    from billserve.api.models import Bill, Cosponsorship
+
+    columns = ('id', 'congress', 'type', 'bill_number', 'title', 'introduction_date', 'last_modified',
+               'bipartisanship_score', 'policy_area')
+    bills = values_rows(Bill.objects.using(using), columns, columns[:-1] + ('policy_area__name',), chunk_size)
+    for chunk in chunked(bills, chunk_size):
+        pks = [bill['id'] for bill in chunk]
+        sponsors = grouped(Bill.sponsors.through.objects.using(using).filter(bill__in=pks).order_by('pk')
+                           .values_list('bill', 'legislator'))
+        cosponsors = grouped(Cosponsorship.objects.using(using).filter(bill__in=pks).order_by('pk')
+                             .values_list('bill', 'legislator'))
+        subjects = grouped(Bill.legislative_subjects.through.objects.using(using).filter(bill__in=pks).order_by('pk')
+                           .values_list('bill', 'legislativesubject__name'))
+        for bill in chunk:
+            bill.update(sponsors=sponsors[bill['id']], cosponsors=cosponsors[bill['id']],
+                        legislative_subjects=subjects[bill['id']])
+            yield bill
+
+
+def legislator_rows(chunk_size=EXPORT_CHUNK_SIZE, using=None):
+    """
+    Reads every senator, then every representative, from server-side cursors.
+    :param chunk_size: The number of legislators fetched from the cursor at a time
+    :param using: The alias of the database to read from. Defaults to the one the router picks
+    :return: A generator of dictionaries with the keys in LEGISLATOR_COLUMNS
+    """
+    from billserve.api.models import Senator, Representative
+
+    columns = ('id', 'first_name', 'last_name', 'bipartisanship_score', 'party', 'state')
+    lookups = columns[:-2] + ('party__abbreviation', 'state__abbreviation')
+    senators = values_rows(Senator.objects.using(using).non_polymorphic(), columns, lookups, chunk_size)
+    representatives = values_rows(Representative.objects.using(using).non_polymorphic(), columns + ('district',),
+                                  lookups + ('district__number',), chunk_size)
+    for kind, legislators in (('senator', senators), ('representative', representatives)):
+        for legislator in legislators:
+            yield dict(legislator, kind=kind, district=legislator.get('district'))
+
+
+def cosponsorship_rows(chunk_size=EXPORT_CHUNK_SIZE, using=None):
+    """
+    Reads every cosponsorship from a server-side cursor.
+    :param chunk_size: The number of cosponsorships fetched from the cursor at a time
+    :param using: The alias of the database to read from. Defaults to the one the router picks
+    :return: A generator of dictionaries with the keys in COSPONSORSHIP_COLUMNS
+    """
+    from billserve.api.models import Cosponsorship
+
+    return values_rows(Cosponsorship.objects.using(using), COSPONSORSHIP_COLUMNS, COSPONSORSHIP_COLUMNS, chunk_size)
+
+
+def ndjson_lines(columns, rows):
+    """
+    Renders rows as newline delimited JSON, one object per line.
+    :param columns: The keys of each row, in output order
+    :param rows: An iterable of dictionaries
+    :return: A generator of lines
+    """
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode({column: row[column] for column in columns}) + '\n'
+
+
+class Echo:
+    """
+    A file-like object that hands back what's written to it, so csv.writer can format one line at a time.
+    """
+    def write(self, value):
+        return value
+
+
+def csv_lines(columns, rows):
+    """
+    Renders rows as CSV with a header line. List values are joined with LIST_SEPARATOR.
+    :param columns: The keys of each row, in output order
+    :param rows: An iterable of dictionaries
+    :return: A generator of lines
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([LIST_SEPARATOR.join(str(value) for value in row[column])
+                               if isinstance(row[column], list) else row[column] for column in columns])
+
+
+DATASETS = {
+    'bills': (BILL_COLUMNS, bill_rows),
+    'legislators': (LEGISLATOR_COLUMNS, legislator_rows),
+    'cosponsorships': (COSPONSORSHIP_COLUMNS, cosponsorship_rows),
+}
+
+FORMATS = {
+    'ndjson': ('application/x-ndjson', ndjson_lines),
+    'csv': ('text/csv', csv_lines),
+}
+
+
+def export(dataset, export_format, chunk_size=EXPORT_CHUNK_SIZE, using=None):
+    """
+    Renders a whole dataset lazily, so it can be streamed in flat memory.
+    :param dataset: A key of DATASETS
+    :param export_format: A key of FORMATS
+    :param chunk_size: The number of rows read at a time
+    :param using: The alias of the database to read from. Defaults to the one the router picks
+    :return: A tuple of the content type and a generator of lines
+    """
+    columns, rows = DATASETS[dataset]
+    content_type, render = FORMATS[export_format]
+    return content_type, render(columns, rows(chunk_size, using))
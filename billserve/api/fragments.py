@@ -0,0 +1,57 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+from billserve.api.generation import current_rebuild_generation
+
+FRAGMENT_KEY_PREFIX = 'api:fragment'
+
+
+def fragment_key(name, variant, pk, version):
+    """
+    Builds the cache key of one object's serialized fragment.
+    :param name: The name of the fragment's shape, such as 'bill-short'
+    :param variant: A digest of whatever else the fragment depends on, such as the host its URLs point at
+    :param pk: The primary key of the object
+    :param version: The version of the object the fragment was rendered from
+    :return: The cache key
+    """
+    return '{prefix}:{name}:{variant}:{pk}:{version}'.format(prefix=FRAGMENT_KEY_PREFIX, name=name, variant=variant,
+                                                             pk=pk, version=version)
+
+
+def variant_digest(*parts):
+    """
+    :param parts: Strings a fragment depends on
+    :return: A short digest of the strings
+    """
+    return hashlib.md5('|'.join(parts).encode('utf-8')).hexdigest()[:12]
+
+
+def assemble(name, variant, versions, represent_missing):
+    """
+    Assembles a list of fragments from the cache with one get_many, rendering and caching only the missing ones. Each
+    fragment is versioned by its object's version and the rebuild generation, so no fragment outlives a change to the
+    data it was rendered from, while fragments of objects ingest didn't touch are still reused during a crawl.
+    :param name: The name of the fragments' shape
+    :param variant: See fragment_key()
+    :param versions: A list of (primary key, version) tuples, in output order
+    :param represent_missing: A function from a list of primary keys to a dictionary from each primary key to its
+    fragment. Objects that no longer exist may be left out
+    :return: The list of fragments, in the order of versions
+    """
+    generation = current_rebuild_generation()
+    keys = [(pk, fragment_key(name, variant, pk, '{generation}-{version}'.format(generation=generation,
+                                                                                 version=version)))
+            for pk, version in versions]
+    fragments = cache.get_many([key for _, key in keys])
+
+    missing = [(pk, key) for pk, key in keys if key not in fragments]
+    if missing:
+        represented = represent_missing([pk for pk, _ in missing])
+        rendered = {key: represented[pk] for pk, key in missing if pk in represented}
+        cache.set_many(rendered, settings.API_FRAGMENT_CACHE_TIMEOUT)
+        fragments.update(rendered)
+
+    return [fragments[key] for _, key in keys if key in fragments]
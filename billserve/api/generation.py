@@ -0,0 +1,62 @@
+from django.core.cache import cache
+from django.utils import timezone
+
+GENERATION_KEY = 'api:ingest-generation'
+CHANGED_AT_KEY = 'api:ingest-generation-changed-at'
+REBUILD_GENERATION_KEY = 'api:rebuild-generation'
+
+
+def increment(key):
+    """
+    Increments a counter kept without expiry, starting it at 0 if it's missing, such as after the cache was flushed.
+    :param key: The key of the counter
+    :return: The incremented counter
+    """
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        return cache.incr(key)
+
+
+def current_generation():
+    """
+    Returns the ingest generation: a counter bumped whenever ingest or a rebuild changes the data. In-process indexes
+    compare it with the generation they were built at to know when to refresh.
+    :return: The current generation
+    """
+    return cache.get_or_set(GENERATION_KEY, 0, timeout=None)
+
+
+def bump_generation():
+    """
+    Advances the ingest generation, invalidating every in-process index built at an earlier one.
+    :return: The new generation
+    """
+    generation = increment(GENERATION_KEY)
+    cache.set(CHANGED_AT_KEY, timezone.now(), timeout=None)
+    return generation
+
+
+def generation_changed_at():
+    """
+    :return: When the ingest generation was last bumped, or None if it never has been
+    """
+    return cache.get(CHANGED_AT_KEY)
+
+
+def current_rebuild_generation():
+    """
+    Returns the rebuild generation: a counter only rebuilds bump. Caches of objects that ingest versions by their
+    last modification time compare it too, since rebuilds change objects, such as their scores, without touching it.
+    :return: The current rebuild generation
+    """
+    return cache.get_or_set(REBUILD_GENERATION_KEY, 0, timeout=None)
+
+
+def bump_rebuild_generation():
+    """
+    Advances the rebuild generation.
+    :return: The new rebuild generation
+    """
+    return increment(REBUILD_GENERATION_KEY)
@@ -1,10 +1,31 @@
-from django.db.models import Manager
+from django.db import transaction
+from django.db.models import Manager, Q, F, OuterRef, Subquery, Prefetch, Count
+from django.db.models.functions import Coalesce
+from django.contrib.postgres.search import SearchVector, SearchRank
 import datetime
+import math
+import operator
 from pytz import utc
+from django.utils import timezone
 from billserve.api.networking.client import GovinfoClient
 from billserve.api.chains import RelatedBillChain
 from polymorphic.managers import PolymorphicManager
-from itertools import chain
+from functools import reduce
+import numpy as np
+
+PARTY_COLORS = {'R': 'red', 'D': 'blue', 'I': 'white'}
+
+
+def count_subquery(queryset, field):
+    """
+    Counts rows per outer row in a subquery, which unlike joined Counts doesn't multiply rows when several collections
+    are counted at once.
+    :param queryset: The rows to count, filtered on field=OuterRef('pk')
+    :param field: The name of the field referencing the outer row
+    :return: An expression evaluating to the number of rows, 0 if there are none
+    """
+    counts = queryset.order_by().values(field).annotate(count=Count('*')).values('count')
+    return Coalesce(Subquery(counts), 0)
 
 
 def fix_name(n):
@@ -28,6 +49,24 @@ def format_date(string, date_format):
     return datetime.datetime.strptime(string, date_format).astimezone(utc)
 
 
+def legislator_parties(legislator_pks=None):
+    """
+    Maps legislators to their party abbreviation. Parties live on the Senator and Representative subclasses, so both
+    tables are read with one flat query each instead of resolving every polymorphic legislator instance.
+    :param legislator_pks: An optional iterable of legislator primary keys to restrict the lookup to
+    :return: A dictionary mapping legislator primary keys to party abbreviations ('R', 'D', 'I')
+    """
+    from billserve.api.models import Senator, Representative
+
+    parties = {}
+    for model in (Senator, Representative):
+        queryset = model.objects.all()
+        if legislator_pks is not None:
+            queryset = queryset.filter(pk__in=legislator_pks)
+        parties.update(queryset.values_list('pk', 'party__abbreviation'))
+    return parties
+
+
 class LegislatorManager(PolymorphicManager):
     def get_or_create_from_dict(self, data):
         """
@@ -61,6 +100,51 @@ class LegislatorManager(PolymorphicManager):
 
         return legislator
 
+    def update_bipartisanship_scores(self, snapshot=None):
+        """
+        Recomputes and stores every legislator's bipartisanship score in one batch.
+        :param snapshot: An optional SponsorshipSnapshot to score from. A fresh one is built if none is given
+        """
+        from billserve.api.analytics import SponsorshipSnapshot
+
+        snapshot = snapshot or SponsorshipSnapshot.build()
+        scores = snapshot.legislator_bipartisanship_scores()
+        legislators = [self.model(pk=int(pk), bipartisanship_score=None if math.isnan(score) else float(score))
+                       for pk, score in zip(snapshot.legislator_pks, scores)]
+        self.non_polymorphic().bulk_update(legislators, ['bipartisanship_score'], batch_size=1000)
+
+    def with_bills(self, expanded=('sponsored_bills', 'cosponsored_bills')):
+        """
+        Loads everything the senator and representative detail serializers read: party, state, committees, and
+        sponsored and cosponsored bills along with their policy areas. Bill collections that aren't expanded are only
+        counted, in subqueries annotated as sponsored_bills_count and cosponsored_bills_count. Only valid on the
+        Senator and Representative managers, since the base legislator has no party or state.
+        :param expanded: The names of the bill collections to prefetch
+        :return: A queryset of legislators with their relations selected and prefetched
+        """
+        from billserve.api.models import Bill, Cosponsorship
+
+        bills = Bill.objects.select_related('policy_area')
+        queryset = self.select_related('party', 'state').prefetch_related('committees')
+        rows = {'sponsored_bills': Bill.sponsors.through.objects.filter(legislator=OuterRef('pk')),
+                'cosponsored_bills': Cosponsorship.objects.filter(legislator=OuterRef('pk'))}
+        for name, through_rows in rows.items():
+            if name in expanded:
+                queryset = queryset.prefetch_related(Prefetch(name, queryset=bills))
+            else:
+                queryset = queryset.annotate(**{name + '_count': count_subquery(through_rows, 'legislator')})
+        return queryset
+
+    def lookup(self, query_string):
+        """
+        Fuzzily matches a name typed by a user, such as 'schumer', for type-ahead.
+        :param query_string: The text typed by the user
+        :return: The matching legislators annotated with a score, best matches first
+        """
+        from billserve.api.search import trigram_lookup
+
+        return trigram_lookup(self.all(), ['first_name', 'last_name'], query_string)
+
 
 class BillManager(Manager):
     def create_from_dict(self, data):
@@ -74,13 +158,16 @@ class BillManager(Manager):
 
         url = data['url']
         bill = self.create(bill_url=url)
+        # Family ids are only ever written with update(), see add_related_bill(), as merges of this bill's family run
+        # in other tasks while it's being created
+        self.filter(pk=bill.pk, family_id__isnull=True).update(family_id=bill.pk)
 
         bill.type = data['billType']
         bill.bill_number = int(data['billNumber'])
         bill.title = data['title']
         bill.congress = int(data['congress'])
         bill.introduction_date = format_date(data['introducedDate'], Bill.introduction_date_format)
-        bill.save()
+        bill.save(update_fields=['type', 'bill_number', 'title', 'congress', 'introduction_date'])
 
         if 'policyArea' in data:
             policy_area_data = data['policyArea']
@@ -125,7 +212,8 @@ class BillManager(Manager):
         # for action_data in data['actions']:
         #     Action.objects.get_or_create_from_dict(action_data, bill.pk)
 
-        bill.save()
+        bill.last_modified = timezone.now()
+        bill.save(update_fields=['policy_area', 'last_modified'])
 
         return bill
 
@@ -142,18 +230,103 @@ class BillManager(Manager):
         bill = Bill.objects.get(pk=bill_pk)
 
         related_bill.related_bills.add(bill)
-        related_bill.save()
+        related_bill.last_modified = timezone.now()
+        related_bill.save(update_fields=['last_modified'])
 
         bill.related_bills.add(related_bill)
-        bill.save()
+        bill.last_modified = timezone.now()
+        bill.save(update_fields=['last_modified'])
+
+        # Union the two bills' families, keeping the lowest primary key as the family id. Every row of both families is
+        # locked first, re-reading the bills' family ids until a merge running alongside can no longer change them.
+        pks = [bill.pk, related_bill.pk]
+        with transaction.atomic():
+            family_ids = set()
+            while True:
+                locked = Bill.objects.select_for_update().filter(Q(family_id__in=family_ids) | Q(pk__in=pks))
+                rows = dict(locked.values_list('pk', 'family_id'))
+                bill_family_ids = {rows[pk] or pk for pk in pks}
+                if bill_family_ids <= family_ids:
+                    break
+                family_ids |= bill_family_ids
+
+            Bill.objects.filter(Q(family_id__in=family_ids) | Q(pk__in=pks)).update(family_id=min(family_ids))
+
+    def rebuild_families(self):
+        """
+        Recomputes every bill's family id from the connected components of the related bill graph.
+        """
+        from billserve.api.models import Bill
+        from billserve.api.analytics import connected_components
+
+        bill_pks = list(self.order_by('pk').values_list('pk', flat=True))
+        indices = {pk: i for i, pk in enumerate(bill_pks)}
+        pairs = ((indices[from_pk], indices[to_pk]) for from_pk, to_pk
+                 in Bill.related_bills.through.objects.values_list('from_bill', 'to_bill'))
+        roots = connected_components(len(bill_pks), pairs)
+
+        bills = [self.model(pk=pk, family_id=bill_pks[root]) for pk, root in zip(bill_pks, roots)]
+        self.bulk_update(bills, ['family_id'], batch_size=1000)
+
+    def update_bipartisanship_scores(self, snapshot=None):
+        """
+        Recomputes and stores every bill's bipartisanship score in one batch.
+        :param snapshot: An optional SponsorshipSnapshot to score from. A fresh one is built if none is given
+        """
+        from billserve.api.analytics import SponsorshipSnapshot
+
+        snapshot = snapshot or SponsorshipSnapshot.build()
+        scores = snapshot.bill_bipartisanship_scores()
+        bills = [self.model(pk=int(pk), bipartisanship_score=None if math.isnan(score) else float(score))
+                 for pk, score in zip(snapshot.bill_pks, scores)]
+        self.bulk_update(bills, ['bipartisanship_score'], batch_size=1000)
+
+    def update_search_vectors(self, bill_pks=None):
+        """
+        Rebuilds the full-text search vectors of bills from their titles, weighted highest, and their latest summaries.
+        :param bill_pks: The primary keys of the bills to update. Every bill is updated if None
+        """
+        from billserve.api.models import BillSummary
+        from billserve.api.search import SEARCH_CONFIG
+
+        latest_summary = BillSummary.objects.filter(bill=OuterRef('pk')).order_by('-action_date', '-pk').values('text')
+        bills = self.all() if bill_pks is None else self.filter(pk__in=bill_pks)
+        bills.update(search_vector=SearchVector('title', weight='A', config=SEARCH_CONFIG) +
+                     SearchVector(Subquery(latest_summary[:1]), weight='B', config=SEARCH_CONFIG))
+
+    def search(self, query_string):
+        """
+        Finds the bills matching a full-text query, best matches first, annotated with their rank and a highlighted
+        headline of their latest summary, or of their title if they have no summary.
+        :param query_string: Free text typed by a user, such as 'student loan forgiveness'
+        :return: A queryset of the matching bills
+        """
+        from billserve.api.models import BillSummary
+        from billserve.api.search import Headline, search_query
+
+        query = search_query(query_string)
+        latest_summary = BillSummary.objects.filter(bill=OuterRef('pk')).order_by('-action_date', '-pk').values('text')
+        return self.filter(search_vector=query)\
+            .annotate(rank=SearchRank(F('search_vector'), query),
+                      headline=Headline(Coalesce(Subquery(latest_summary[:1]), 'title'), query))\
+            .order_by('-rank', 'pk')
 
     @staticmethod
-    def bulk_create_bills_from_origin(origin_url):
+    def bulk_create_bills_from_origin(origin_url, callback=None):
+        """
+        Populates every bill listed from an origin URL in its own task.
+        :param origin_url: The URL to list bills from
+        :param callback: An optional signature, or its dictionary form, to run once every bill has been populated
+        """
+        from celery import chord, group, signature
         from billserve.api.tasks import populate_bill
 
         bill_urls = GovinfoClient.create_bill_url_list_from_origin(origin_url)
-        for bill_url in bill_urls:
-            populate_bill.delay(bill_url)
+        populated = [populate_bill.si(bill_url) for bill_url in bill_urls]
+        if callback is None:
+            group(populated).apply_async()
+        else:
+            chord(populated)(signature(callback))
 
 
 class BillSummaryManager(Manager):
@@ -210,6 +383,16 @@ class PolicyAreaManager(Manager):
             return None
         return self.get_or_create(name=name)
 
+    def lookup(self, query_string):
+        """
+        Fuzzily matches a name typed by a user, such as 'health', for type-ahead.
+        :param query_string: The text typed by the user
+        :return: The matching policy areas annotated with a score, best matches first
+        """
+        from billserve.api.search import trigram_lookup
+
+        return trigram_lookup(self.all(), ['name'], query_string)
+
 
 class LegislativeSubjectManager(Manager):
     def get_or_create_from_dict(self, data):
@@ -224,6 +407,16 @@ class LegislativeSubjectManager(Manager):
             return None
         return self.get_or_create(name=name)
 
+    def lookup(self, query_string):
+        """
+        Fuzzily matches a name typed by a user, such as 'health care', for type-ahead.
+        :param query_string: The text typed by the user
+        :return: The matching legislative subjects annotated with a score, best matches first
+        """
+        from billserve.api.search import trigram_lookup
+
+        return trigram_lookup(self.all(), ['name'], query_string)
+
 
 class ActionManager(Manager):
     def get_or_create_from_dict(self, data, bill_pk):
@@ -285,27 +478,207 @@ class CosponsorshipManager(Manager):
 
 
 class LegislativeSubjectSupportSplitManager(Manager):
-    def rebuild(self):
+    def rebuild(self, snapshot=None):
         """
         Destroys and then rebuilds all legislative subject support split objects.
+        :param snapshot: An optional SponsorshipSnapshot to count from. A fresh one is built if none is given
+        """
+        from billserve.api.models import LegislativeSubject, Party
+        from billserve.api.analytics import SponsorshipSnapshot
+
+        snapshot = snapshot or SponsorshipSnapshot.build()
+        party_colors = {pk: PARTY_COLORS.get(abbreviation)
+                        for pk, abbreviation in Party.objects.values_list('pk', 'abbreviation')}
+        party_counts_by_subject = snapshot.party_counts_by_subject()
+
+        self.all().delete()
+
+        # Subjects without bills aren't in the snapshot, but still get a support split with every count at zero.
+        support_splits = []
+        for legislative_subject_pk in LegislativeSubject.objects.values_list('pk', flat=True):
+            support_split = self.model(legislative_subject_id=legislative_subject_pk)
+            for party_pk, count in enumerate(party_counts_by_subject.get(legislative_subject_pk, ())):
+                color = party_colors.get(party_pk)
+                if color is not None:
+                    setattr(support_split, '{color}_count'.format(color=color), int(count))
+            support_splits.append(support_split)
+        self.bulk_create(support_splits)
+
+
+class PolicyAreaPartySplitManager(Manager):
+    def refresh_for_bills(self, bill_pks):
+        """
+        Recounts every (policy area, congress, month) rollup touched by the given bills. Touched rollups are recounted
+        from scratch, so refreshing is idempotent and cheap enough to run after every ingested bill.
+        :param bill_pks: The primary keys of the bills that were just created or changed
+        """
+        from billserve.api.models import Bill
+
+        keys = set()
+        for policy_area_pk, congress, introduction_date in Bill.objects.filter(pk__in=bill_pks).values_list(
+                'policy_area', 'congress', 'introduction_date'):
+            if policy_area_pk is not None and congress is not None and introduction_date is not None:
+                keys.add((policy_area_pk, congress, introduction_date.replace(day=1)))
+
+        if not keys:
+            return
+
+        bills = Bill.objects.filter(reduce(operator.or_, (
+            Q(policy_area=policy_area_pk, congress=congress, introduction_date__year=month.year,
+              introduction_date__month=month.month) for policy_area_pk, congress, month in keys)))
+        tallies = self.tally(bills)
+
+        for policy_area_pk, congress, month in keys:
+            counts = tallies.get((policy_area_pk, congress, month), self.empty_counts())
+            self.update_or_create(policy_area_id=policy_area_pk, congress=congress, month=month, defaults=counts)
+
+    def rebuild(self):
+        """
+        Destroys and then rebuilds all policy area party splits in a single pass over bills and their sponsorships.
         """
-        from billserve.api.models import LegislativeSubject, LegislativeSubjectSupportSplit
+        from billserve.api.models import Bill
+
+        self.all().delete()
+
+        tallies = self.tally(Bill.objects.all())
+        self.bulk_create(self.model(policy_area_id=policy_area_pk, congress=congress, month=month, **counts)
+                         for (policy_area_pk, congress, month), counts in tallies.items())
+
+    @staticmethod
+    def empty_counts():
+        """
+        Creates a zeroed set of counts for a single rollup.
+        :return: A dictionary mapping each count field of a policy area party split to zero
+        """
+        counts = {'bill_count': 0}
+        for role in ('sponsor', 'cosponsor'):
+            for color in PARTY_COLORS.values():
+                counts['{role}_{color}_count'.format(role=role, color=color)] = 0
+        return counts
+
+    @staticmethod
+    def tally(bills):
+        """
+        Counts bills and the parties of their sponsors and cosponsors, grouped by policy area, congress and month.
+        :param bills: A queryset of the bills to count
+        :return: A dictionary mapping (policy area pk, congress, month) keys to dictionaries of counts
+        """
+        from billserve.api.models import Bill, Cosponsorship
+
+        bills = bills.filter(policy_area__isnull=False, congress__isnull=False, introduction_date__isnull=False)
+        bill_keys = {pk: (policy_area_pk, congress, introduction_date.replace(day=1))
+                     for pk, policy_area_pk, congress, introduction_date
+                     in bills.values_list('pk', 'policy_area', 'congress', 'introduction_date')}
+
+        tallies = {}
+        for key in bill_keys.values():
+            counts = tallies.setdefault(key, PolicyAreaPartySplitManager.empty_counts())
+            counts['bill_count'] += 1
+
+        edges = {
+            'sponsor': list(Bill.sponsors.through.objects.filter(bill__in=bills.values('pk'))
+                            .values_list('bill', 'legislator')),
+            'cosponsor': list(Cosponsorship.objects.filter(bill__in=bills.values('pk'))
+                              .values_list('bill', 'legislator'))
+        }
+        legislator_pks = {legislator_pk for role_edges in edges.values() for _, legislator_pk in role_edges}
+        parties = legislator_parties(legislator_pks)
+
+        for role, role_edges in edges.items():
+            for bill_pk, legislator_pk in role_edges:
+                color = PARTY_COLORS.get(parties.get(legislator_pk))
+                if bill_pk in bill_keys and color is not None:
+                    tallies[bill_keys[bill_pk]]['{role}_{color}_count'.format(role=role, color=color)] += 1
+
+        return tallies
+
+
+class LegislatorCollaborationManager(Manager):
+    def rebuild(self, snapshot=None, count=10):
+        """
+        Destroys and then rebuilds every legislator's top collaborators for each congress.
+        :param snapshot: An optional SponsorshipSnapshot to count from. A fresh one is built if none is given
+        :param count: The number of collaborators to keep per legislator and congress
+        """
+        from billserve.api.analytics import SponsorshipSnapshot
 
-        independent_party_pk = 1
-        democratic_party_pk = 2
-        republican_party_pk = 3
+        snapshot = snapshot or SponsorshipSnapshot.build()
 
         self.all().delete()
 
-        for legislative_subject in LegislativeSubject.objects.all():
-            legislative_subject_support_split = LegislativeSubjectSupportSplit(legislative_subject=legislative_subject)
-            for bill in legislative_subject.bills.all():
-                legislators = list(chain(bill.sponsors.all(), bill.cosponsors.all()))
-                for legislator in legislators:
-                    if legislator.party.pk == independent_party_pk:
-                        legislative_subject_support_split.white_count += 1
-                    elif legislator.party.pk == democratic_party_pk:
-                        legislative_subject_support_split.blue_count += 1
-                    elif legislator.party.pk == republican_party_pk:
-                        legislative_subject_support_split.red_count += 1
-            legislative_subject_support_split.save()
+        for congress in snapshot.congresses():
+            self.bulk_create(
+                self.model(legislator_id=legislator_pk, collaborator_id=collaborator_pk, congress=int(congress),
+                           shared_bill_count=shared_bill_count)
+                for legislator_pk, collaborator_pk, shared_bill_count
+                in snapshot.top_collaborators(congress, count))
+
+
+class BillSignatureManager(Manager):
+    def index_bills(self, bill_pks=None):
+        """
+        Computes and stores the MinHash signatures and LSH bands of bills, replacing any existing ones.
+        :param bill_pks: The primary keys of the bills to index. Every bill is indexed if None
+        """
+        from billserve.api.models import Bill, Cosponsorship, BillSignatureBand
+        from billserve.api import similarity
+
+        bills = Bill.objects.all() if bill_pks is None else Bill.objects.filter(pk__in=bill_pks)
+        subjects, cosponsors = {}, {}
+        for bill_pk in bills.values_list('pk', flat=True):
+            subjects[bill_pk], cosponsors[bill_pk] = [], []
+        for bill_pk, subject_pk in Bill.legislative_subjects.through.objects.filter(bill__in=bills.values('pk'))\
+                .values_list('bill', 'legislativesubject'):
+            subjects[bill_pk].append(subject_pk)
+        for bill_pk, legislator_pk in Cosponsorship.objects.filter(bill__in=bills.values('pk'))\
+                .values_list('bill', 'legislator'):
+            cosponsors[bill_pk].append(legislator_pk)
+
+        signatures, signature_bands = [], []
+        for bill_pk in subjects:
+            bill_signature = similarity.signature(subjects[bill_pk], cosponsors[bill_pk])
+            signatures.append(self.model(bill_id=bill_pk, minhash=similarity.to_bytes(bill_signature)))
+            signature_bands.extend(BillSignatureBand(bill_id=bill_pk, band=band, bucket=bucket)
+                                   for band, bucket in similarity.bands(bill_signature))
+
+        # Replaced together, so similar_bills() never reads bills whose signatures are missing or half written.
+        with transaction.atomic():
+            self.filter(bill__in=bills.values('pk')).delete()
+            BillSignatureBand.objects.filter(bill__in=bills.values('pk')).delete()
+            self.bulk_create(signatures, batch_size=1000)
+            BillSignatureBand.objects.bulk_create(signature_bands, batch_size=1000)
+
+    def similar_bills(self, bill_pk, count=10):
+        """
+        Finds the bills most similar to a bill. Candidates are the bills sharing an LSH bucket with it, which are then
+        ranked by the similarity estimated from their signatures.
+        :param bill_pk: The primary key of the bill
+        :param count: The number of similar bills to return
+        :return: A list of (bill pk, similarity) tuples, most similar first
+        """
+        from billserve.api.models import BillSignatureBand
+        from billserve.api import similarity
+
+        try:
+            bill_signature = similarity.from_bytes(self.get(bill=bill_pk).minhash)
+        except self.model.DoesNotExist:
+            return []
+
+        bands = similarity.bands(bill_signature)
+        if not bands:
+            return []
+
+        candidates = BillSignatureBand.objects.filter(
+            reduce(operator.or_, (Q(band=band, bucket=bucket) for band, bucket in bands)))\
+            .exclude(bill=bill_pk).values('bill').distinct()
+        candidate_pks, candidate_signatures = [], []
+        for candidate_pk, minhash in self.filter(bill__in=candidates).values_list('bill', 'minhash'):
+            candidate_pks.append(candidate_pk)
+            candidate_signatures.append(similarity.from_bytes(minhash))
+
+        if not candidate_pks:
+            return []
+
+        scores = similarity.similarity(bill_signature, np.vstack(candidate_signatures))
+        ranking = np.lexsort((candidate_pks, -scores))[:count]
+        return [(candidate_pks[i], float(scores[i])) for i in ranking]
@@ -0,0 +1,35 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PolicyAreaPartySplit',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('congress', models.IntegerField()),
+                ('month', models.DateField()),
+                ('bill_count', models.IntegerField(default=0)),
+                ('sponsor_red_count', models.IntegerField(default=0)),
+                ('sponsor_blue_count', models.IntegerField(default=0)),
+                ('sponsor_white_count', models.IntegerField(default=0)),
+                ('cosponsor_red_count', models.IntegerField(default=0)),
+                ('cosponsor_blue_count', models.IntegerField(default=0)),
+                ('cosponsor_white_count', models.IntegerField(default=0)),
+                ('policy_area', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='party_splits', to='api.PolicyArea')),
+            ],
+            options={
+                'ordering': ('policy_area', 'congress', 'month'),
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='policyareapartysplit',
+            unique_together={('policy_area', 'congress', 'month')},
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_policyareapartysplit'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LegislatorCollaboration',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('congress', models.IntegerField()),
+                ('shared_bill_count', models.IntegerField(default=0)),
+                ('collaborator', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.Legislator')),
+                ('legislator', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='collaborations', to='api.Legislator')),
+            ],
+            options={
+                'ordering': ('legislator', 'congress', '-shared_bill_count'),
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='legislatorcollaboration',
+            unique_together={('legislator', 'congress', 'collaborator')},
+        ),
+    ]
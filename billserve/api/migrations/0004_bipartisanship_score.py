@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_legislatorcollaboration'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bill',
+            name='bipartisanship_score',
+            field=models.FloatField(db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='legislator',
+            name='bipartisanship_score',
+            field=models.FloatField(db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_bipartisanship_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bill',
+            name='family_id',
+            field=models.IntegerField(db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_bill_family_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BillSignature',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('minhash', models.BinaryField()),
+                ('bill', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='signature', to='api.Bill')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BillSignatureBand',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.SmallIntegerField()),
+                ('bucket', models.BigIntegerField()),
+                ('bill', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='signature_bands', to='api.Bill')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='billsignatureband',
+            index=models.Index(fields=['band', 'bucket'], name='api_billsig_band_f196ce_idx'),
+        ),
+    ]
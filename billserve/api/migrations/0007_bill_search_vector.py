@@ -0,0 +1,22 @@
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_billsignature'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bill',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(null=True),
+        ),
+        migrations.AddIndex(
+            model_name='bill',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='api_bill_search__f36eea_gin'),
+        ),
+    ]
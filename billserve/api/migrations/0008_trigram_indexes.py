@@ -0,0 +1,27 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# gin_trgm_ops indexes back the fuzzy name lookups. They're created here rather than in the models' Meta because
+# their operator class only exists once pg_trgm is installed.
+TRIGRAM_INDEXES = [
+    ('api_legislator_first_name_trgm', 'api_legislator', 'first_name'),
+    ('api_legislator_last_name_trgm', 'api_legislator', 'last_name'),
+    ('api_legislativesubject_name_trgm', 'api_legislativesubject', 'name'),
+    ('api_policyarea_name_trgm', 'api_policyarea', 'name'),
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_bill_search_vector'),
+    ]
+
+    operations = [TrigramExtension()] + [
+        migrations.RunSQL(
+            'CREATE INDEX {name} ON {table} USING gin ({column} gin_trgm_ops);'.format(
+                name=name, table=table, column=column),
+            reverse_sql='DROP INDEX {name};'.format(name=name),
+        )
+        for name, table, column in TRIGRAM_INDEXES
+    ]
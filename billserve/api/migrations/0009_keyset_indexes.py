@@ -0,0 +1,33 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(fields=['introduction_date', 'id'], name='api_bill_introdu_9db350_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(fields=['bipartisanship_score', 'id'], name='api_bill_biparti_289910_idx'),
+        ),
+        # Superseded by the index above
+        migrations.AlterField(
+            model_name='bill',
+            name='bipartisanship_score',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddIndex(
+            model_name='legislator',
+            index=models.Index(fields=['last_name', 'id'], name='api_legisla_last_na_2811ee_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='legislativesubject',
+            index=models.Index(fields=['name', 'id'], name='api_legisla_name_b2ad7e_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(fields=['congress', 'introduction_date', 'id'], name='api_bill_congres_ce5626_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(fields=['congress', 'type', 'introduction_date', 'id'],
+                               name='api_bill_congres_7ab935_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(fields=['policy_area', 'introduction_date', 'id'], name='api_bill_policy__9804b2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(condition=models.Q(cbo_cost_estimate__isnull=False), fields=['introduction_date', 'id'],
+                               name='api_bill_with_cbo_idx'),
+        ),
+    ]
@@ -1,8 +1,11 @@
 from django.db.models import Model
-from django.db.models import CharField, BooleanField, DateTimeField, DateField, IntegerField, TextField, URLField
+from django.db.models import CharField, BooleanField, DateTimeField, DateField, IntegerField, TextField, URLField, \
+    FloatField, BinaryField, SmallIntegerField, BigIntegerField, Index
 from django.db.models import ForeignKey, OneToOneField, ManyToManyField
 from django.db.models import CASCADE, SET_NULL
-from django.db.models import Sum, Case, When
+from django.db.models import Sum, Case, When, Q
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from polymorphic.models import PolymorphicModel
 from billserve.api.managers import *
 
@@ -39,6 +42,14 @@ class Legislator(PolymorphicModel):
     first_name = CharField(max_length=100)
     last_name = CharField(max_length=100)
 
+    # Share of this legislator's cosponsorships on bills sponsored by another party. Computed in batch after ingest.
+    # Legislators are never paged by score, so the single column index stays for score lookups and is cheap to
+    # maintain over a few hundred rows.
+    bipartisanship_score = FloatField(null=True, db_index=True)
+
+    class Meta(PolymorphicModel.Meta):
+        indexes = [Index(fields=['last_name', 'id'])]
+
     def full_name(self):
         return '{first_name} {last_name}'.format(first_name=self.first_name, last_name=self.last_name)
 
@@ -71,6 +82,47 @@ class LegislativeSubjectSupportSplit(Model):
                     wc=self.white_count)
 
 
+class PolicyAreaPartySplit(Model):
+    objects = PolicyAreaPartySplitManager()
+
+    policy_area = ForeignKey('PolicyArea', related_name='party_splits', on_delete=CASCADE)
+    congress = IntegerField()
+    month = DateField()  # The first day of the month the rolled up bills were introduced in
+    bill_count = IntegerField(default=0)
+    sponsor_red_count = IntegerField(default=0)
+    sponsor_blue_count = IntegerField(default=0)
+    sponsor_white_count = IntegerField(default=0)
+    cosponsor_red_count = IntegerField(default=0)
+    cosponsor_blue_count = IntegerField(default=0)
+    cosponsor_white_count = IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('policy_area', 'congress', 'month')
+        ordering = ('policy_area', 'congress', 'month')
+
+    def __str__(self):
+        return '{policy_area} ({congress}, {month:%Y-%m})'.format(policy_area=self.policy_area,
+                                                                  congress=self.congress, month=self.month)
+
+
+class LegislatorCollaboration(Model):
+    objects = LegislatorCollaborationManager()
+
+    legislator = ForeignKey('Legislator', related_name='collaborations', on_delete=CASCADE)
+    collaborator = ForeignKey('Legislator', related_name='+', on_delete=CASCADE)
+    congress = IntegerField()
+    shared_bill_count = IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('legislator', 'congress', 'collaborator')
+        ordering = ('legislator', 'congress', '-shared_bill_count')
+
+    def __str__(self):
+        return '{legislator} - {collaborator} ({congress}): {count}'.format(
+            legislator=self.legislator, collaborator=self.collaborator, congress=self.congress,
+            count=self.shared_bill_count)
+
+
 class Senator(Legislator):
     party = ForeignKey('Party', related_name='senators', on_delete=SET_NULL, null=True)
     legislative_body = ForeignKey('Chamber', related_name='senators', on_delete=SET_NULL, null=True)
@@ -126,9 +178,34 @@ class Bill(Model):
     cbo_cost_estimate = URLField(null=True)  # If CBO cost estimate in bill_status
     bill_url = URLField()
 
+    # Weighted share of cross-party cosponsors. Computed in batch after ingest. Indexed together with id in Meta.
+    bipartisanship_score = FloatField(null=True)
+    # The lowest primary key among the bills connected to this one through related_bills.
+    family_id = IntegerField(null=True, db_index=True)
+    # Weighted full-text document of the title and the latest summary. Maintained by BillManager.update_search_vectors.
+    search_vector = SearchVectorField(null=True)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector']),
+            Index(fields=['introduction_date', 'id']),
+            Index(fields=['bipartisanship_score', 'id']),
+            # The bill list's filters, each leading an index in the list's default introduction date order
+            Index(fields=['congress', 'introduction_date', 'id']),
+            Index(fields=['congress', 'type', 'introduction_date', 'id']),
+            Index(fields=['policy_area', 'introduction_date', 'id']),
+            Index(fields=['introduction_date', 'id'], condition=Q(cbo_cost_estimate__isnull=False),
+                  name='api_bill_with_cbo_idx'),
+        ]
+
     def __str__(self):
         return 'No. {bill_number}: {title}'.format(bill_number=self.bill_number, title=self.title)
 
+    def family(self):
+        if self.family_id is None:
+            return Bill.objects.filter(pk=self.pk)
+        return Bill.objects.filter(family_id=self.family_id)
+
     def co_sponsor_count(self):
         return self.cosponsors.all().count()
 
@@ -136,6 +213,28 @@ class Bill(Model):
         return self.sponsors.all().count()
 
 
+class BillSignature(Model):
+    objects = BillSignatureManager()
+
+    bill = OneToOneField('Bill', related_name='signature', on_delete=CASCADE)
+    minhash = BinaryField()  # Packed MinHash signature of the bill's legislative subjects and cosponsors
+
+    def __str__(self):
+        return 'Signature of {bill}'.format(bill=self.bill)
+
+
+class BillSignatureBand(Model):
+    bill = ForeignKey('Bill', related_name='signature_bands', on_delete=CASCADE)
+    band = SmallIntegerField()
+    bucket = BigIntegerField()
+
+    class Meta:
+        indexes = [Index(fields=['band', 'bucket'])]
+
+    def __str__(self):
+        return '{bill}: band {band} bucket {bucket}'.format(bill=self.bill, band=self.band, bucket=self.bucket)
+
+
 class BillSummary(Model):
     members = ['name', 'actionDate', 'text', 'actionDesc']
     optional_members = []
@@ -185,6 +284,9 @@ class LegislativeSubject(Model):
 
     name = CharField(max_length=100)
 
+    class Meta:
+        indexes = [Index(fields=['name', 'id'])]
+
     def __str__(self):
         return self.name
 
@@ -1,8 +1,22 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import binascii
+import datetime
+import json
+from collections import OrderedDict
+
+import numpy as np
+from django.core.exceptions import ValidationError
+from django.db import connection
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 
 class StandardResultsSetPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
 
     def get_paginated_response(self, data):
         return Response({
@@ -10,3 +24,221 @@ class StandardResultsSetPagination(PageNumberPagination):
             'results': data,
             'page': self.page.number
         })
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only cursor pagination over a (key, id) ordering, such as ('introduction_date', 'id') or
+    ('-bipartisanship_score', '-id'). Each page continues strictly after the last row of the previous one with a row
+    comparison, so with a matching (key, id) index every page costs the same however deep it is. Neither COUNT nor
+    OFFSET is ever run. Rows whose key is null come after every other row, ordered by id.
+
+    Views declare their ordering as keyset_ordering, or compute it per request in get_keyset_ordering(). Views that
+    already hold the matching primary keys in order, such as from an in-memory index, hand them over from
+    get_keyset_candidates(), and only the page of rows after the cursor is read from the database.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    max_candidate_chunk_size = 5000
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Fetches the page of rows after the cursor in the request.
+        :param queryset: The filtered, unordered queryset to paginate
+        :param request: The request, possibly carrying ?cursor= and ?page_size=
+        :param view: The view, which declares the ordering
+        :return: The list of rows on the page
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.key, self.tiebreak = view.get_keyset_ordering() if hasattr(view, 'get_keyset_ordering') \
+            else view.keyset_ordering
+        self.descending = self.key.startswith('-')
+        self.key_name, self.tiebreak_name = self.key.lstrip('-'), self.tiebreak.lstrip('-')
+
+        key_field = queryset.model._meta.get_field(self.key_name)
+        position = self.decode_cursor(request, key_field)
+
+        self.next_position = None
+        candidates = view.get_keyset_candidates(self.key_name, self.descending) \
+            if hasattr(view, 'get_keyset_candidates') else None
+        if candidates is not None:
+            return self.paginate_candidates(queryset, candidates, key_field, position)
+
+        rows = []
+        if position is None or position[0] is not None:
+            keyed = queryset.filter(**{self.key_name + '__isnull': False}) if key_field.null else queryset
+            if position is not None:
+                keyed = self.after(keyed, position)
+            rows = list(keyed.order_by(self.key, self.tiebreak)[:self.page_size + 1])
+        if key_field.null and len(rows) <= self.page_size:
+            unkeyed = queryset.filter(**{self.key_name + '__isnull': True})
+            if position is not None and position[0] is None:
+                lookup = self.tiebreak_name + ('__lt' if self.descending else '__gt')
+                unkeyed = unkeyed.filter(**{lookup: position[1]})
+            rows += list(unkeyed.order_by(self.tiebreak)[:self.page_size + 1 - len(rows)])
+
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def paginate_candidates(self, queryset, candidates, key_field, position):
+        """
+        Fetches the page of rows after a position from candidates already in keyset order. Candidates are read by
+        primary key in chunks, starting at a page's worth and doubling, and those the queryset filters out are
+        skipped, so the database is never handed more than a few pages of primary keys however many candidates there
+        are.
+        :param queryset: The filtered, unordered queryset the rows are read from
+        :param candidates: A tuple of numpy arrays of the candidates' primary keys and their keys as numbers, see
+        key_number(), both in keyset order
+        :param key_field: The model field of the ordering key
+        :param position: The (key, id) of the last row already returned, or None
+        :return: The list of rows on the page
+        """
+        pks, keys = candidates
+        start = 0 if position is None else self.candidates_after(pks, keys, key_field, position)
+
+        rows, row_keys = [], []
+        chunk_size = self.page_size + 1
+        while start < len(pks) and len(rows) <= self.page_size:
+            chunk = pks[start:start + chunk_size].tolist()
+            found = {row['id'] if isinstance(row, dict) else row.pk: row for row in queryset.filter(pk__in=chunk)}
+            for pk, key in zip(chunk, keys[start:start + chunk_size].tolist()):
+                if pk in found:
+                    rows.append(found[pk])
+                    row_keys.append((key, pk))
+            start += chunk_size
+            chunk_size = min(chunk_size * 2, self.max_candidate_chunk_size)
+
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        if self.has_next:
+            key, pk = row_keys[self.page_size - 1]
+            self.next_position = (self.key_value(key_field, key), pk)
+        return self.page
+
+    def candidates_after(self, pks, keys, key_field, position):
+        """
+        :param pks: The candidates' primary keys, in keyset order
+        :param keys: The candidates' keys as numbers, NaN where they're null
+        :param key_field: The model field of the ordering key
+        :param position: The (key, id) of the last row already returned
+        :return: The index of the first candidate strictly after the position
+        """
+        key, tiebreak = position
+        nulls = np.isnan(keys)
+        if key is None:
+            after = nulls & ((pks < tiebreak) if self.descending else (pks > tiebreak))
+        else:
+            key = self.key_number(key_field, key)
+            if self.descending:
+                after = nulls | (keys < key) | ((keys == key) & (pks < tiebreak))
+            else:
+                after = nulls | (keys > key) | ((keys == key) & (pks > tiebreak))
+        return int(np.argmax(after)) if after.any() else len(pks)
+
+    @staticmethod
+    def key_number(key_field, key):
+        """
+        :param key_field: The model field of the ordering key
+        :param key: A key
+        :return: The key as a number that orders the same, the proleptic Gregorian ordinal of dates
+        """
+        if key_field.get_internal_type() == 'DateField':
+            return float(key.toordinal())
+        return float(key)
+
+    @staticmethod
+    def key_value(key_field, number):
+        """
+        :param key_field: The model field of the ordering key
+        :param number: A key as key_number() returns it
+        :return: The key
+        """
+        if number is None or np.isnan(number):
+            return None
+        if key_field.get_internal_type() == 'DateField':
+            return datetime.date.fromordinal(int(number))
+        return number
+
+    def after(self, queryset, position):
+        """
+        Restricts a queryset to the rows strictly after a position, as a single row comparison that a (key, id)
+        index can range scan.
+        :param queryset: The queryset of rows with a non-null key
+        :param position: The (key, id) of the last row already returned
+        :return: The restricted queryset
+        """
+        columns = []
+        for name in (self.key_name, self.tiebreak_name):
+            field = queryset.model._meta.get_field(name)
+            columns.append('{table}.{column}'.format(table=connection.ops.quote_name(field.model._meta.db_table),
+                                                     column=connection.ops.quote_name(field.column)))
+        where = '({key}, {tiebreak}) {operator} (%s, %s)'.format(key=columns[0], tiebreak=columns[1],
+                                                                 operator='<' if self.descending else '>')
+        return queryset.extra(where=[where], params=list(position))
+
+    def get_page_size(self, request):
+        """
+        :param request: The request, possibly carrying ?page_size=
+        :return: The requested page size, capped at max_page_size, or the default page size
+        """
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(page_size, self.max_page_size) if page_size > 0 else self.page_size
+
+    def decode_cursor(self, request, key_field):
+        """
+        :param request: The request, possibly carrying ?cursor=
+        :param key_field: The model field of the ordering key, used to validate the cursor's key
+        :return: The (key, id) position encoded in the cursor, or None on the first page
+        """
+        encoded = request.query_params.get(self.cursor_query_param, None)
+        if encoded is None:
+            return None
+        try:
+            key, tiebreak = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            return (None if key is None else key_field.to_python(key)), int(tiebreak)
+        except (binascii.Error, UnicodeError, ValueError, TypeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, row):
+        """
+        :param row: The last row on the page, a model instance or a values() dictionary
+        :return: A cursor pointing just after the row
+        """
+        key, tiebreak = (row[self.key_name], row[self.tiebreak_name]) if isinstance(row, dict) else \
+            (getattr(row, self.key_name), getattr(row, self.tiebreak_name))
+        return self.encode_position(key, tiebreak)
+
+    @staticmethod
+    def encode_position(key, tiebreak):
+        """
+        :param key: The key of the last row on the page
+        :param tiebreak: The id of the last row on the page
+        :return: A cursor pointing just after the row
+        """
+        position = [None if key is None else str(key) if not isinstance(key, (int, float)) else key, tiebreak]
+        return base64.urlsafe_b64encode(json.dumps(position).encode('utf-8')).decode('ascii')
+
+    def get_next_link(self):
+        """
+        :return: The URL of the next page, or None on the last page
+        """
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        cursor = self.encode_position(*self.next_position) if self.next_position is not None else \
+            self.encode_cursor(self.page[-1])
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
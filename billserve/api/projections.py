@@ -0,0 +1,261 @@
+from collections import OrderedDict
+
+from rest_framework.response import Response
+from rest_framework.reverse import reverse
+
+from billserve.api import fragments
+
+URL_SENTINEL = 918273645  # A primary key no real row has, substituted when reversing URL templates
+
+
+class Projection:
+    """
+    Renders rows read with values() exactly as a short serializer renders model instances, without instantiating
+    models or running DRF's field machinery. URLs are built from templates reversed once per request, not once per
+    field. Subclasses declare the lookups they read and must stay in step with the serializer they stand in for.
+
+    Projections that name a fragment_name cache each rendered row as a fragment, see fragments.assemble(). A page is
+    then read with only the page_lookups, which must cover the primary key, the version_lookup and any ordering, and
+    full rows are read only for the fragments missing from the cache.
+    """
+    lookups = ()
+    fragment_name = None
+    version_lookup = None
+    page_lookups = ()
+
+    def __init__(self, request, format=None):
+        """
+        :param request: The request, used to build absolute URLs the way hyperlinked serializers do
+        :param format: The format suffix of the request, which hyperlinked serializers carry into their URLs
+        """
+        self.request = request
+        self.format = format
+        self.url_templates = []
+
+    def url_template(self, view_name):
+        """
+        :param view_name: The name of a detail route taking a pk
+        :return: The (prefix, suffix) around the primary key in the route's absolute URLs
+        """
+        kwargs = {'pk': URL_SENTINEL}
+        if self.format:
+            kwargs['format'] = self.format
+        url = reverse(view_name, kwargs=kwargs, request=self.request)
+        prefix, suffix = url.split(str(URL_SENTINEL))
+        self.url_templates.append(url)
+        return prefix, suffix
+
+    def represent(self, row):
+        """
+        :param row: A dictionary with a value for each of the lookups
+        :return: The serialized row
+        """
+        raise NotImplementedError
+
+    def represent_all(self, rows):
+        """
+        :param rows: An iterable of dictionaries with a value for each of the lookups
+        :return: The list of serialized rows
+        """
+        return [self.represent(row) for row in rows]
+
+    def represent_fragments(self, rows, queryset):
+        """
+        Renders rows from cached fragments, reading and rendering only the rows whose fragments are missing.
+        :param rows: An iterable of dictionaries with a value for each of the page_lookups
+        :param queryset: A queryset the missing rows can be read from by primary key
+        :return: The list of serialized rows
+        """
+        def represent_missing(pks):
+            return {row['id']: self.represent(row) for row in queryset.filter(pk__in=pks).values(*self.lookups)}
+
+        variant = fragments.variant_digest(*self.url_templates)
+        return fragments.assemble(self.fragment_name, variant, [(row['id'], self.version(row)) for row in rows],
+                                  represent_missing)
+
+    def version(self, row):
+        """
+        :param row: A dictionary with a value for each of the page_lookups
+        :return: The version of the row's object, as a string safe in cache keys
+        """
+        version = row[self.version_lookup]
+        if hasattr(version, 'strftime'):
+            return version.strftime('%Y%m%d%H%M%S%f')
+        return str(version)
+
+
+def url(template, pk):
+    """
+    :param template: A (prefix, suffix) URL template
+    :param pk: The primary key to fill it in with
+    :return: The URL
+    """
+    return template[0] + str(pk) + template[1]
+
+
+class BillShortProjection(Projection):
+    """
+    Stands in for BillShortSerializer. Bills are versioned by their last modification time.
+    """
+    lookups = ('id', 'bill_number', 'title', 'introduction_date', 'bipartisanship_score', 'policy_area',
+               'policy_area__name')
+    fragment_name = 'bill-short'
+    version_lookup = 'last_modified'
+    page_lookups = ('id', 'last_modified', 'introduction_date', 'bipartisanship_score')
+
+    def __init__(self, request, format=None):
+        super().__init__(request, format)
+        self.bill_url, self.policy_area_url = self.url_template('bill-detail'), self.url_template('policyarea-detail')
+
+    def represent(self, row):
+        introduction_date, score = row['introduction_date'], row['bipartisanship_score']
+        policy_area = None
+        if row['policy_area'] is not None:
+            policy_area = OrderedDict([('name', row['policy_area__name']),
+                                       ('url', url(self.policy_area_url, row['policy_area']))])
+        return OrderedDict([
+            ('title', 'No. {bill_number}: {title}'.format(bill_number=row['bill_number'], title=row['title'])),
+            ('introduction_date', introduction_date.isoformat() if introduction_date else None),
+            ('policy_area', policy_area),
+            ('bipartisanship_score', None if score is None else float(score)),
+            ('url', url(self.bill_url, row['id'])),
+        ])
+
+
+class LegislatorShortProjection(Projection):
+    """
+    Shared by the senator and representative projections, which both nest a party and a state.
+    """
+    lookups = ('id', 'first_name', 'last_name', 'party', 'party__abbreviation', 'state', 'state__abbreviation')
+
+    def __init__(self, request, format=None):
+        super().__init__(request, format)
+        self.party_url, self.state_url = self.url_template('party-detail'), self.url_template('state-detail')
+
+    def related(self, row, name, field, template):
+        """
+        :param row: The row
+        :param name: The name of the related object's foreign key, such as 'party'
+        :param field: The related object's serialized field besides its URL, such as 'abbreviation'
+        :param template: The related object's URL template
+        :return: The serialized related object, or None
+        """
+        if row[name] is None:
+            return None
+        return OrderedDict([(field, row['{name}__{field}'.format(name=name, field=field)]),
+                            ('url', url(template, row[name]))])
+
+
+class SenatorShortProjection(LegislatorShortProjection):
+    """
+    Stands in for SenatorShortSerializer.
+    """
+    def __init__(self, request, format=None):
+        super().__init__(request, format)
+        self.senator_url = self.url_template('senator-detail')
+
+    def represent(self, row):
+        full_name = 'Sen. {first_name} {last_name} [{party}-{state}]'.format(
+            first_name=row['first_name'], last_name=row['last_name'], party=row['party__abbreviation'],
+            state=row['state__abbreviation'])
+        return OrderedDict([
+            ('full_name', full_name),
+            ('state', self.related(row, 'state', 'abbreviation', self.state_url)),
+            ('party', self.related(row, 'party', 'abbreviation', self.party_url)),
+            ('url', url(self.senator_url, row['id'])),
+        ])
+
+
+class RepresentativeShortProjection(LegislatorShortProjection):
+    """
+    Stands in for RepresentativeShortSerializer.
+    """
+    lookups = LegislatorShortProjection.lookups + ('district', 'district__number', 'district__state__abbreviation')
+
+    def __init__(self, request, format=None):
+        super().__init__(request, format)
+        self.representative_url, self.district_url = (self.url_template('representative-detail'),
+                                                      self.url_template('district-detail'))
+
+    def represent(self, row):
+        district = None
+        if row['district'] is not None:
+            district = '{state}-{number}'.format(state=row['district__state__abbreviation'],
+                                                 number=row['district__number'])
+        full_name = 'Rep. {first_name} {last_name} [{party}-{district}]'.format(
+            first_name=row['first_name'], last_name=row['last_name'], party=row['party__abbreviation'],
+            district=district)
+        return OrderedDict([
+            ('full_name', full_name),
+            ('party', self.related(row, 'party', 'abbreviation', self.party_url)),
+            ('state', self.related(row, 'state', 'abbreviation', self.state_url)),
+            ('district', self.related(row, 'district', 'number', self.district_url)),
+            ('url', url(self.representative_url, row['id'])),
+        ])
+
+
+def subclass_lookups(subclasses, parent_lookups):
+    """
+    Prefixes the lookups of subclass projections so they can be read through the parent model.
+    :param subclasses: A sequence of (subclass lookup name, projection class) tuples
+    :param parent_lookups: The lookups read on the parent model itself
+    :return: The subclass primary keys, each followed by the prefixed lookups of its projection
+    """
+    res = ()
+    for name, projection in subclasses:
+        res += (name,) + tuple('{name}__{lookup}'.format(name=name, lookup=lookup)
+                               for lookup in projection.lookups if lookup not in parent_lookups)
+    return res
+
+
+class LegislatorListProjection(Projection):
+    """
+    Stands in for LegislatorListSerializer. Senators and representatives are read in one query on the legislator
+    table, joined to both subclass tables, and each row is handed to the projection of its subclass.
+    """
+    legislator_lookups = ('id', 'first_name', 'last_name')
+    subclasses = (('representative', RepresentativeShortProjection), ('senator', SenatorShortProjection))
+    lookups = legislator_lookups + subclass_lookups(subclasses, legislator_lookups)
+
+    def __init__(self, request, format=None):
+        super().__init__(request, format)
+        self.projections = [(name, projection(request, format)) for name, projection in self.subclasses]
+
+    def represent(self, row):
+        for name, projection in self.projections:
+            if row[name] is not None:
+                prefix = name + '__'
+                subclass_row = {lookup[len(prefix):]: value for lookup, value in row.items()
+                                if lookup.startswith(prefix)}
+                subclass_row.update((lookup, row[lookup]) for lookup in self.legislator_lookups)
+                return projection.represent(subclass_row)
+        return OrderedDict([('first_name', row['first_name']), ('last_name', row['last_name'])])
+
+
+class ProjectionListMixin:
+    """
+    Serves a list view from values() rows through its projection_class, when it declares one, instead of its
+    serializer. The rendered response is byte for byte the serializer's.
+    """
+    projection_class = None
+
+    def list(self, request, *args, **kwargs):
+        if self.projection_class is None:
+            return super().list(request, *args, **kwargs)
+
+        projection = self.projection_class(request, self.format_kwarg)
+        queryset = self.filter_queryset(self.get_queryset())
+        if projection.fragment_name is None:
+            rows = queryset.values(*projection.lookups)
+            represent = projection.represent_all
+        else:
+            rows = queryset.values(*projection.page_lookups)
+            model_queryset = queryset.model._default_manager.all()
+
+            def represent(page):
+                return projection.represent_fragments(page, model_queryset)
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(represent(page))
+        return Response(represent(rows))
@@ -0,0 +1,117 @@
+import random
+import threading
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.views import exception_handler as default_exception_handler
+
+PRIMARY_PIN_COOKIE = 'billserve_primary'
+
+_state = threading.local()
+
+
+def read_alias(request):
+    """
+    :param request: A request to a read-only view
+    :return: A randomly chosen alias from the DATABASE_REPLICAS setting, or the default alias when there are no
+    replicas or the client carries the primary pin cookie
+    """
+    if PRIMARY_PIN_COOKIE in request.COOKIES or not settings.DATABASE_REPLICAS:
+        return DEFAULT_DB_ALIAS
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+class ReplicaRouter:
+    """
+    Sends the reads of views wrapped in replica_reads() to a replica of the default database. Everything else,
+    ingestion and rebuild tasks included, reads and writes the primary. Once a request writes, its remaining reads go
+    to the primary too, so it never reads a replica that hasn't caught up with its own write. The pin is thread-local,
+    so it's lifted by every request, read-only view and Celery task, see unpin().
+    """
+    def db_for_read(self, model, **hints):
+        if getattr(_state, 'pinned', False):
+            return None
+        return getattr(_state, 'replica', None)
+
+    def db_for_write(self, model, **hints):
+        _state.pinned = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """
+        Replicas hold the same rows as the primary, so objects read from either may be related.
+        """
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        """
+        Replicas are migrated by replicating the primary.
+        """
+        return False if db in settings.DATABASE_REPLICAS else None
+
+
+def replica_reads(view):
+    """
+    Routes the reads of a read-only view to the alias read_alias() chooses for its request.
+    :param view: A view function
+    :return: The wrapped view function
+    """
+    @wraps(view)
+    def wrapped_view(request, *args, **kwargs):
+        _state.replica = read_alias(request)
+        unpin()  # Writes made earlier in the thread, such as by a task revalidating the response, aren't its own
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _state.replica = None
+    return wrapped_view
+
+
+def unpin(**kwargs):
+    """
+    Lets the current thread read from replicas again after it wrote. Connected to Celery's task_prerun signal, since
+    worker threads run task after task without a request to lift the pin.
+    :param kwargs: The signal's arguments
+    """
+    _state.pinned = False
+
+
+class PrimaryPinningMiddleware:
+    """
+    Pins a client to the primary for DATABASE_REPLICA_PIN_SECONDS after any request of theirs writes, by setting a
+    cookie that replica_reads() honours, so clients read their own writes despite replication lag.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        unpin()
+        try:
+            response = self.get_response(request)
+            if _state.pinned:
+                response.set_cookie(PRIMARY_PIN_COOKIE, '1', max_age=settings.DATABASE_REPLICA_PIN_SECONDS,
+                                    httponly=True)
+            return response
+        finally:
+            unpin()
+
+
+def exception_handler(exc, context):
+    """
+    REST framework's exception handler marks the innermost atomic block of every connection for rollback, taking it
+    for the request's own. Views wrapped in replica_reads() open none, so for them any block belongs to a caller and
+    is left as it was.
+    :param exc: The exception raised by the view
+    :param context: The view and its arguments
+    :return: The error response, or None for unhandled exceptions
+    """
+    if getattr(_state, 'replica', None) is None:
+        return default_exception_handler(exc, context)
+
+    atomic = [connection for connection in connections.all() if connection.in_atomic_block]
+    rollbacks = [connection.get_rollback() for connection in atomic]
+    response = default_exception_handler(exc, context)
+    for connection, rollback in zip(atomic, rollbacks):
+        connection.set_rollback(rollback)
+    return response
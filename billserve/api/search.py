@@ -0,0 +1,67 @@
+import operator
+from functools import reduce
+
+from django.contrib.postgres.search import SearchQuery
+from django.db.models import CharField, FloatField, Func, Lookup, Q, TextField, Value
+from django.db.models.functions import Greatest
+
+SEARCH_CONFIG = 'english'  # The text search configuration used both to build and to query bill search vectors
+HEADLINE_OPTIONS = 'StartSel=<mark>, StopSel=</mark>, MinWords=15, MaxWords=35, MaxFragments=2'
+
+
+class Headline(Func):
+    """
+    Postgres' ts_headline: the fragments of a document that best match a query, with the matches highlighted.
+    """
+    function = 'ts_headline'
+    output_field = TextField()
+
+    def __init__(self, expression, query, options=HEADLINE_OPTIONS, **extra):
+        super().__init__(Value(SEARCH_CONFIG), expression, query, Value(options), **extra)
+
+
+def search_query(query_string):
+    """
+    :param query_string: Free text typed by a user, such as 'student loan forgiveness'
+    :return: A SearchQuery matching documents that contain every word of the string
+    """
+    return SearchQuery(query_string, config=SEARCH_CONFIG)
+
+
+@CharField.register_lookup
+class TrigramWordSimilar(Lookup):
+    """
+    pg_trgm's word similarity operator: matches values containing a word similar to the query, such as 'Ocasio-Cortez'
+    for 'ocasio'. Unlike TrigramSimilarity in a filter, it can use a gin_trgm_ops index on the column.
+    """
+    lookup_name = 'trigram_word_similar'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return '%s %%%%> %s' % (lhs, rhs), lhs_params + rhs_params
+
+
+class TrigramWordSimilarity(Func):
+    """
+    pg_trgm's word_similarity: how closely the query matches the most similar extent of a value, between 0 and 1.
+    """
+    function = 'word_similarity'
+    output_field = FloatField()
+
+    def __init__(self, query_string, expression, **extra):
+        super().__init__(Value(query_string), expression, **extra)
+
+
+def trigram_lookup(queryset, fields, query_string):
+    """
+    Fuzzily matches a query against the name fields of a queryset, for type-ahead lookups.
+    :param queryset: The queryset to search
+    :param fields: The names of the fields to match against. Each should have a gin_trgm_ops index
+    :param query_string: Text typed by a user, such as 'schumer'
+    :return: The matching queryset annotated with its best word similarity as score, best matches first
+    """
+    matches = reduce(operator.or_, (Q(**{field + '__trigram_word_similar': query_string}) for field in fields))
+    similarities = [TrigramWordSimilarity(query_string, field) for field in fields]
+    score = Greatest(*similarities) if len(similarities) > 1 else similarities[0]
+    return queryset.filter(matches).annotate(score=score).order_by('-score', 'pk')
@@ -1,8 +1,88 @@
 from billserve.api.models import *
+from django.db.models import Manager, prefetch_related_objects
 from rest_framework import serializers
+from billserve.api.analytics import current_snapshot
 from billserve.api.enumerations import LegislativeSubjectActivityType
 
 
+def requested_fields(request, param, path=''):
+    """
+    Reads the field names a request lists for the serializer at a path in ?fields= or ?expand=. Both take comma
+    separated dotted paths, so ?expand=senators.sponsored_bills names senators at the top level and sponsored_bills
+    in each senator.
+    :param request: The request, or None
+    :param param: The query parameter, 'fields' or 'expand'
+    :param path: The dotted path of the serializer, empty for the top level
+    :return: The set of field names, empty if the parameter names none at this path
+    """
+    query_params = getattr(request, 'query_params', None)
+    value = query_params.get(param, '').replace(' ', '') if query_params is not None else ''
+    prefix = path + '.' if path else ''
+    return {field[len(prefix):].split('.')[0] for field in value.split(',')
+            if field.startswith(prefix) and len(field) > len(prefix)}
+
+
+def expanded_fields(request, path=''):
+    """
+    :param request: The request, or None
+    :param path: The dotted path of the serializer, empty for the top level
+    :return: The set of field names the request expands at a path, leaving out fields that ?fields= drops
+    """
+    expanded, selected = requested_fields(request, 'expand', path), requested_fields(request, 'fields', path)
+    return expanded & selected if selected else expanded
+
+
+class RelatedCountField(serializers.Field):
+    """
+    Serializes a to-many relation as its size. Uses a <source>_count annotation when the instance has one, so the
+    relation can be counted in the same query as the instance.
+    """
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        annotation = '{source}_count'.format(source=self.source)
+        if hasattr(instance, annotation):
+            return getattr(instance, annotation)
+        return super().get_attribute(instance).count()
+
+    def to_representation(self, value):
+        return value
+
+
+class ExpandableFieldsMixin:
+    """
+    Lets requests trim a model serializer with ?fields= and expand its nested collections with ?expand=. Collections
+    named in Meta.expandable_fields are serialized as counts unless expanded, in which case the view is expected to
+    prefetch them.
+    """
+    @property
+    def path(self):
+        """
+        :return: The dotted path of this serializer's field names from the top level serializer
+        """
+        names, serializer = [], self
+        while serializer.parent is not None:
+            if serializer.field_name:
+                names.append(serializer.field_name)
+            serializer = serializer.parent
+        return '.'.join(reversed(names))
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request, path = self.context.get('request'), self.path
+        selected = requested_fields(request, 'fields', path)
+        if selected:
+            fields = type(fields)((name, field) for name, field in fields.items() if name in selected)
+
+        expanded = requested_fields(request, 'expand', path)
+        for name in getattr(self.Meta, 'expandable_fields', ()):
+            if name in fields and name not in expanded:
+                fields[name] = RelatedCountField(source=fields[name].source)
+        return fields
+
+
 class PolicyAreaShortSerializer(serializers.HyperlinkedModelSerializer):
     class Meta:
         model = PolicyArea
@@ -15,7 +95,20 @@ class BillShortSerializer(serializers.HyperlinkedModelSerializer):
 
     class Meta:
         model = Bill
-        fields = ('title', 'introduction_date', 'policy_area', 'url')
+        fields = ('title', 'introduction_date', 'policy_area', 'bipartisanship_score', 'url')
+
+
+class BillSearchResultSerializer(BillShortSerializer):
+    rank = serializers.FloatField()
+    headline = serializers.CharField()
+
+    class Meta(BillShortSerializer.Meta):
+        fields = BillShortSerializer.Meta.fields + ('rank', 'headline')
+
+
+class SimilarBillSerializer(serializers.Serializer):
+    bill = BillShortSerializer()
+    similarity = serializers.FloatField()
 
 
 class PartyShortSerializer(serializers.HyperlinkedModelSerializer):
@@ -63,7 +156,7 @@ class RepresentativeShortSerializer(serializers.HyperlinkedModelSerializer):
         fields = ('full_name', 'party', 'state', 'district', 'url')
 
 
-class SenatorSerializer(serializers.ModelSerializer):
+class SenatorSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     sponsored_bills = BillShortSerializer(many=True)
     cosponsored_bills = BillShortSerializer(many=True)
     state = StateShortSerializer()
@@ -72,10 +165,11 @@ class SenatorSerializer(serializers.ModelSerializer):
     class Meta:
         model = Senator
         fields = ('party', 'legislative_body', 'state', 'committees', 'first_name', 'last_name',
-                  'cosponsored_bills', 'sponsored_bills')
+                  'bipartisanship_score', 'cosponsored_bills', 'sponsored_bills')
+        expandable_fields = ('sponsored_bills', 'cosponsored_bills')
 
 
-class RepresentativeSerializer(serializers.ModelSerializer):
+class RepresentativeSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     sponsored_bills = BillShortSerializer(many=True)
     cosponsored_bills = BillShortSerializer(many=True)
     state = StateShortSerializer()
@@ -84,28 +178,31 @@ class RepresentativeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Representative
         fields = ('party', 'legislative_body', 'state', 'committees', 'first_name', 'last_name', 'district',
-                  'sponsored_bills', 'cosponsored_bills')
+                  'bipartisanship_score', 'sponsored_bills', 'cosponsored_bills')
+        expandable_fields = ('sponsored_bills', 'cosponsored_bills')
 
 
-class PartySerializer(serializers.ModelSerializer):
+class PartySerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     senators = SenatorShortSerializer(many=True)
     representatives = RepresentativeShortSerializer(many=True)
-    senator_count = serializers.IntegerField(source='senators.count')
-    representative_count = serializers.IntegerField(source='representatives.count')
+    senator_count = RelatedCountField(source='senators')
+    representative_count = RelatedCountField(source='representatives')
 
     class Meta:
         model = Party
         fields = ('name', 'abbreviation', 'senators', 'representatives', 'representative_count', 'senator_count')
+        expandable_fields = ('senators', 'representatives')
 
 
-class StateSerializer(serializers.ModelSerializer):
+class StateSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     representatives = RepresentativeSerializer(many=True)
-    representative_count = serializers.IntegerField(source='representatives.count')
+    representative_count = RelatedCountField(source='representatives')
     senators = SenatorSerializer(many=True)
 
     class Meta:
         model = State
         fields = ('name', 'abbreviation', 'senators', 'representatives', 'representative_count')
+        expandable_fields = ('senators', 'representatives')
 
 
 class ChamberSerializer(serializers.ModelSerializer):
@@ -114,7 +211,7 @@ class ChamberSerializer(serializers.ModelSerializer):
         fields = ('name', 'abbreviation')
 
 
-class DistrictSerializer(serializers.ModelSerializer):
+class DistrictSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     representative = RepresentativeShortSerializer(many=True)
 
     class Meta:
@@ -128,7 +225,49 @@ class LegislatorSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+def prefetch_legislator_relations(legislators):
+    """
+    Loads the relations the short legislator serializers read, in a constant number of queries. Polymorphic querysets
+    can't select them, since senators and representatives each have their own party, state and district columns.
+    :param legislators: A list of senator and representative instances
+    """
+    prefetch_related_objects([legislator for legislator in legislators if isinstance(legislator, Senator)],
+                             'party', 'state')
+    prefetch_related_objects([legislator for legislator in legislators if isinstance(legislator, Representative)],
+                             'party', 'state', 'district__state')
+
+
+class PolymorphicLegislatorListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        """
+        Prefetches the relations of every legislator in the list before serializing them one by one.
+        :param data: A list, queryset or related manager of legislators
+        :return: The list of serialized legislators
+        """
+        legislators = list(data.all() if isinstance(data, Manager) else data)
+        prefetch_legislator_relations(legislators)
+        return super().to_representation(legislators)
+
+
 class LegislatorListSerializer(serializers.ModelSerializer):
+    child_serializer_classes = ((Representative, RepresentativeShortSerializer), (Senator, SenatorShortSerializer),
+                                (Legislator, LegislatorShortSerializer))
+
+    def child_serializer(self, instance):
+        """
+        Finds the serializer for a legislator's subclass. One serializer is built per subclass and reused for every
+        legislator in a list, since building a serializer copies all of its fields.
+        :param instance: The legislator instance
+        :return: The serializer for the legislator's subclass
+        """
+        if not hasattr(self, 'child_serializers'):
+            self.child_serializers = {}
+        for model, serializer_class in self.child_serializer_classes:
+            if isinstance(instance, model):
+                if model not in self.child_serializers:
+                    self.child_serializers[model] = serializer_class(context=self.context)
+                return self.child_serializers[model]
+
     def to_representation(self, instance):
         """
         Smart trick! This method actually figures out which subclass this particular legislator is
@@ -136,16 +275,45 @@ class LegislatorListSerializer(serializers.ModelSerializer):
         :param instance: The legislator instance. We'd like to figure out its subclass
         :return: The serialized legislator instance as its subclass
         """
-        if isinstance(instance, Representative):
-            return RepresentativeShortSerializer(instance=instance, context=self.context).data
-        elif isinstance(instance, Senator):
-            return SenatorShortSerializer(instance=instance, context=self.context).data
-        else:
-            return LegislatorShortSerializer(instance=instance, context=self.context).data
+        return self.child_serializer(instance).to_representation(instance)
 
     class Meta:
         model = Legislator
         fields = '__all__'
+        list_serializer_class = PolymorphicLegislatorListSerializer
+
+
+class LegislatorMatchSerializer(LegislatorListSerializer):
+    def to_representation(self, instance):
+        """
+        Serializes a legislator matched by a name lookup as its subclass, along with its match score.
+        :param instance: The legislator instance, annotated with a score
+        :return: The serialized legislator instance
+        """
+        data = super().to_representation(instance)
+        data['score'] = instance.score
+        return data
+
+
+class LegislatorCollaborationListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        """
+        Prefetches the relations of every collaborator in the list before serializing the collaborations.
+        :param data: A list, queryset or related manager of collaborations
+        :return: The list of serialized collaborations
+        """
+        collaborations = list(data.all() if isinstance(data, Manager) else data)
+        prefetch_legislator_relations([collaboration.collaborator for collaboration in collaborations])
+        return super().to_representation(collaborations)
+
+
+class LegislatorCollaborationSerializer(serializers.ModelSerializer):
+    collaborator = LegislatorListSerializer()
+
+    class Meta:
+        model = LegislatorCollaboration
+        fields = ('collaborator', 'congress', 'shared_bill_count')
+        list_serializer_class = LegislatorCollaborationListSerializer
 
 
 class LegislativeSubjectShortSerializer(serializers.HyperlinkedModelSerializer):
@@ -154,13 +322,82 @@ class LegislativeSubjectShortSerializer(serializers.HyperlinkedModelSerializer):
         fields = ('name', 'url')
 
 
+class LegislativeSubjectMatchSerializer(LegislativeSubjectShortSerializer):
+    score = serializers.FloatField()
+
+    class Meta(LegislativeSubjectShortSerializer.Meta):
+        fields = LegislativeSubjectShortSerializer.Meta.fields + ('score',)
+
+
+class PolicyAreaMatchSerializer(PolicyAreaShortSerializer):
+    score = serializers.FloatField()
+
+    class Meta(PolicyAreaShortSerializer.Meta):
+        fields = PolicyAreaShortSerializer.Meta.fields + ('score',)
+
+
 class LegislativeSubjectSupportSplitSerializer(serializers.ModelSerializer):
     class Meta:
         model = LegislativeSubjectSupportSplit
         fields = ('red_count', 'blue_count', 'white_count')
 
 
-class LegislativeSubjectSerializer(serializers.ModelSerializer):
+class PolicyAreaPartySplitSerializer(serializers.ModelSerializer):
+    policy_area = PolicyAreaShortSerializer()
+    month = serializers.DateField(format='%Y-%m')
+
+    class Meta:
+        model = PolicyAreaPartySplit
+        fields = ('policy_area', 'congress', 'month', 'bill_count', 'sponsor_red_count', 'sponsor_blue_count',
+                  'sponsor_white_count', 'cosponsor_red_count', 'cosponsor_blue_count', 'cosponsor_white_count')
+
+
+def load_active_legislators(legislative_subjects):
+    """
+    Finds the five most active sponsors and cosponsors of each legislative subject and loads them with their relations.
+    They're counted in the current sponsorship snapshot, so the legislators of every subject are loaded together in a
+    constant number of queries, or with the ORM one subject at a time until a snapshot has been saved.
+    :param legislative_subjects: A list of legislative subjects
+    :return: A dictionary mapping legislative subject pks to a tuple of the top sponsors and the top cosponsors, each a
+    list of (legislator, count) tuples, most active first
+    """
+    snapshot = current_snapshot()
+    if snapshot is None:
+        active_legislators = {
+            legislative_subject.pk: tuple([(legislator, legislator.count) for legislator in top_legislators]
+                                          for top_legislators in legislative_subject.top_legislators())
+            for legislative_subject in legislative_subjects}
+    else:
+        roles = (LegislativeSubjectActivityType.sponsorship, LegislativeSubjectActivityType.cosponsorship)
+        counts = {legislative_subject.pk: [snapshot.top_legislators(legislative_subject.pk, role) for role in roles]
+                  for legislative_subject in legislative_subjects}
+        legislators = Legislator.objects.in_bulk({legislator_pk for top_counts in counts.values()
+                                                  for role_counts in top_counts for legislator_pk, _ in role_counts})
+        # Legislators deleted since the snapshot was taken are left out.
+        active_legislators = {
+            legislative_subject_pk: tuple([(legislators[legislator_pk], count) for legislator_pk, count in role_counts
+                                           if legislator_pk in legislators] for role_counts in top_counts)
+            for legislative_subject_pk, top_counts in counts.items()}
+
+    prefetch_legislator_relations([legislator for top_legislators in active_legislators.values()
+                                   for role_legislators in top_legislators for legislator, _ in role_legislators])
+    return active_legislators
+
+
+class LegislativeSubjectListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        """
+        Loads the most active legislators of every legislative subject in the list at once, see
+        load_active_legislators().
+        :param data: A list or queryset of legislative subjects
+        :return: The list of serialized legislative subjects
+        """
+        legislative_subjects = list(data)
+        self.child.active_legislators = load_active_legislators(legislative_subjects)
+        return super().to_representation(legislative_subjects)
+
+
+class LegislativeSubjectSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     bills = BillShortSerializer(many=True)
     support_split = LegislativeSubjectSupportSplitSerializer()
     active_legislators = serializers.SerializerMethodField()
@@ -168,6 +405,8 @@ class LegislativeSubjectSerializer(serializers.ModelSerializer):
     class Meta:
         model = LegislativeSubject
         fields = ('name', 'bills', 'active_legislators', 'support_split')
+        expandable_fields = ('bills',)
+        list_serializer_class = LegislativeSubjectListSerializer
 
     def get_active_legislators(self, obj):
         """
@@ -177,8 +416,10 @@ class LegislativeSubjectSerializer(serializers.ModelSerializer):
         :return: A dictionary with two lists containing short summaries
         for the top five sponsors and cosponsors, respectively.
         """
-
-        top_sponsors, top_cosponsors = obj.top_legislators()
+        active_legislators = getattr(self, 'active_legislators', {})
+        if obj.pk not in active_legislators:
+            active_legislators = load_active_legislators([obj])
+        top_sponsors, top_cosponsors = active_legislators[obj.pk]
 
         return {
             'top_sponsors': self.json_list_for(top_sponsors),
@@ -188,28 +429,29 @@ class LegislativeSubjectSerializer(serializers.ModelSerializer):
     def json_list_for(self, legislators):
         """
         Convenience method for converting raw legislator instances into their serialized format.
-        :param legislators: The list of top legislators
+        :param legislators: The list of top legislators, as (legislator, count) tuples
         :return: A dictionary that's what we'll we want to see in the API
         """
         res = []
 
-        for legislator in legislators:
+        for legislator, count in legislators:
             serialized_legislator = LegislatorListSerializer(instance=legislator, context=self.context)
             data = {
                 'legislator': serialized_legislator.data,
-                'count': legislator.count
+                'count': count
             }
             res.append(data)
 
         return res
 
 
-class PolicyAreaSerializer(serializers.ModelSerializer):
+class PolicyAreaSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     bills = BillShortSerializer(many=True)
 
     class Meta:
         model = PolicyArea
         fields = ('name', 'bills')
+        expandable_fields = ('bills',)
 
 
 class BillSummarySerializer(serializers.ModelSerializer):
@@ -218,7 +460,21 @@ class BillSummarySerializer(serializers.ModelSerializer):
         fields = ('name', 'text', 'action_description', 'action_date', 'bill')
 
 
-class BillSerializer(serializers.ModelSerializer):
+class BillListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        """
+        Prefetches the relations of every sponsor and cosponsor of every bill in the list at once, so that serializing
+        many bills costs no more queries than serializing one.
+        :param data: A list, queryset or related manager of bills with their sponsors and cosponsors prefetched
+        :return: The list of serialized bills
+        """
+        bills = list(data.all() if isinstance(data, Manager) else data)
+        prefetch_legislator_relations([legislator for bill in bills
+                                       for legislator in list(bill.sponsors.all()) + list(bill.cosponsors.all())])
+        return super().to_representation(bills)
+
+
+class BillSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     related_bills = BillShortSerializer(many=True)
     sponsors = LegislatorListSerializer(many=True)
     cosponsors = LegislatorListSerializer(many=True)
@@ -231,8 +487,9 @@ class BillSerializer(serializers.ModelSerializer):
         model = Bill
         fields = ('sponsors', 'cosponsors', 'policy_area', 'legislative_subjects', 'related_bills', 'committees',
                   'originating_body', 'support_splits', 'title', 'bill_summaries', 'introduction_date', 'last_modified',
-                  'bill_number', 'congress', 'type', 'cbo_cost_estimate', 'url', 'bill_url')
+                  'bill_number', 'congress', 'type', 'cbo_cost_estimate', 'bipartisanship_score', 'url', 'bill_url')
         depth = 1
+        list_serializer_class = BillListSerializer
 
     def get_support_splits(self, obj):
         """
@@ -266,20 +523,19 @@ class BillSerializer(serializers.ModelSerializer):
             :return: The counts of republicans, democrats and independents
             """
             red_count = blue_count = white_count = 0
-            republican_party = Party.objects.get(abbreviation="R")
-            democratic_party = Party.objects.get(abbreviation="D")
-            independent_party = Party.objects.get(abbreviation="I")
+            legislators = list(legislators)
+            prefetch_legislator_relations(legislators)
 
             for legislator in legislators:
-                legislator_party = legislator.party
-                if legislator_party == republican_party:
+                legislator_party = legislator.party.abbreviation if legislator.party else None
+                if legislator_party == 'R':
                     red_count += 1
-                elif legislator_party == democratic_party:
+                elif legislator_party == 'D':
                     blue_count += 1
-                elif legislator_party == independent_party:
+                elif legislator_party == 'I':
                     white_count += 1
                 else:
-                    raise ValueError('Unexpected party encountered: {p}'.format(p=legislator_party))
+                    raise ValueError('Unexpected party encountered: {p}'.format(p=legislator.party))
 
             return SupportSplit(red_count=red_count, blue_count=blue_count, white_count=white_count)
 
@@ -0,0 +1,80 @@
+import hashlib
+
+import numpy as np
+
+PERMUTATION_COUNT = 64  # MinHash values per token set
+BAND_COUNT = 16  # LSH bands per token set, each covering PERMUTATION_COUNT / BAND_COUNT values
+EMPTY = np.iinfo(np.uint32).max  # The MinHash value of an empty set
+MERSENNE_PRIME = (1 << 31) - 1
+
+# Fixed seeds keep the hash functions identical across workers and between index builds.
+_random = np.random.RandomState(1789)
+_coefficients = _random.randint(1, MERSENNE_PRIME, size=PERMUTATION_COUNT).astype(np.uint64)
+_offsets = _random.randint(0, MERSENNE_PRIME, size=PERMUTATION_COUNT).astype(np.uint64)
+
+
+def minhash(tokens):
+    """
+    Computes the MinHash signature of a set of integer tokens.
+    :param tokens: An iterable of non-negative integers smaller than 2 ** 32
+    :return: An array of PERMUTATION_COUNT uint32 values, all EMPTY if there are no tokens
+    """
+    tokens = np.fromiter(tokens, dtype=np.uint64)
+    if not len(tokens):
+        return np.full(PERMUTATION_COUNT, EMPTY, dtype=np.uint32)
+    hashes = (np.outer(_coefficients, tokens) + _offsets[:, np.newaxis]) % MERSENNE_PRIME
+    return hashes.min(axis=1).astype(np.uint32)
+
+
+def signature(subject_pks, cosponsor_pks):
+    """
+    Computes a bill's signature: the MinHash of its legislative subjects followed by the MinHash of its cosponsors.
+    :param subject_pks: The primary keys of the bill's legislative subjects
+    :param cosponsor_pks: The primary keys of the bill's cosponsors
+    :return: An array of 2 * PERMUTATION_COUNT uint32 values
+    """
+    return np.concatenate([minhash(subject_pks), minhash(cosponsor_pks)])
+
+
+def bands(bill_signature):
+    """
+    Splits a signature into LSH bands and hashes each band into a bucket. Bills that share a bucket in any band are
+    likely to be similar. Bands of empty token sets are skipped so that they don't all collide.
+    :param bill_signature: A signature computed by signature()
+    :return: A list of (band number, bucket) tuples, with buckets as signed 64 bit integers
+    """
+    res = []
+    for band, values in enumerate(np.split(bill_signature, 2 * BAND_COUNT)):
+        if (values == EMPTY).all():
+            continue
+        digest = hashlib.blake2b(values.tobytes(), digest_size=8).digest()
+        res.append((band, int.from_bytes(digest, 'big', signed=True)))
+    return res
+
+
+def similarity(first, second):
+    """
+    Estimates the similarity of two bills as the mean of the Jaccard similarities of their legislative subjects and of
+    their cosponsors.
+    :param first: The first bill's signature
+    :param second: The second bill's signature, or a (bill, value) matrix of signatures
+    :return: The estimated similarity between 0 and 1, or an array of them
+    """
+    matches = (first == second) & (first != EMPTY)
+    return matches.mean(axis=-1)
+
+
+def to_bytes(bill_signature):
+    """
+    :param bill_signature: A signature computed by signature()
+    :return: The signature packed into bytes for storage
+    """
+    return bill_signature.astype('<u4').tobytes()
+
+
+def from_bytes(data):
+    """
+    :param data: A signature packed by to_bytes()
+    :return: The unpacked signature
+    """
+    return np.frombuffer(bytes(data), dtype='<u4')
@@ -1,7 +1,13 @@
 from __future__ import absolute_import, unicode_literals
-from celery import shared_task
+from celery import group, shared_task
+from celery.signals import task_prerun
+from django.conf import settings
 
 from billserve.api.networking.client import GovinfoClient
+from billserve.api.generation import bump_generation, bump_rebuild_generation
+from billserve.api.routers import unpin
+
+task_prerun.connect(unpin)
 
 
 @shared_task
@@ -14,6 +20,7 @@ def add_related_bill(current_bill_pk, related_bill_pk):
     from billserve.api.models import Bill
 
     Bill.objects.add_related_bill(current_bill_pk, related_bill_pk)
+    bump_generation()
 
 
 @shared_task
@@ -23,35 +30,97 @@ def populate_bill(url):
     :param url: A URL pointing towards a valid GovInfo endpoint
     :return: The primary key of the bill we've either gotten or created
     """
-    from billserve.api.models import Bill
+    from billserve.api.models import Bill, PolicyAreaPartySplit, BillSignature
 
     try:
         bill = Bill.objects.get(bill_url=url)
     except Bill.DoesNotExist:
         bill = GovinfoClient.create_bill_from_url(url)
+        PolicyAreaPartySplit.objects.refresh_for_bills([bill.pk])
+        BillSignature.objects.index_bills([bill.pk])
+        Bill.objects.update_search_vectors([bill.pk])
+        bump_generation()
 
     return bill.pk
 
 
 @shared_task
-def update(origin_url):
+def refresh_response(uri, accept):
+    """
+    Recomputes a cached API response that was served stale, so the request that found it didn't have to wait.
+    :param uri: The absolute URI of the request, with its query string
+    :param accept: The Accept header of the request
+    """
+    from billserve.api.caching import revalidate
+
+    revalidate(uri, accept)
+
+
+@shared_task
+def update(origin_url, callback=None):
     """
     Currently starts at a single bill URL and then spiders out from there. Eventually this method will query all
     possible bill repositories and see if there are any new bills to grab.
     :param origin_url: The URL to begin our search at
+    :param callback: An optional signature to run once every bill found has been populated
     """
     from billserve.api.models import Bill
 
-    Bill.objects.bulk_create_bills_from_origin(origin_url)
+    Bill.objects.bulk_create_bills_from_origin(origin_url, callback)
 
 
 @shared_task
 def rebuild():
     """
-    Destroys and then rebuilds all the legislative support splits.
+    Snapshots the sponsorship relations for the analytics module, then destroys and rebuilds all the legislative
+    support splits, policy area party splits, legislator collaborations, bipartisanship scores, bill families,
+    similar bill signatures and bill search vectors. Finally builds the bill bitmap index for the new generation, so
+    web workers only have to memory map it.
     """
-    from billserve.api.models import LegislativeSubjectSupportSplit
+    from billserve.api.models import LegislativeSubjectSupportSplit, PolicyAreaPartySplit, LegislatorCollaboration, \
+        Bill, Legislator, BillSignature
+    from billserve.api.analytics import SponsorshipSnapshot
+    from billserve.api.bitmaps import build_bitmap_index
+
+    snapshot = SponsorshipSnapshot.build()
+    snapshot.save()
+
+    LegislativeSubjectSupportSplit.objects.rebuild(snapshot)
+    PolicyAreaPartySplit.objects.rebuild()
+    LegislatorCollaboration.objects.rebuild(snapshot)
+    Bill.objects.update_bipartisanship_scores(snapshot)
+    Legislator.objects.update_bipartisanship_scores(snapshot)
+    Bill.objects.rebuild_families()
+    BillSignature.objects.index_bills()
+    Bill.objects.update_search_vectors()
+    bump_rebuild_generation()
+    bump_generation()
+    build_bitmap_index()
 
-    LegislativeSubjectSupportSplit.objects.rebuild()
 
+@shared_task
+def warm_cache():
+    """
+    Recomputes the cached responses of every requested reference list and of the API_CACHE_WARM_LIMIT most requested
+    objects of each hot route, so the first clients after a rebuild don't pay for cold serialization. The work is split
+    across at most API_CACHE_WARM_CONCURRENCY tasks, which bounds the workers it takes from ingestion.
+    """
+    from billserve.api.export import chunked
+    from billserve.api.warming import warm_targets
+
+    targets = warm_targets(settings.API_CACHE_WARM_LIMIT)
+    if targets:
+        size = -(-len(targets) // settings.API_CACHE_WARM_CONCURRENCY)
+        group(warm_responses.si(chunk) for chunk in chunked(targets, size)).apply_async()
+
+
+@shared_task
+def warm_responses(targets):
+    """
+    Recomputes and caches the responses to GET requests, one after another.
+    :param targets: A list of (absolute URI, Accept header) pairs
+    """
+    from billserve.api.caching import revalidate
 
+    for uri, accept in targets:
+        revalidate(uri, accept)
@@ -0,0 +1,195 @@
+import datetime
+import tempfile
+
+import numpy as np
+from django.core.cache import cache
+from django.test import TestCase
+
+from billserve.api.analytics import SponsorshipSnapshot
+from billserve.api.enumerations import LegislativeSubjectActivityType
+from billserve.api.models import *
+
+
+class SponsorshipSnapshotTestCase(TestCase):
+    fixtures = ['states.json', 'parties.json', 'districts.json', 'policy_areas.json', 'legislative_subjects.json']
+
+    def setUp(self):
+        self.senator = Senator.objects.create(
+            first_name='Martin', last_name='Heinrich', state=State.objects.get(pk=32), party=Party.objects.get(pk=2))
+        self.representative = Representative.objects.create(
+            first_name='David', last_name='Joyce', state=State.objects.get(pk=36),
+            party=Party.objects.get(pk=3), district=District.objects.get(pk=1))
+        self.funding = LegislativeSubject.objects.get(pk=1)
+        self.higher_education = LegislativeSubject.objects.get(pk=2)
+
+        self.bill = Bill.objects.create(bill_url='http://google.com', congress=115,
+                                        policy_area=PolicyArea.objects.get(pk=1))
+        self.bill.sponsors.add(self.senator)
+        self.bill.legislative_subjects.add(self.funding, self.higher_education)
+        Cosponsorship.objects.create(legislator=self.representative, bill=self.bill, is_original_cosponsor=True,
+                                     cosponsorship_date=datetime.date(2017, 5, 1))
+
+        self.other_bill = Bill.objects.create(bill_url='http://google.com', congress=115)
+        self.other_bill.sponsors.add(self.representative)
+        self.other_bill.legislative_subjects.add(self.higher_education)
+
+        self.snapshot = SponsorshipSnapshot.build()
+
+    def test_build(self):
+        self.assertEqual(len(self.snapshot.bill_pks), 2)
+        self.assertEqual(len(self.snapshot.legislator_pks), 2)
+        self.assertEqual(len(self.snapshot.edge_bills), 3)
+        self.assertEqual(int(self.snapshot.edge_original.sum()), 1)
+
+    def test_party_counts_by_subject(self):
+        counts = self.snapshot.party_counts_by_subject()
+        self.assertEqual(list(counts[self.funding.pk]), [0, 0, 1, 1])
+        self.assertEqual(list(counts[self.higher_education.pk]), [0, 0, 1, 2])
+
+    def test_top_legislators(self):
+        sponsorship = LegislativeSubjectActivityType.sponsorship
+        top_sponsors = self.snapshot.top_legislators(self.higher_education.pk, sponsorship)
+        self.assertEqual(top_sponsors, [(self.senator.pk, 1), (self.representative.pk, 1)])
+        top_cosponsors = self.snapshot.top_legislators(self.funding.pk, LegislativeSubjectActivityType.cosponsorship)
+        self.assertEqual(top_cosponsors, [(self.representative.pk, 1)])
+
+    def test_active_legislators(self):
+        url = '/api/legislative-subjects/{pk}/'.format(pk=self.funding.pk)
+        counted = self.client.get(url).data['active_legislators']
+        self.assertEqual([(entry['legislator']['full_name'], entry['count']) for entry in counted['top_sponsors']],
+                         [(str(self.senator), 1)])
+
+        self.snapshot.save()
+        cache.clear()
+        self.assertEqual(self.client.get(url).data['active_legislators'], counted)
+
+    def test_activity_by_state(self):
+        self.assertEqual(self.snapshot.activity_by_state(), {32: 1, 36: 2})
+        self.assertEqual(self.snapshot.activity_by_state(LegislativeSubjectActivityType.cosponsorship), {36: 1})
+
+    def test_activity_by_policy_area(self):
+        self.assertEqual(self.snapshot.activity_by_policy_area(), {1: 2})
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.snapshot.save(directory)
+            self.snapshot.save(directory)
+            self.snapshot.save(directory)
+            loaded = SponsorshipSnapshot.load(directory)
+
+            self.assertIsInstance(loaded.edge_bills, np.memmap)
+            for name in SponsorshipSnapshot.array_names:
+                np.testing.assert_array_equal(getattr(loaded, name), getattr(self.snapshot, name))
+            self.assertEqual(loaded.party_counts_by_subject().keys(), self.snapshot.party_counts_by_subject().keys())
+
+    def test_support_split_rebuild(self):
+        without_bills = LegislativeSubject.objects.create(name='Student loans')
+        LegislativeSubjectSupportSplit.objects.rebuild(self.snapshot)
+        support_split = LegislativeSubjectSupportSplit.objects.get(legislative_subject=self.higher_education)
+        self.assertEqual((support_split.red_count, support_split.blue_count, support_split.white_count), (2, 1, 0))
+
+        support_split = LegislativeSubjectSupportSplit.objects.get(legislative_subject=without_bills)
+        self.assertEqual((support_split.red_count, support_split.blue_count, support_split.white_count), (0, 0, 0))
+
+
+class CollaborationTestCase(TestCase):
+    fixtures = ['states.json', 'parties.json']
+
+    def setUp(self):
+        self.senators = [Senator.objects.create(first_name='Senator', last_name=name, state=State.objects.get(pk=32),
+                                                party=Party.objects.get(pk=2)) for name in ('A', 'B', 'C', 'D')]
+        a, b, c, d = self.senators
+        self.create_bill(115, a, [b, c])
+        self.create_bill(115, a, [b])
+        self.create_bill(115, b, [a, a])
+        self.create_bill(114, c, [d])
+
+    def create_bill(self, congress, sponsor, cosponsors):
+        bill = Bill.objects.create(bill_url='http://google.com', congress=congress)
+        bill.sponsors.add(sponsor)
+        for cosponsor in cosponsors:
+            Cosponsorship.objects.create(legislator=cosponsor, bill=bill, is_original_cosponsor=False,
+                                         cosponsorship_date=datetime.date(2017, 5, 1))
+        return bill
+
+    def test_co_occurrence_matrix(self):
+        a, b, c, d = range(4)
+        snapshot = SponsorshipSnapshot.build()
+        co_occurrence = snapshot.co_occurrence_matrix(115).toarray()
+        self.assertEqual(co_occurrence[a, b], 3)
+        self.assertEqual(co_occurrence[a, c], 1)
+        self.assertEqual(co_occurrence[a, a], 0)
+        self.assertEqual(co_occurrence[c, d], 0)
+        self.assertEqual(snapshot.co_occurrence_matrix().toarray()[c, d], 1)
+
+    def test_rebuild(self):
+        a, b, c, d = self.senators
+        LegislatorCollaboration.objects.rebuild(count=1)
+        self.assertEqual(list(LegislatorCollaboration.objects.filter(legislator=a)
+                              .values_list('congress', 'collaborator', 'shared_bill_count')),
+                         [(115, b.pk, 3)])
+        self.assertEqual(list(LegislatorCollaboration.objects.filter(legislator=c)
+                              .values_list('congress', 'collaborator', 'shared_bill_count')),
+                         [(114, d.pk, 1), (115, a.pk, 1)])
+
+    def test_collaborators_endpoint(self):
+        a, b, c, d = self.senators
+        LegislatorCollaboration.objects.rebuild()
+        response = self.client.get('/api/legislators/{pk}/collaborators/'.format(pk=c.pk), {'congress': 115})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(collaboration['collaborator']['full_name'], collaboration['shared_bill_count'])
+                          for collaboration in response.data], [(str(a), 1), (str(b), 1)])
+        self.assertEqual(self.client.get('/api/legislators/0/collaborators/').status_code, 404)
+
+
+class BipartisanshipTestCase(TestCase):
+    fixtures = ['states.json', 'parties.json', 'districts.json']
+
+    def setUp(self):
+        democrat, republican = Party.objects.get(pk=2), Party.objects.get(pk=3)
+        new_mexico, ohio = State.objects.get(pk=32), State.objects.get(pk=36)
+        self.sponsor = Senator.objects.create(first_name='Martin', last_name='Heinrich', state=new_mexico,
+                                              party=democrat)
+        self.colleague = Senator.objects.create(first_name='Tom', last_name='Udall', state=new_mexico, party=democrat)
+        self.original = Representative.objects.create(first_name='David', last_name='Joyce', state=ohio,
+                                                      party=republican, district=District.objects.get(pk=1))
+        self.later = Representative.objects.create(first_name='Steve', last_name='Stivers', state=ohio,
+                                                   party=republican, district=District.objects.get(pk=1))
+
+        self.bipartisan_bill = Bill.objects.create(bill_url='http://google.com', title='Bipartisan')
+        self.bipartisan_bill.sponsors.add(self.sponsor)
+        for legislator, is_original_cosponsor in ((self.original, True), (self.later, False), (self.colleague, False)):
+            Cosponsorship.objects.create(legislator=legislator, bill=self.bipartisan_bill,
+                                         is_original_cosponsor=is_original_cosponsor,
+                                         cosponsorship_date=datetime.date(2017, 5, 1))
+
+        self.lonely_bill = Bill.objects.create(bill_url='http://google.com', title='Lonely')
+        self.lonely_bill.sponsors.add(self.original)
+        self.orphan_bill = Bill.objects.create(bill_url='http://google.com', title='Orphan')
+
+        snapshot = SponsorshipSnapshot.build()
+        Bill.objects.update_bipartisanship_scores(snapshot)
+        Legislator.objects.update_bipartisanship_scores(snapshot)
+
+    def test_bill_scores(self):
+        scores = dict(Bill.objects.values_list('pk', 'bipartisanship_score'))
+        self.assertAlmostEqual(scores[self.bipartisan_bill.pk], 0.75)
+        self.assertEqual(scores[self.lonely_bill.pk], 0.0)
+        self.assertIsNone(scores[self.orphan_bill.pk])
+
+    def test_legislator_scores(self):
+        scores = dict(Legislator.objects.non_polymorphic().values_list('pk', 'bipartisanship_score'))
+        self.assertEqual(scores[self.original.pk], 1.0)
+        self.assertEqual(scores[self.colleague.pk], 0.0)
+        self.assertIsNone(scores[self.sponsor.pk])
+
+    def test_bill_list_ordering_and_filtering(self):
+        response = self.client.get('/api/bills/', {'ordering': '-bipartisanship_score'})
+        self.assertEqual([bill['title'].split(': ')[1] for bill in response.data['results']],
+                         ['Bipartisan', 'Lonely', 'Orphan'])
+
+        response = self.client.get('/api/bills/', {'min_bipartisanship': '0.5'})
+        self.assertEqual([bill['bipartisanship_score'] for bill in response.data['results']], [0.75])
+
+        self.assertEqual(self.client.get('/api/bills/', {'ordering': 'title'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/bills/', {'min_bipartisanship': 'high'}).status_code, 400)
@@ -0,0 +1,82 @@
+import datetime
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from billserve.api import autocomplete
+from billserve.api.autocomplete import PrefixTrie, AutocompleteIndex, normalize, current_index
+from billserve.api.generation import bump_generation
+from billserve.api.models import *
+
+
+class PrefixTrieTestCase(TestCase):
+    def setUp(self):
+        self.trie = PrefixTrie(['schumer', 'schatz', 'sanders', 'cortez'], [0, 1, 2, 3])
+
+    def test_values(self):
+        self.assertEqual(sorted(self.trie.values('sch')), [0, 1])
+        self.assertEqual(sorted(self.trie.values('s')), [0, 1, 2])
+        self.assertEqual(sorted(self.trie.values('')), [0, 1, 2, 3])
+        self.assertEqual(list(self.trie.values('schumerx')), [])
+        self.assertEqual(list(self.trie.values('x')), [])
+
+    def test_normalize(self):
+        self.assertEqual(normalize('Ocasio-Cortez'), 'ocasio cortez')
+        self.assertEqual(normalize('  Luján '), 'lujan')
+
+
+class AutocompleteIndexTestCase(TestCase):
+    fixtures = ['states.json', 'parties.json', 'districts.json', 'policy_areas.json']
+
+    def setUp(self):
+        cache.clear()
+        # Every test builds its own index from its own legislators.
+        autocomplete._index, autocomplete._rebuild_thread = None, None
+        self.schumer = Senator.objects.create(first_name='Charles', last_name='Schumer',
+                                              state=State.objects.get(pk=32), party=Party.objects.get(pk=2))
+        self.schatz = Senator.objects.create(first_name='Brian', last_name='Schatz',
+                                             state=State.objects.get(pk=32), party=Party.objects.get(pk=2))
+        self.ocasio_cortez = Representative.objects.create(
+            first_name='Alexandria', last_name='Ocasio-Cortez', state=State.objects.get(pk=36),
+            party=Party.objects.get(pk=2), district=District.objects.get(pk=1))
+        self.subject = LegislativeSubject.objects.create(name='Health care coverage and access')
+
+        bill = Bill.objects.create(bill_url='http://google.com', title='Health Act')
+        bill.sponsors.add(self.schatz)
+        bill.legislative_subjects.add(self.subject)
+        Cosponsorship.objects.create(legislator=self.schatz, bill=Bill.objects.create(bill_url='http://google.com'),
+                                     is_original_cosponsor=False, cosponsorship_date=datetime.date(2017, 5, 1))
+
+    def test_complete(self):
+        index = AutocompleteIndex.build()
+        self.assertEqual(index.complete('sch'), [('senator', self.schatz.pk, 'Brian Schatz', 2),
+                                                 ('senator', self.schumer.pk, 'Charles Schumer', 0)])
+        self.assertEqual(index.complete('cort'), [('representative', self.ocasio_cortez.pk,
+                                                   'Alexandria Ocasio-Cortez', 0)])
+        self.assertEqual(index.complete('care', kinds=['legislativesubject']),
+                         [('legislativesubject', self.subject.pk, 'Health care coverage and access', 1)])
+        self.assertEqual(index.complete('sch', count=1), [('senator', self.schatz.pk, 'Brian Schatz', 2)])
+        self.assertEqual(index.complete(' '), [])
+
+    def test_rebuilds_in_background(self):
+        index = current_index()
+        self.assertIs(current_index(), index)
+        with override_settings(AUTOCOMPLETE_REBUILD_INTERVAL=60):
+            bump_generation()
+            self.assertIs(current_index(), index)
+            self.assertIsNone(autocomplete._rebuild_thread)
+        with override_settings(AUTOCOMPLETE_REBUILD_INTERVAL=0):
+            self.assertIs(current_index(), index)
+            autocomplete._rebuild_thread.join()
+            self.assertIsNot(current_index(), index)
+
+    def test_autocomplete_endpoint(self):
+        bump_generation()
+        response = self.client.get('/api/autocomplete/', {'q': 'schu'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(completion['kind'], completion['name']) for completion in response.data],
+                         [('senator', 'Charles Schumer')])
+        self.assertTrue(response.data[0]['url'].endswith('/api/senators/{pk}/'.format(pk=self.schumer.pk)))
+        self.assertEqual(self.client.get('/api/autocomplete/', {'q': 'schu', 'kinds': 'bill'}).status_code, 400)
+        for limit in (0, -1):
+            self.assertEqual(self.client.get('/api/autocomplete/', {'q': 'schu', 'limit': limit}).status_code, 400)
@@ -0,0 +1,82 @@
+import datetime
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from billserve.api.analytics import SponsorshipSnapshot
+from billserve.api.generation import bump_generation
+from billserve.api.models import *
+
+
+class BatchRetrieveTestCase(TestCase):
+    fixtures = ['states.json', 'parties.json', 'districts.json', 'policy_areas.json', 'legislative_subjects.json']
+
+    def setUp(self):
+        self.senators = [Senator.objects.create(first_name='Senator', last_name=str(i), state=State.objects.get(pk=32),
+                                                party=Party.objects.get(pk=2 + i % 2)) for i in range(3)]
+        self.representatives = [Representative.objects.create(
+            first_name='Representative', last_name=str(i), state=State.objects.get(pk=36),
+            party=Party.objects.get(pk=3), district=District.objects.get(pk=1)) for i in range(3)]
+        self.bills = []
+        for i in range(3):
+            bill = Bill.objects.create(bill_url='http://google.com', congress=115, title='Bill {i}'.format(i=i),
+                                       policy_area=PolicyArea.objects.get(pk=1))
+            bill.sponsors.add(self.senators[i])
+            bill.legislative_subjects.add(LegislativeSubject.objects.get(pk=1))
+            for legislator in (self.representatives[i], self.senators[(i + 1) % 3]):
+                Cosponsorship.objects.create(legislator=legislator, bill=bill, is_original_cosponsor=False,
+                                             cosponsorship_date=datetime.date(2017, 5, 1))
+            self.bills.append(bill)
+
+    def ids(self, instances):
+        return ','.join(str(instance.pk) for instance in instances)
+
+    def count_queries(self, url, data=None):
+        bump_generation()  # Misses the response cache
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, data)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_request_order_and_errors(self):
+        first, second, third = self.bills
+        response = self.client.get('/api/bills/batch/', {'ids': '{third},0,abc,{first},{third}'.format(
+            first=first.pk, third=third.pk)})
+        results = response.data['results']
+        self.assertEqual([(result['id'], result['status']) for result in results],
+                         [(third.pk, 200), (0, 404), ('abc', 400), (first.pk, 200), (third.pk, 200)])
+        self.assertEqual(results[0]['data']['title'], third.title)
+        self.assertEqual(results[0]['data']['support_splits']['cosponsorship_split'],
+                         {'red_count': 1, 'blue_count': 1, 'white_count': 0})
+        self.assertNotIn('data', results[1])
+
+    def test_matches_detail(self):
+        for route, instances in (('bills', self.bills), ('senators', self.senators),
+                                 ('representatives', self.representatives)):
+            response = self.client.get('/api/{route}/batch/'.format(route=route), {'ids': self.ids(instances)})
+            for instance, result in zip(instances, response.data['results']):
+                detail = self.client.get('/api/{route}/{pk}/'.format(route=route, pk=instance.pk))
+                self.assertEqual(result['data'], detail.data)
+
+    def test_legislative_subjects(self):
+        subjects = LegislativeSubject.objects.all()[:2]
+        response = self.client.get('/api/legislative-subjects/batch/', {'ids': self.ids(subjects)})
+        self.assertEqual([result['data']['name'] for result in response.data['results']],
+                         [subject.name for subject in subjects])
+
+    def test_queries_are_shared(self):
+        subjects = list(LegislativeSubject.objects.all())
+        self.bills[0].legislative_subjects.add(subjects[1])
+        SponsorshipSnapshot.build().save()  # Counts the active legislators of every subject
+        for route, instances in (('bills', self.bills), ('senators', self.senators),
+                                 ('representatives', self.representatives), ('legislative-subjects', subjects)):
+            url = '/api/{route}/batch/'.format(route=route)
+            one = self.count_queries(url, {'ids': self.ids(instances[:1])})
+            self.assertEqual(self.count_queries(url, {'ids': self.ids(instances)}), one)
+            self.assertLessEqual(one, self.count_queries('/api/{route}/{pk}/'.format(route=route,
+                                                                                     pk=instances[0].pk)))
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.get('/api/bills/batch/').status_code, 400)
+        self.assertEqual(self.client.get('/api/bills/batch/', {'ids': ','.join(['1'] * 101)}).status_code, 400)
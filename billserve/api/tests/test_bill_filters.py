@@ -0,0 +1,99 @@
+import datetime
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from billserve.api.models import *
+
+
+class BillFilterTestCase(TestCase):
+    fixtures = ['states.json', 'parties.json', 'policy_areas.json', 'legislative_subjects.json']
+
+    def setUp(self):
+        self.senate = Chamber.objects.create(name='Senate', abbreviation='S')
+        self.sponsor = Senator.objects.create(first_name='Martin', last_name='Heinrich', state=State.objects.get(pk=32),
+                                              party=Party.objects.get(pk=2))
+        self.cosponsor = Senator.objects.create(first_name='Tom', last_name='Udall', state=State.objects.get(pk=32),
+                                                party=Party.objects.get(pk=2))
+        self.subject = LegislativeSubject.objects.get(pk=1)
+        self.health = PolicyArea.objects.create(name='Health')
+
+        self.senate_bill = self.create_bill('Senate', 115, 'S', datetime.date(2017, 5, 1), policy_area_id=1,
+                                            originating_body=self.senate,
+                                            cbo_cost_estimate='https://www.cbo.gov/publication/1')
+        self.senate_bill.sponsors.add(self.sponsor)
+        self.senate_bill.legislative_subjects.add(self.subject)
+        for is_original_cosponsor in (True, False):  # Cosponsoring twice mustn't list the bill twice
+            Cosponsorship.objects.create(legislator=self.cosponsor, bill=self.senate_bill,
+                                         is_original_cosponsor=is_original_cosponsor,
+                                         cosponsorship_date=datetime.date(2017, 5, 2))
+        self.house_bill = self.create_bill('House', 115, 'HR', datetime.date(2017, 6, 1), policy_area=self.health)
+        self.house_bill.sponsors.add(self.cosponsor)
+        self.old_bill = self.create_bill('Old', 114, 'HR', datetime.date(2015, 1, 1))
+
+    def create_bill(self, title, congress, bill_type, introduction_date, **kwargs):
+        return Bill.objects.create(bill_url='http://google.com', title=title, congress=congress, type=bill_type,
+                                   introduction_date=introduction_date, **kwargs)
+
+    def titles(self, **params):
+        response = self.client.get('/api/bills/', params)
+        self.assertEqual(response.status_code, 200)
+        return [bill['title'].split(': ')[1] for bill in response.data['results']]
+
+    def test_filters(self):
+        self.assertEqual(self.titles(congress=115), ['Senate', 'House'])
+        self.assertEqual(self.titles(type='hr'), ['Old', 'House'])
+        self.assertEqual(self.titles(policy_area=self.health.pk), ['House'])
+        self.assertEqual(self.titles(originating_body=self.senate.pk), ['Senate'])
+        self.assertEqual(self.titles(legislative_subject=self.subject.pk), ['Senate'])
+        self.assertEqual(self.titles(sponsor=self.cosponsor.pk), ['House'])
+        self.assertEqual(self.titles(cosponsor=self.cosponsor.pk), ['Senate'])
+        self.assertEqual(self.titles(min_introduction_date='2017-01-01', max_introduction_date='2017-05-31'),
+                         ['Senate'])
+        self.assertEqual(self.titles(has_cbo_estimate='true'), ['Senate'])
+        self.assertEqual(self.titles(has_cbo_estimate='false'), ['Old', 'House'])
+
+    def test_combined_filters(self):
+        self.assertEqual(self.titles(congress=115, type='HR'), ['House'])
+        self.assertEqual(self.titles(congress=115, cosponsor=self.cosponsor.pk, has_cbo_estimate='true'), ['Senate'])
+        self.assertEqual(self.titles(congress=114, sponsor=self.sponsor.pk), [])
+
+    def test_bad_values(self):
+        for params in ({'congress': 'latest'}, {'sponsor': 'heinrich'}, {'min_introduction_date': 'May'},
+                       {'has_cbo_estimate': 'maybe'}):
+            self.assertEqual(self.client.get('/api/bills/', params).status_code, 400)
+
+
+class BillFilterPlanTestCase(TestCase):
+    """
+    Checks that common filter combinations are answered from an index. Sequential scans are disabled, since the
+    planner rightly prefers them on tables this small.
+    """
+    def plan(self, **params):
+        """
+        Requests a page of bills and explains the query that fetched it.
+        :return: The query plan as text
+        """
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.client.get('/api/bills/', params).status_code, 200)
+        sql = next(query['sql'] for query in context.captured_queries if query['sql'].startswith('SELECT'))
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('EXPLAIN ' + sql)
+            return '\n'.join(row[0] for row in cursor.fetchall())
+
+    def test_index_plans(self):
+        for params, index in (({'congress': 115}, 'api_bill_congres_ce5626_idx'),
+                              ({'congress': 115, 'type': 'HR'}, 'api_bill_congres_7ab935_idx'),
+                              ({'policy_area': 1}, 'api_bill_policy__9804b2_idx'),
+                              ({'has_cbo_estimate': 'true'}, 'api_bill_with_cbo_idx'),
+                              ({'min_introduction_date': '2017-01-01'}, 'api_bill_introdu_9db350_idx')):
+            self.assertIn(index, self.plan(**params), params)
+
+    def test_related_filter_plans(self):
+        for params, table in (({'sponsor': 1}, 'api_bill_sponsors'), ({'cosponsor': 1}, 'api_cosponsorship'),
+                              ({'legislative_subject': 1}, 'api_bill_legislative_subjects')):
+            plan = self.plan(congress=115, **params)
+            self.assertIn(' on {table} '.format(table=table), plan, params)
+            self.assertNotIn('Seq Scan', plan, params)
@@ -0,0 +1,149 @@
+import datetime
+import re
+import tempfile
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from billserve.api.bitmaps import BillBitmapIndex, build_bitmap_index, current_bitmap_index
+from billserve.api.generation import bump_generation
+from billserve.api.models import *
+
+
+class BillBitmapIndexTestCase(TestCase):
+    fixtures = ['states.json', 'parties.json', 'districts.json', 'policy_areas.json', 'legislative_subjects.json']
+
+    def setUp(self):
+        self.democrat = Senator.objects.create(first_name='Martin', last_name='Heinrich',
+                                               state=State.objects.get(pk=32), party=Party.objects.get(pk=2))
+        self.republican = Representative.objects.create(first_name='David', last_name='Joyce',
+                                                        state=State.objects.get(pk=36), party=Party.objects.get(pk=3),
+                                                        district=District.objects.get(pk=1))
+        self.subject = LegislativeSubject.objects.get(pk=1)
+        self.health = PolicyArea.objects.create(name='Health')
+
+        self.senate_bill = self.create_bill('Senate', 115, 'S', datetime.date(2017, 5, 1), policy_area_id=1)
+        self.senate_bill.sponsors.add(self.democrat)
+        self.senate_bill.legislative_subjects.add(self.subject)
+        for is_original_cosponsor in (True, False):  # Cosponsoring twice still counts one cosponsor
+            Cosponsorship.objects.create(legislator=self.republican, bill=self.senate_bill,
+                                         is_original_cosponsor=is_original_cosponsor,
+                                         cosponsorship_date=datetime.date(2017, 5, 2))
+        self.house_bill = self.create_bill('House', 115, 'HR', datetime.date(2017, 6, 1), policy_area=self.health)
+        self.house_bill.sponsors.add(self.republican)
+        self.house_bill.legislative_subjects.add(self.subject)
+        Cosponsorship.objects.create(legislator=self.democrat, bill=self.house_bill, is_original_cosponsor=True,
+                                     cosponsorship_date=datetime.date(2017, 6, 2))
+        self.old_bill = self.create_bill('Old', 114, 'HR', datetime.date(2015, 1, 1))
+        self.old_bill.sponsors.add(self.democrat)
+        bump_generation()
+
+        self.index = BillBitmapIndex.build()
+        build_bitmap_index()
+
+    def create_bill(self, title, congress, bill_type, introduction_date, **kwargs):
+        return Bill.objects.create(bill_url='http://google.com', title=title, congress=congress, type=bill_type,
+                                   introduction_date=introduction_date, **kwargs)
+
+    def match(self, facets, *args):
+        return [Bill.objects.get(pk=pk).title for pk in self.index.match(facets, *args)]
+
+    def titles(self, **params):
+        """
+        Follows the bill list through every page, a bill at a time.
+        """
+        titles = []
+        response = self.client.get('/api/bills/', dict(params, page_size=1))
+        while True:
+            self.assertEqual(response.status_code, 200)
+            titles += [bill['title'].split(': ')[1] for bill in response.data['results']]
+            if response.data['next'] is None:
+                return titles
+            response = self.client.get(response.data['next'])
+
+    def test_match(self):
+        self.assertEqual(self.match({}), ['Senate', 'House', 'Old'])
+        self.assertEqual(self.match({'congress': [115], 'type': ['hr']}), ['House'])
+        self.assertEqual(self.match({'congress': [114, 115], 'sponsor_party': [2]}), ['Senate', 'Old'])
+        self.assertEqual(self.match({'legislative_subject': [self.subject.pk], 'sponsor_state': [36]}), ['House'])
+        self.assertEqual(self.match({'policy_area': [self.health.pk, 1]}), ['Senate', 'House'])
+        self.assertEqual(self.match({'type': ['HJRES']}), [])
+        self.assertEqual(self.match({'congress': [115]}, [3]), ['Senate'])
+        self.assertEqual(self.match({}, None, 2), [])
+        self.assertEqual(self.match({}, [2, 3], 1), ['Senate', 'House'])
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for name in ('first', 'second', 'third'):
+                self.index.save(name, directory)
+            self.index.save('third', directory)  # Another worker saving the same index keeps the first copy
+            self.assertIsNone(BillBitmapIndex.load('first', directory))
+            loaded = BillBitmapIndex.load('third', directory)
+            for facets in ({'congress': [115], 'sponsor_party': [3]}, {'sponsor_state': [32, 36]}):
+                self.assertEqual(list(loaded.match(facets)), list(self.index.match(facets)))
+
+    def test_current_index_waits_for_rebuild(self):
+        index = current_bitmap_index()
+        self.assertIsNotNone(index)
+        bump_generation()
+        self.assertIs(current_bitmap_index(), index)  # Ingest never builds an index on the request path
+        build_bitmap_index()
+        self.assertIsNot(current_bitmap_index(), index)
+
+    def test_bill_list(self):
+        self.assertEqual(self.titles(sponsor_party=2), ['Old', 'Senate'])
+        self.assertEqual(self.titles(sponsor_party=2, congress=115), ['Senate'])
+        self.assertEqual(self.titles(sponsor_state='32,36', type='s,hr', legislative_subject=self.subject.pk),
+                         ['Senate', 'House'])
+        self.assertEqual(self.titles(cosponsor_party=2, max_introduction_date='2017-05-31'), [])
+        self.assertEqual(self.titles(min_cosponsors=1, ordering='-bipartisanship_score'), ['House', 'Senate'])
+        self.assertEqual(self.titles(sponsor_party=1), [])
+        self.assertEqual(self.titles(sponsor_party='2,3', ordering='bipartisanship_score'), ['Senate', 'House', 'Old'])
+        self.assertEqual(self.titles(sponsor_party='2,3', title='e', min_introduction_date='2016-01-01'),
+                         ['Senate', 'House'])
+
+    def test_bill_list_without_index(self):
+        params = [{'sponsor_party': 2}, {'sponsor_state': '32,36', 'type': 's,hr'}, {'cosponsor_party': 2},
+                  {'min_cosponsors': 1}, {'cosponsor_party': 3, 'min_cosponsors': 2}, {'min_cosponsors': 0}]
+        expected = [self.titles(**data) for data in params]
+        with tempfile.TemporaryDirectory() as directory, override_settings(BILL_BITMAP_DIR=directory):
+            bump_generation()
+            self.assertIsNone(current_bitmap_index())
+            self.assertEqual([self.titles(**data) for data in params], expected)
+
+    def test_pages_read_only_their_bills(self):
+        for i in range(6):
+            bill = self.create_bill('Bill {i}'.format(i=i), 115, 'S', datetime.date(2018, 1, i + 1))
+            bill.sponsors.add(self.democrat)
+        bump_generation()
+        build_bitmap_index()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/bills/', {'sponsor_party': 2, 'page_size': 2})
+        self.assertEqual([bill['title'] for bill in response.data['results']], ['No. None: Old', 'No. None: Senate'])
+        # The bills ingested since the index was built, then the page of primary keys and versions, whose pks are the
+        # page's and one past it, then the missing fragments
+        self.assertEqual(len(queries), 3)
+        self.assertEqual(len(re.search(r'IN \(([^)]*)\)', queries[1]['sql']).group(1).split(',')), 3)
+
+    def test_bills_changed_since_the_index(self):
+        new_bill = self.create_bill('New', 115, 'S', datetime.date(2017, 5, 15), policy_area_id=1)
+        new_bill.sponsors.add(self.democrat)
+        new_bill.legislative_subjects.add(self.subject)
+        Bill.objects.filter(pk=self.senate_bill.pk).update(congress=116)
+        bump_generation()
+
+        self.assertEqual(self.titles(sponsor_party=2), ['Old', 'Senate', 'New'])
+        self.assertEqual(self.titles(sponsor_party=2, congress=115), ['New'])
+        self.assertEqual(self.titles(sponsor_party=2, legislative_subject=self.subject.pk,
+                                     ordering='-bipartisanship_score'), ['New', 'Senate'])  # Neither is scored yet
+
+    def test_bill_list_without_bitmap_filters(self):
+        self.assertEqual(self.titles(congress='114,115', type='HR'), ['Old', 'House'])
+        self.assertEqual(self.titles(sponsor='{d},{r}'.format(d=self.democrat.pk, r=self.republican.pk), congress=115),
+                         ['Senate', 'House'])
+
+    def test_bad_values(self):
+        for params in ({'sponsor_party': 'D'}, {'min_cosponsors': 'ten'}, {'sponsor_state': '32', 'congress': 'x'}):
+            self.assertEqual(self.client.get('/api/bills/', params).status_code, 400)
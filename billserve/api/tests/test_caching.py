@@ -0,0 +1,178 @@
+import datetime
+import json
+import threading
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.utils import timezone
+
+from billserve.api import caching, tasks
+from billserve.api.generation import bump_generation
+from billserve.api.models import *
+from billserve.api.serializers import BillSerializer
+
+
+class ResponseCacheTestCase(TestCase):
+    fixtures = ['policy_areas.json']
+
+    def test_repeated_reads_hit(self):
+        response = self.client.get('/api/policy-areas/1/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+
+        with self.assertNumQueries(0):
+            cached_response = self.client.get('/api/policy-areas/1/')
+        self.assertEqual(cached_response['X-Cache'], 'HIT')
+        self.assertEqual(cached_response.content, response.content)
+        self.assertEqual(cached_response['Content-Type'], response['Content-Type'])
+
+    def test_queries_are_cached_separately(self):
+        self.client.get('/api/bills/', {'page_size': 1, 'ordering': 'bipartisanship_score'})
+        response = self.client.get('/api/bills/', {'ordering': 'bipartisanship_score', 'page_size': 1})
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(self.client.get('/api/bills/', {'page_size': 2})['X-Cache'], 'MISS')
+
+    def test_new_generation_misses(self):
+        self.client.get('/api/policy-areas/1/')
+        PolicyArea.objects.filter(pk=1).update(name='Taxation')
+        bump_generation()
+
+        response = self.client.get('/api/policy-areas/1/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['name'], 'Taxation')
+
+    def test_errors_are_not_cached(self):
+        self.client.get('/api/policy-areas/0/')
+        self.assertEqual(self.client.get('/api/policy-areas/0/')['X-Cache'], 'MISS')
+
+    def test_metrics(self):
+        self.client.get('/api/policy-areas/')
+        self.client.get('/api/policy-areas/')
+        self.client.get('/api/policy-areas/')
+        response = self.client.get('/api/cache-metrics')
+        self.assertEqual((response.data['hits'], response.data['misses']), (2, 1))
+        self.assertAlmostEqual(response.data['hit_rate'], 2 / 3)
+
+
+class ConditionalGetTestCase(TestCase):
+    fixtures = ['states.json', 'parties.json', 'policy_areas.json']
+
+    def setUp(self):
+        self.bill = Bill.objects.create(bill_url='http://google.com', congress=115, title='Title',
+                                        last_modified=timezone.now() - datetime.timedelta(days=1))
+        bump_generation()
+
+    def test_validators(self):
+        response = self.client.get('/api/bills/{pk}/'.format(pk=self.bill.pk))
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', response)
+
+    def test_matching_etag_is_not_modified(self):
+        url = '/api/bills/{pk}/'.format(pk=self.bill.pk)
+        etag = self.client.get(url)['ETag']
+
+        with mock.patch.object(BillSerializer, 'to_representation') as to_representation:
+            with self.assertNumQueries(0):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+        to_representation.assert_not_called()
+
+    def test_if_modified_since(self):
+        url = '/api/policy-areas/1/'
+        last_modified = self.client.get(url)['Last-Modified']
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+    def test_modified_bill_changes_etag(self):
+        url = '/api/bills/{pk}/'.format(pk=self.bill.pk)
+        etag = self.client.get(url)['ETag']
+        Bill.objects.filter(pk=self.bill.pk).update(last_modified=timezone.now())
+        bump_generation()  # As ingest does whenever it changes a bill
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_new_generation_changes_etag(self):
+        url = '/api/policy-areas/1/'
+        etag = self.client.get(url)['ETag']
+        bump_generation()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_representations_have_distinct_etags(self):
+        url = '/api/policy-areas/1/'
+        self.assertNotEqual(self.client.get(url)['ETag'], self.client.get(url, HTTP_ACCEPT='text/html')['ETag'])
+
+    def test_reference_lists_are_long_lived(self):
+        for url in ('/api/parties/', '/api/states/'):
+            cache_control = self.client.get(url)['Cache-Control']
+            self.assertIn('public', cache_control)
+            self.assertIn('max-age={max_age}'.format(max_age=settings.API_REFERENCE_MAX_AGE), cache_control)
+        self.assertFalse(self.client.get('/api/bills/').has_header('Cache-Control'))
+
+
+class SingleFlightTestCase(SimpleTestCase):
+    def setUp(self):
+        self.calls = 0
+
+    def view(self, request, status=200):
+        self.calls += 1
+        time.sleep(0.2)
+        return JsonResponse({'calls': self.calls}, status=status)
+
+    def test_concurrent_misses_compute_once(self):
+        view, barrier, responses = caching.cached(self.view), threading.Barrier(8), []
+
+        def get():
+            request = RequestFactory().get('/api/slow/')
+            barrier.wait()
+            responses.append(view(request))
+
+        threads = [threading.Thread(target=get) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(sorted(response['X-Cache'] for response in responses), ['HIT'] * 7 + ['MISS'])
+        self.assertEqual({response.content for response in responses}, {b'{"calls": 1}'})
+
+    def test_uncacheable_responses_release_the_lock(self):
+        request = RequestFactory().get('/api/slow/')
+        caching.cached(lambda request: self.view(request, status=404))(request)
+        self.assertIsNone(cache.get(caching.lock_key(caching.response_cache_key(request))))
+
+
+class StaleWhileRevalidateTestCase(TestCase):
+    fixtures = ['legislative_subjects.json']
+    url = '/api/legislative-subjects/1/'
+
+    def test_stale_response_is_served_while_revalidating(self):
+        first = self.client.get(self.url)
+        LegislativeSubject.objects.filter(pk=1).update(name='Oversight')
+        bump_generation()
+
+        with mock.patch.object(tasks.refresh_response, 'delay') as delay, self.assertNumQueries(0):
+            stale = self.client.get(self.url)
+            self.assertEqual(self.client.get(self.url)['X-Cache'], 'STALE')
+        self.assertEqual((stale['X-Cache'], stale.content), ('STALE', first.content))
+        self.assertTrue(stale['ETag'].startswith('W/'))
+        delay.assert_called_once_with('http://testserver' + self.url, '')
+
+        tasks.refresh_response(*delay.call_args[0])
+        fresh = self.client.get(self.url)
+        self.assertEqual(fresh['X-Cache'], 'HIT')
+        self.assertEqual(json.loads(fresh.content.decode('utf-8'))['name'], 'Oversight')
+        self.assertNotEqual(fresh['ETag'], stale['ETag'])
+
+    def test_other_views_miss(self):
+        self.client.get('/api/legislative-subjects/')
+        bump_generation()
+        with mock.patch.object(tasks.refresh_response, 'delay') as delay:
+            self.assertEqual(self.client.get('/api/legislative-subjects/')['X-Cache'], 'MISS')
+        delay.assert_not_called()
@@ -0,0 +1,58 @@
+import datetime
+
+from django.test import TestCase
+
+from billserve.api.models import *
+
+
+class ExpansionTestCase(TestCase):
+    fixtures = ['states.json', 'parties.json', 'districts.json', 'policy_areas.json']
+
+    def setUp(self):
+        new_mexico, democrat = State.objects.get(pk=32), Party.objects.get(pk=2)
+        self.senator = Senator.objects.create(first_name='Martin', last_name='Heinrich', state=new_mexico,
+                                              party=democrat)
+        self.colleague = Senator.objects.create(first_name='Tom', last_name='Udall', state=new_mexico, party=democrat)
+        for i in range(3):
+            bill = Bill.objects.create(bill_url='http://google.com', congress=115, title='Bill {i}'.format(i=i),
+                                       policy_area=PolicyArea.objects.get(pk=1))
+            bill.sponsors.add(self.senator)
+            Cosponsorship.objects.create(legislator=self.colleague, bill=bill, is_original_cosponsor=True,
+                                         cosponsorship_date=datetime.date(2017, 5, 1))
+
+    def test_collections_default_to_counts(self):
+        response = self.client.get('/api/states/32/')
+        self.assertEqual(response.data['senators'], 2)
+        self.assertEqual(response.data['representatives'], 0)
+        self.assertEqual(response.data['representative_count'], 0)
+
+        response = self.client.get('/api/senators/{pk}/'.format(pk=self.senator.pk))
+        self.assertEqual((response.data['sponsored_bills'], response.data['cosponsored_bills']), (3, 0))
+
+    def test_expand(self):
+        response = self.client.get('/api/states/32/', {'expand': 'senators'})
+        senators = {senator['last_name']: senator for senator in response.data['senators']}
+        self.assertEqual(senators['Udall']['cosponsored_bills'], 3)
+
+        response = self.client.get('/api/states/32/', {'expand': 'senators.cosponsored_bills'})
+        senators = {senator['last_name']: senator for senator in response.data['senators']}
+        self.assertEqual(sorted(bill['title'].split(': ')[1] for bill in senators['Udall']['cosponsored_bills']),
+                         ['Bill 0', 'Bill 1', 'Bill 2'])
+        self.assertEqual(senators['Udall']['sponsored_bills'], 0)
+
+    def test_fields(self):
+        response = self.client.get('/api/states/32/', {'fields': 'name,senators.last_name', 'expand': 'senators'})
+        self.assertEqual(response.data['name'], 'New Mexico')
+        self.assertEqual(sorted(response.data['senators'], key=lambda senator: senator['last_name']),
+                         [{'last_name': 'Heinrich'}, {'last_name': 'Udall'}])
+        self.assertEqual(set(response.data), {'name', 'senators'})
+
+        response = self.client.get('/api/policy-areas/1/', {'fields': 'name', 'expand': 'bills'})
+        self.assertEqual(response.data, {'name': PolicyArea.objects.get(pk=1).name})
+
+    def test_collapsed_payload_is_smaller(self):
+        collapsed = self.client.get('/api/policy-areas/1/')
+        expanded = self.client.get('/api/policy-areas/1/', {'expand': 'bills'})
+        self.assertEqual(collapsed.data['bills'], 3)
+        self.assertEqual(len(expanded.data['bills']), 3)
+        self.assertLess(len(collapsed.content), len(expanded.content))
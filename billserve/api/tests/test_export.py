@@ -0,0 +1,73 @@
+import csv
+import datetime
+import io
+import json
+
+from django.test import TestCase
+
+from billserve.api import export
+from billserve.api.models import *
+
+
+class ExportTestCase(TestCase):
+    fixtures = ['states.json', 'parties.json', 'districts.json', 'policy_areas.json', 'legislative_subjects.json']
+
+    def setUp(self):
+        self.senator = Senator.objects.create(
+            first_name='Martin', last_name='Heinrich', state=State.objects.get(pk=32), party=Party.objects.get(pk=2))
+        self.representative = Representative.objects.create(
+            first_name='David', last_name='Joyce', state=State.objects.get(pk=36),
+            party=Party.objects.get(pk=3), district=District.objects.get(pk=1))
+        self.subject = LegislativeSubject.objects.get(pk=1)
+        self.bills = []
+        for i in range(5):
+            bill = Bill.objects.create(bill_url='http://google.com', congress=115, bill_number=i,
+                                       title='Bill {i}'.format(i=i), introduction_date=datetime.date(2017, 5, 1),
+                                       policy_area=PolicyArea.objects.get(pk=1))
+            bill.sponsors.add(self.senator)
+            bill.legislative_subjects.add(self.subject)
+            Cosponsorship.objects.create(legislator=self.representative, bill=bill, is_original_cosponsor=i == 0,
+                                         cosponsorship_date=datetime.date(2017, 5, 2))
+            self.bills.append(bill)
+
+    def read_ndjson(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return [json.loads(line) for line in b''.join(response.streaming_content).decode('utf-8').splitlines()]
+
+    def test_bills_ndjson(self):
+        bills = self.read_ndjson('/api/export/bills.ndjson')
+        self.assertEqual([bill['id'] for bill in bills], [bill.pk for bill in self.bills])
+        self.assertEqual(bills[0]['sponsors'], [self.senator.pk])
+        self.assertEqual(bills[0]['cosponsors'], [self.representative.pk])
+        self.assertEqual(bills[0]['legislative_subjects'], [self.subject.name])
+        self.assertEqual(bills[0]['policy_area'], PolicyArea.objects.get(pk=1).name)
+        self.assertEqual(bills[0]['introduction_date'], '2017-05-01')
+
+    def test_bills_csv(self):
+        response = self.client.get('/api/export/bills.csv')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('bills.csv', response['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode('utf-8'))))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0]['sponsors'], str(self.senator.pk))
+        self.assertEqual(rows[0]['title'], 'Bill 0')
+
+    def test_legislators_and_cosponsorships(self):
+        legislators = self.read_ndjson('/api/export/legislators.ndjson')
+        self.assertEqual([(legislator['kind'], legislator['party'], legislator['district'])
+                          for legislator in legislators],
+                         [('senator', 'D', None), ('representative', 'R', self.representative.district.number)])
+
+        cosponsorships = self.read_ndjson('/api/export/cosponsorships.ndjson')
+        self.assertEqual(len(cosponsorships), 5)
+        self.assertEqual(sum(cosponsorship['is_original_cosponsor'] for cosponsorship in cosponsorships), 1)
+
+    def test_chunks_read_relations_once_each(self):
+        content_type, lines = export.export('bills', 'ndjson', chunk_size=2)
+        with self.assertNumQueries(1 + 3 * 3):  # The bill cursor, and three relations for each of three chunks
+            self.assertEqual(len(list(lines)), 5)
+
+    def test_unknown_dataset(self):
+        self.assertEqual(self.client.get('/api/export/votes.ndjson').status_code, 404)
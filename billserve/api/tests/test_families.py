@@ -0,0 +1,67 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from billserve.api.analytics import connected_components
+from billserve.api.models import *
+
+
+class ConnectedComponentsTestCase(TestCase):
+    def test_connected_components(self):
+        roots = connected_components(6, [(4, 5), (1, 3), (5, 1)])
+        self.assertEqual(list(roots), [0, 1, 2, 1, 1, 1])
+
+    def test_no_edges(self):
+        self.assertEqual(list(connected_components(3, [])), [0, 1, 2])
+
+
+class BillFamilyTestCase(TestCase):
+    def setUp(self):
+        self.bills = [Bill.objects.create(bill_url='http://google.com', title=str(i)) for i in range(5)]
+        for bill in self.bills:
+            bill.family_id = bill.pk
+            bill.save()
+
+    def family_ids(self):
+        return [bill.family_id for bill in Bill.objects.order_by('pk')]
+
+    def test_add_related_bill(self):
+        a, b, c, d, e = self.bills
+        Bill.objects.add_related_bill(d.pk, e.pk)
+        Bill.objects.add_related_bill(b.pk, d.pk)
+        self.assertEqual(self.family_ids(), [a.pk, b.pk, c.pk, b.pk, b.pk])
+
+    def test_merge_while_creating(self):
+        a = self.bills[0]
+        data = {
+            'url': 'http://google.com', 'billType': 'HR', 'billNumber': '1', 'title': 'New', 'congress': '115',
+            'introducedDate': '2017-05-01', 'sponsors': [], 'cosponsors': [],
+            'relatedBills': [{'type': 'HR', 'congress': 115, 'number': 2}], 'summaries': {'billSummaries': []},
+            'subjects': {'billSubjects': {'legislativeSubjects': []}}, 'committees': {'billCommittees': []},
+        }
+
+        def execute(related_bill_url, current_bill_pk):
+            # The related bill task chain merges the families before creating the bill is done
+            Bill.objects.add_related_bill(current_bill_pk, a.pk)
+
+        with mock.patch('billserve.api.managers.RelatedBillChain.execute', side_effect=execute):
+            bill = Bill.objects.create_from_dict(data)
+        self.assertEqual(Bill.objects.get(pk=bill.pk).family_id, a.pk)
+        self.assertEqual(Bill.objects.get(pk=bill.pk).title, 'New')
+
+    def test_rebuild_families(self):
+        a, b, c, d, e = self.bills
+        a.related_bills.add(c)
+        c.related_bills.add(e)
+        Bill.objects.update(family_id=None)
+
+        Bill.objects.rebuild_families()
+        self.assertEqual(self.family_ids(), [a.pk, b.pk, a.pk, d.pk, a.pk])
+
+    def test_family_endpoint(self):
+        a, b, c, d, e = self.bills
+        Bill.objects.add_related_bill(c.pk, a.pk)
+        response = self.client.get('/api/bills/{pk}/family/'.format(pk=c.pk))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([bill['title'] for bill in response.data], [str(a), str(c)])
+        self.assertEqual(self.client.get('/api/bills/0/family/').status_code, 404)
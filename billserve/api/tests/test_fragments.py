@@ -0,0 +1,59 @@
+import datetime
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from billserve.api import fragments
+from billserve.api.generation import bump_generation, bump_rebuild_generation
+from billserve.api.models import *
+from billserve.api.views import BillList
+
+
+class FragmentCacheTestCase(TestCase):
+    fixtures = ['policy_areas.json']
+
+    def setUp(self):
+        self.bills = [Bill.objects.create(bill_url='http://google.com', congress=115, bill_number=i,
+                                          title='Bill {i}'.format(i=i), introduction_date=datetime.date(2017, 5, i + 1),
+                                          policy_area=PolicyArea.objects.get(pk=1), last_modified=timezone.now())
+                      for i in range(4)]
+        self.requests = 0
+
+    def get(self, queries, url='/api/bills/'):
+        """
+        Requests a list with a query string of its own, so it's never answered from the response cache.
+        """
+        self.requests += 1
+        with self.assertNumQueries(queries):
+            response = self.client.get(url, {'request': self.requests})
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_misses_are_read_once(self):
+        cold = self.get(3)
+        warm = self.get(2)  # Only the page of primary keys and versions
+        self.assertEqual(cold.content, warm.content)
+
+        with mock.patch.object(BillList, 'projection_class', None):
+            self.assertEqual(self.get(2).content, cold.content)
+
+    def test_changed_objects_are_rendered_again(self):
+        self.get(3)
+        Bill.objects.filter(pk=self.bills[0].pk).update(title='Renamed', last_modified=timezone.now())
+        with mock.patch.object(fragments.cache, 'set_many', wraps=fragments.cache.set_many) as set_many:
+            response = self.get(3)
+        self.assertEqual(len(set_many.call_args[0][0]), 1)
+        self.assertIn('No. 0: Renamed', [bill['title'] for bill in response.data['results']])
+
+    def test_rebuild_invalidates_fragments(self):
+        self.get(3)
+        bump_generation()  # As ingest does for every bill, which leaves the fragments of other bills valid
+        self.get(2)
+        bump_rebuild_generation()
+        self.get(3)
+
+    def test_fragments_depend_on_urls(self):
+        self.get(3)
+        response = self.get(3, '/api/bills.json')
+        self.assertTrue(response.data['results'][0]['url'].endswith('.json'))
@@ -0,0 +1,48 @@
+import unittest
+
+from django.db import connection
+from django.test import TestCase
+
+from billserve.api.models import *
+
+
+def trigram_installed():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+class NameLookupTestCase(TestCase):
+    fixtures = ['states.json', 'parties.json', 'districts.json', 'policy_areas.json', 'legislative_subjects.json']
+
+    @classmethod
+    def setUpClass(cls):
+        if not trigram_installed():
+            raise unittest.SkipTest('The pg_trgm extension is not installed.')
+        super().setUpClass()
+
+    def setUp(self):
+        self.schumer = Senator.objects.create(first_name='Charles', last_name='Schumer',
+                                              state=State.objects.get(pk=32), party=Party.objects.get(pk=2))
+        self.ocasio_cortez = Representative.objects.create(
+            first_name='Alexandria', last_name='Ocasio-Cortez', state=State.objects.get(pk=36),
+            party=Party.objects.get(pk=2), district=District.objects.get(pk=1))
+        self.health_care = LegislativeSubject.objects.create(name='Health care coverage and access')
+
+    def test_legislator_lookup(self):
+        self.assertEqual(list(Legislator.objects.lookup('schumer')), [self.schumer])
+        self.assertEqual(list(Legislator.objects.lookup('ocasio')), [self.ocasio_cortez])
+        self.assertEqual(list(Legislator.objects.lookup('shumer')), [self.schumer])
+
+    def test_subject_lookup(self):
+        self.assertEqual(LegislativeSubject.objects.lookup('health care').first(), self.health_care)
+
+    def test_lookup_endpoint(self):
+        response = self.client.get('/api/lookup/', {'q': 'ocasio'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([legislator['full_name'] for legislator in response.data['legislators']],
+                         [str(self.ocasio_cortez)])
+        self.assertGreater(response.data['legislators'][0]['score'], 0.5)
+        self.assertEqual(self.client.get('/api/lookup/').status_code, 400)
+        for limit in (0, -1):
+            self.assertEqual(self.client.get('/api/lookup/', {'q': 'ocasio', 'limit': limit}).status_code, 400)
@@ -0,0 +1,50 @@
+import datetime
+
+from django.test import TestCase
+
+from billserve.api.models import *
+
+
+class KeysetPaginationTestCase(TestCase):
+    fixtures = ['states.json', 'parties.json']
+
+    def setUp(self):
+        dates = [datetime.date(2017, 5, 2), None, datetime.date(2017, 5, 1), datetime.date(2017, 5, 1), None,
+                 datetime.date(2017, 5, 3)]
+        scores = [0.5, None, 0.25, 0.5, 1.0, None]
+        self.bills = [Bill.objects.create(bill_url='http://google.com', bill_number=i, introduction_date=date,
+                                          bipartisanship_score=score)
+                      for i, (date, score) in enumerate(zip(dates, scores))]
+
+    def walk(self, path, **params):
+        """
+        Follows next links from the first page to the last.
+        :return: The bill numbers or full names on every page, in order
+        """
+        response = self.client.get(path, dict(params, page_size=2))
+        pages = []
+        while True:
+            self.assertEqual(response.status_code, 200)
+            pages.append([row['title'] if 'title' in row else row['full_name'] for row in response.data['results']])
+            if response.data['next'] is None:
+                return pages
+            response = self.client.get(response.data['next'])
+
+    def test_bills_by_introduction_date(self):
+        numbers = [[int(title.split()[1].rstrip(':')) for title in page] for page in self.walk('/api/bills/')]
+        self.assertEqual(numbers, [[2, 3], [0, 5], [1, 4]])
+
+    def test_bills_by_descending_score(self):
+        numbers = [[int(title.split()[1].rstrip(':')) for title in page]
+                   for page in self.walk('/api/bills/', ordering='-bipartisanship_score')]
+        self.assertEqual(numbers, [[4, 3], [0, 2], [5, 1]])
+
+    def test_legislators_by_last_name(self):
+        for first_name, last_name in (('Tom', 'Udall'), ('Martin', 'Heinrich'), ('Ben', 'Ray'), ('Ann', 'Heinrich')):
+            Senator.objects.create(first_name=first_name, last_name=last_name, state=State.objects.get(pk=32),
+                                   party=Party.objects.get(pk=2))
+        names = [[name.split(' [')[0] for name in page] for page in self.walk('/api/senators/')]
+        self.assertEqual(names, [['Sen. Martin Heinrich', 'Sen. Ann Heinrich'], ['Sen. Ben Ray', 'Sen. Tom Udall']])
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get('/api/bills/', {'cursor': 'garbage'}).status_code, 404)
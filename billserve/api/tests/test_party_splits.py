@@ -0,0 +1,84 @@
+import datetime
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from billserve.api.models import *
+
+
+class PolicyAreaPartySplitManagerTestCase(TestCase):
+    fixtures = ['states.json', 'parties.json', 'districts.json', 'policy_areas.json']
+
+    def setUp(self):
+        self.education = PolicyArea.objects.get(pk=1)
+        self.senator = Senator.objects.create(
+            first_name='Martin', last_name='Heinrich', state=State.objects.get(pk=32), party=Party.objects.get(pk=2))
+        self.representative = Representative.objects.create(
+            first_name='David', last_name='Joyce', state=State.objects.get(pk=36),
+            party=Party.objects.get(pk=3), district=District.objects.get(pk=1))
+        self.may_bill = self.create_bill(datetime.date(2017, 5, 1), sponsor=self.senator,
+                                         cosponsors=[self.representative])
+        self.other_may_bill = self.create_bill(datetime.date(2017, 5, 20), sponsor=self.representative)
+        self.june_bill = self.create_bill(datetime.date(2017, 6, 2), sponsor=self.representative,
+                                          cosponsors=[self.senator])
+        self.manager = PolicyAreaPartySplit.objects
+
+    def create_bill(self, introduction_date, sponsor, cosponsors=()):
+        bill = Bill.objects.create(bill_url='http://google.com', congress=115, policy_area=self.education,
+                                   introduction_date=introduction_date)
+        bill.sponsors.add(sponsor)
+        for cosponsor in cosponsors:
+            Cosponsorship.objects.create(legislator=cosponsor, bill=bill, is_original_cosponsor=True,
+                                         cosponsorship_date=introduction_date)
+        return bill
+
+    def test_rebuild(self):
+        self.manager.rebuild()
+        self.assertEqual(self.manager.count(), 2)
+
+        may = self.manager.get(policy_area=self.education, congress=115, month=datetime.date(2017, 5, 1))
+        self.assertEqual(may.bill_count, 2)
+        self.assertEqual((may.sponsor_red_count, may.sponsor_blue_count, may.sponsor_white_count), (1, 1, 0))
+        self.assertEqual((may.cosponsor_red_count, may.cosponsor_blue_count, may.cosponsor_white_count), (1, 0, 0))
+
+        june = self.manager.get(policy_area=self.education, congress=115, month=datetime.date(2017, 6, 1))
+        self.assertEqual(june.bill_count, 1)
+        self.assertEqual((june.sponsor_red_count, june.cosponsor_blue_count), (1, 1))
+
+    def test_refresh_for_bills(self):
+        self.manager.refresh_for_bills([self.june_bill.pk])
+        self.assertEqual(self.manager.count(), 1)
+
+        new_june_bill = self.create_bill(datetime.date(2017, 6, 30), sponsor=self.senator)
+        self.manager.refresh_for_bills([new_june_bill.pk])
+
+        june = self.manager.get()
+        self.assertEqual(june.bill_count, 2)
+        self.assertEqual((june.sponsor_red_count, june.sponsor_blue_count), (1, 1))
+
+    def test_refresh_matches_rebuild(self):
+        self.manager.refresh_for_bills([self.may_bill.pk, self.june_bill.pk])
+        refreshed = list(self.manager.values_list('month', 'bill_count', 'sponsor_red_count', 'cosponsor_red_count'))
+        self.manager.rebuild()
+        rebuilt = list(self.manager.values_list('month', 'bill_count', 'sponsor_red_count', 'cosponsor_red_count'))
+        self.assertEqual(refreshed, rebuilt)
+
+
+class PolicyAreaPartySplitListTestCase(TestCase):
+    fixtures = ['policy_areas.json']
+
+    def setUp(self):
+        education = PolicyArea.objects.get(pk=1)
+        for congress, month in ((114, datetime.date(2016, 1, 1)), (115, datetime.date(2017, 5, 1)),
+                                (115, datetime.date(2017, 6, 1))):
+            PolicyAreaPartySplit.objects.create(policy_area=education, congress=congress, month=month, bill_count=1)
+        self.client = APIClient()
+
+    def test_filters(self):
+        response = self.client.get('/api/policy-area-splits/', {'congress': 115, 'start_month': '2017-06'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([split['month'] for split in response.data], ['2017-06'])
+
+    def test_bad_month(self):
+        response = self.client.get('/api/policy-area-splits/', {'start_month': 'June'})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,92 @@
+import datetime
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from billserve.api.models import *
+from billserve.api.serializers import SenatorShortSerializer
+from billserve.api.views import BillList, BillFamilyList, LegislatorList, RepresentativeList, SenatorList
+
+
+class ProjectionTestCase(TestCase):
+    """
+    Golden tests: every list served through a projection must render byte for byte as its serializer renders it.
+    """
+    fixtures = ['states.json', 'parties.json', 'districts.json', 'policy_areas.json']
+
+    def setUp(self):
+        for i, state in enumerate(State.objects.all()[:4]):
+            Senator.objects.create(first_name='Senator', last_name='Ümlaut {i}'.format(i=i), state=state,
+                                   party=Party.objects.get(pk=1 + i % 3), bipartisanship_score=0.5)
+            Representative.objects.create(first_name='Representative', last_name=str(i), state=state,
+                                          party=Party.objects.get(pk=1 + i % 3),
+                                          district=District.objects.get(pk=1) if i else None)
+        self.bills = []
+        for i in range(5):
+            self.bills.append(Bill.objects.create(
+                bill_url='http://google.com', congress=115, bill_number=i or None, title='Bill {i}'.format(i=i),
+                introduction_date=datetime.date(2017, 5, i + 1) if i % 2 else None,
+                policy_area=PolicyArea.objects.get(pk=1) if i % 3 else None,
+                bipartisanship_score=i / 3 if i else None))
+        self.bills[1].related_bills.add(self.bills[2])
+        Bill.objects.filter(pk__in=[self.bills[1].pk, self.bills[2].pk]).update(family_id=self.bills[1].pk)
+
+    def assertMatchesSerializer(self, view, url, data=None):
+        """
+        Requests a URL through the projection and through the serializer, and compares the rendered bytes.
+        :return: The response served through the projection
+        """
+        cache.clear()
+        projected = self.client.get(url, data)
+        cache.clear()
+        with mock.patch.object(view, 'projection_class', None):
+            serialized = self.client.get(url, data)
+        self.assertEqual(projected.status_code, 200)
+        self.assertEqual(projected.content, serialized.content)
+        return projected
+
+    def test_bills(self):
+        for data in ({}, {'ordering': '-bipartisanship_score'}, {'ordering': 'bipartisanship_score'},
+                     {'title': 'Bill'}):
+            self.assertMatchesSerializer(BillList, '/api/bills/', data)
+        self.assertMatchesSerializer(BillList, '/api/bills.json')
+
+    def test_bill_pages(self):
+        response = self.assertMatchesSerializer(BillList, '/api/bills/', {'page_size': 2})
+        pages = 1
+        while response.data['next'] is not None:
+            response = self.assertMatchesSerializer(BillList, response.data['next'])
+            pages += 1
+        self.assertEqual(pages, 3)
+
+    def test_legislators(self):
+        self.assertMatchesSerializer(SenatorList, '/api/senators/')
+        self.assertMatchesSerializer(RepresentativeList, '/api/representatives/', {'page_size': 3})
+        self.assertMatchesSerializer(RepresentativeList, '/api/representatives.json')
+
+    def test_polymorphic_legislators(self):
+        response = self.assertMatchesSerializer(LegislatorList, '/api/legislators/', {'page_size': 5})
+        self.assertMatchesSerializer(LegislatorList, response.data['next'])
+        self.assertEqual({legislator['full_name'][:4] for legislator in response.data['results']}, {'Rep.', 'Sen.'})
+
+        with self.assertNumQueries(1):  # One query across both subclasses
+            self.client.get('/api/legislators/', {'page_size': 8})
+
+    def test_one_serializer_per_subclass(self):
+        bill = self.bills[0]
+        for senator in Senator.objects.all():
+            Cosponsorship.objects.create(legislator=senator, bill=bill, is_original_cosponsor=False,
+                                         cosponsorship_date=datetime.date(2017, 5, 1))
+        init = SenatorShortSerializer.__init__
+        with mock.patch.object(SenatorShortSerializer, '__init__', autospec=True, side_effect=init) as constructor:
+            response = self.client.get('/api/bills/{pk}/'.format(pk=bill.pk))
+        self.assertEqual(len(response.data['cosponsors']), 4)
+        self.assertEqual(constructor.call_count, 1)
+
+    def test_bill_family(self):
+        self.assertMatchesSerializer(BillFamilyList, '/api/bills/{pk}/family/'.format(pk=self.bills[2].pk))
+
+    def test_projection_skips_model_instances(self):
+        with mock.patch.object(Bill, '__init__', side_effect=AssertionError('Bill instantiated')):
+            self.assertEqual(self.client.get('/api/bills/').status_code, 200)
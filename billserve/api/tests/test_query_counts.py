@@ -0,0 +1,128 @@
+import datetime
+
+import pytest
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.management import call_command
+
+from billserve.api.generation import bump_generation
+from billserve.api.models import *
+
+pytestmark = pytest.mark.django_db
+
+
+class Corpus:
+    """
+    Grows a small but fully connected corpus of legislators, bills and rollups, so that the number of queries each
+    endpoint makes can be compared across corpus sizes.
+    """
+    def __init__(self):
+        call_command('loaddata', 'states.json', 'parties.json', 'districts.json', 'policy_areas.json',
+                     'legislative_subjects.json', verbosity=0)
+        self.democrat, self.republican = Party.objects.get(pk=2), Party.objects.get(pk=3)
+        self.state, self.district = State.objects.get(pk=32), District.objects.get(pk=1)
+        self.policy_area, self.subject = PolicyArea.objects.get(pk=1), LegislativeSubject.objects.get(pk=1)
+        self.committee = Committee.objects.create(name='Finance', system_code='ssfi00')
+        LegislativeSubjectSupportSplit.objects.create(legislative_subject=self.subject)
+        self.senators, self.representatives, self.bills = [], [], []
+
+    def grow(self, size):
+        """
+        Adds senators, representatives and bills until there are size of each.
+        :param size: The number of each to end up with
+        """
+        for i in range(len(self.bills), size):
+            party = self.democrat if i % 2 else self.republican
+            senator = Senator.objects.create(first_name='Senator', last_name=str(i), party=party, state=self.state)
+            senator.committees.add(self.committee)
+            representative = Representative.objects.create(first_name='Representative', last_name=str(i),
+                                                           party=party, state=self.state, district=self.district)
+
+            bill = Bill.objects.create(bill_url='http://google.com', title='Tax Act {i}'.format(i=i), bill_number=i,
+                                       congress=115, policy_area=self.policy_area)
+            bill.sponsors.add(senator)
+            Cosponsorship.objects.create(legislator=representative, bill=bill, is_original_cosponsor=True,
+                                         cosponsorship_date=datetime.date(2017, 5, 1))
+            bill.legislative_subjects.add(self.subject)
+            bill.committees.add(self.committee)
+            BillSummary.objects.create(bill=bill, name='Introduced', text='Cuts taxes.', action_description='Intro',
+                                       action_date=datetime.date(2017, 5, 1))
+            for related_bill in self.bills:
+                related_bill.related_bills.add(bill)
+                bill.family_id = related_bill.family_id
+            bill.family_id = bill.family_id or bill.pk
+            bill.save()
+
+            for collaborator in self.senators:
+                LegislatorCollaboration.objects.create(legislator=senator, collaborator=collaborator, congress=115,
+                                                       shared_bill_count=1)
+                LegislatorCollaboration.objects.create(legislator=collaborator, collaborator=representative,
+                                                       congress=115, shared_bill_count=1)
+            PolicyAreaPartySplit.objects.create(policy_area=self.policy_area, congress=115,
+                                                month=datetime.date(2017, 1 + i, 1), bill_count=1)
+
+            self.senators.append(senator)
+            self.representatives.append(representative)
+            self.bills.append(bill)
+
+        Bill.objects.update_search_vectors()
+        BillSignature.objects.index_bills()
+        bump_generation()
+
+
+@pytest.fixture
+def corpus():
+    return Corpus()
+
+
+# Read views run outside ATOMIC_REQUESTS, so no count includes a savepoint.
+ENDPOINTS = [
+    ('/api/', 0),
+    ('/api/parties/', 1),
+    ('/api/parties/2/', 1),
+    ('/api/parties/2/?expand=senators,representatives', 3),
+    ('/api/states/', 1),
+    ('/api/states/32/', 1),
+    ('/api/states/32/?expand=senators,representatives', 5),
+    ('/api/states/32/?expand=senators.sponsored_bills,senators.cosponsored_bills,representatives', 7),
+    ('/api/districts/', 1),
+    ('/api/districts/1/', 3),
+    ('/api/legislators/', 1),
+    ('/api/legislators/{senator}/collaborators/', 8),
+    ('/api/senators/', 1),
+    ('/api/senators/{senator}/', 2),
+    ('/api/senators/{senator}/?expand=sponsored_bills,cosponsored_bills', 4),
+    ('/api/representatives/', 1),
+    ('/api/representatives/{representative}/', 2),
+    ('/api/bills/', 3),  # Includes reading the rows of the bills missing from the fragment cache
+    ('/api/bills/{bill}/', 15),
+    ('/api/bills/{bill}/family/', 3),
+    ('/api/bills/{bill}/similar/', 4),
+    ('/api/bills/search/?q=tax', 2),
+    ('/api/legislative-subjects/', 1),
+    ('/api/legislative-subjects/1/', 11),
+    ('/api/legislative-subjects/1/?expand=bills', 12),
+    ('/api/policy-areas/', 1),
+    ('/api/policy-areas/1/', 2),
+    ('/api/policy-areas/1/?expand=bills', 2),
+    ('/api/policy-area-splits/', 1),
+]
+
+
+@pytest.mark.parametrize('path, expected', ENDPOINTS)
+def test_query_count_is_constant(client, corpus, django_assert_num_queries, path, expected):
+    corpus.grow(1)
+    url = path.format(senator=corpus.senators[0].pk, representative=corpus.representatives[0].pk,
+                      bill=corpus.bills[0].pk)
+    # Warms process-wide caches, such as the content types polymorphic querysets look up, which a request at this size
+    # may not reach
+    ContentType.objects.get_for_models(*apps.get_app_config('api').get_models())
+    client.get(url)
+
+    for size in (2, 5):
+        corpus.grow(size)
+        cache.clear()  # Views that serve stale responses would otherwise answer from the warm-up's
+        with django_assert_num_queries(expected):
+            response = client.get(url)
+        assert response.status_code == 200
@@ -0,0 +1,69 @@
+from django.db import DEFAULT_DB_ALIAS, connections, router
+from django.http import HttpResponse
+from django.test import RequestFactory, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+
+from billserve.api.caching import revalidate
+from billserve.api.models import *
+from billserve.api.routers import PRIMARY_PIN_COOKIE, PrimaryPinningMiddleware
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTestCase(TransactionTestCase):
+    """
+    The replica alias mirrors the default database, so it only sees committed rows, hence the transaction test case.
+    """
+    databases = {'default', 'replica'}
+    fixtures = ['parties.json']
+
+    def get(self, url):
+        """
+        :return: A tuple of the response and the number of queries made on the default and replica databases
+        """
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(primary.captured_queries), len(replica.captured_queries)
+
+    def test_read_views_use_replica(self):
+        response, primary, replica = self.get('/api/parties/')
+        self.assertEqual(len(response.data), Party.objects.count())
+        self.assertEqual((primary, replica), (0, 1))
+        self.assertNotIn(PRIMARY_PIN_COOKIE, response.cookies)
+
+    def test_pinned_client_reads_primary(self):
+        self.client.cookies[PRIMARY_PIN_COOKIE] = '1'
+        _, primary, replica = self.get('/api/parties/')
+        self.assertEqual((primary, replica), (1, 0))
+
+    def test_other_reads_use_primary(self):
+        self.assertEqual(router.db_for_read(Party), DEFAULT_DB_ALIAS)
+        self.assertEqual(router.db_for_write(Party), DEFAULT_DB_ALIAS)
+        self.assertFalse(router.allow_migrate('replica', 'api'))
+
+    def test_writes_pin_client(self):
+        def write(request):
+            Party.objects.create(name='Green', abbreviation='G')
+            return HttpResponse()
+
+        def read(request):
+            list(Party.objects.all())
+            return HttpResponse()
+
+        request = RequestFactory().post('/')
+        self.assertIn(PRIMARY_PIN_COOKIE, PrimaryPinningMiddleware(write)(request).cookies)
+        self.assertNotIn(PRIMARY_PIN_COOKIE, PrimaryPinningMiddleware(read)(request).cookies)
+
+    def test_task_writes_dont_pin_revalidation(self):
+        Party.objects.create(name='Green', abbreviation='G')  # As a task would, outside of any request
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            revalidate('http://testserver/api/parties/', '')
+        self.assertEqual((len(primary.captured_queries), len(replica.captured_queries)), (0, 1))
+        self.assertEqual(router.db_for_read(Party), DEFAULT_DB_ALIAS)  # Only read-only views read replicas
+
+    def test_read_views_are_not_atomic(self):
+        self.assertIn(DEFAULT_DB_ALIAS, resolve('/api/bills/').func._non_atomic_requests)
+        self.assertFalse(hasattr(resolve('/api/rebuild').func, '_non_atomic_requests'))
@@ -0,0 +1,40 @@
+import datetime
+
+from django.test import TestCase
+
+from billserve.api.models import *
+
+
+class BillSearchTestCase(TestCase):
+    def setUp(self):
+        self.loans = Bill.objects.create(bill_url='http://google.com', bill_number=1, title='Student Loan Relief Act')
+        self.banks = Bill.objects.create(bill_url='http://google.com', bill_number=2, title='Community Banking Act')
+        BillSummary.objects.create(bill=self.banks, name='Introduced in Senate', text='Old summary about farms.',
+                                   action_description='Introduced', action_date=datetime.date(2017, 1, 1))
+        BillSummary.objects.create(bill=self.banks, name='Passed Senate', action_description='Passed',
+                                   text='Caps interest rates on student loans held by community banks.',
+                                   action_date=datetime.date(2017, 6, 1))
+        self.farms = Bill.objects.create(bill_url='http://google.com', bill_number=3, title='Farm Bill')
+        Bill.objects.update_search_vectors()
+
+    def test_title_outranks_summary(self):
+        self.assertEqual(list(Bill.objects.search('student loans')), [self.loans, self.banks])
+
+    def test_latest_summary_only(self):
+        self.assertEqual(list(Bill.objects.search('farms')), [self.farms])
+
+    def test_headline(self):
+        self.assertIn('<mark>loans</mark>', Bill.objects.search('loans').get(pk=self.banks.pk).headline)
+        self.assertIn('<mark>Loan</mark>', Bill.objects.search('loans').get(pk=self.loans.pk).headline)
+
+    def test_search_endpoint(self):
+        response = self.client.get('/api/bills/search/', {'q': 'student loans', 'page_size': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual([bill['title'] for bill in response.data['results']], [str(self.loans)])
+        self.assertGreater(response.data['results'][0]['rank'], 0)
+
+        response = self.client.get('/api/bills/search/', {'q': 'student loans', 'page_size': 1, 'page': 2})
+        self.assertEqual([bill['title'] for bill in response.data['results']], [str(self.banks)])
+
+        self.assertEqual(self.client.get('/api/bills/search/').status_code, 400)
@@ -0,0 +1,72 @@
+import datetime
+
+import numpy as np
+from django.test import TestCase
+
+from billserve.api import similarity
+from billserve.api.models import *
+
+
+class SimilarityTestCase(TestCase):
+    def test_identical_sets(self):
+        first = similarity.signature([1, 2, 3], [4, 5])
+        second = similarity.signature([3, 2, 1], [5, 4])
+        self.assertEqual(similarity.similarity(first, second), 1.0)
+        self.assertEqual(similarity.bands(first), similarity.bands(second))
+
+    def test_disjoint_sets(self):
+        first = similarity.signature(range(0, 50), range(0, 50))
+        second = similarity.signature(range(50, 100), range(50, 100))
+        self.assertLess(similarity.similarity(first, second), 0.1)
+
+    def test_empty_sets(self):
+        first = similarity.signature([], [])
+        self.assertEqual(similarity.bands(first), [])
+        self.assertEqual(similarity.similarity(first, first), 0.0)
+
+    def test_round_trip(self):
+        bill_signature = similarity.signature([1, 2, 3], [4, 5])
+        np.testing.assert_array_equal(similarity.from_bytes(similarity.to_bytes(bill_signature)), bill_signature)
+
+
+class SimilarBillsTestCase(TestCase):
+    fixtures = ['states.json', 'parties.json', 'legislative_subjects.json']
+
+    def setUp(self):
+        self.senators = [Senator.objects.create(first_name='Senator', last_name=name, state=State.objects.get(pk=32),
+                                                party=Party.objects.get(pk=2)) for name in ('A', 'B', 'C')]
+        subjects = list(LegislativeSubject.objects.order_by('pk')[:3])
+        self.bill = self.create_bill('Original', subjects, self.senators)
+        self.copy = self.create_bill('Copy', subjects, self.senators)
+        self.partial = self.create_bill('Partial', subjects, self.senators[:2])
+        self.unrelated = self.create_bill('Unrelated', [], [])
+        BillSignature.objects.index_bills()
+
+    def create_bill(self, title, subjects, cosponsors):
+        bill = Bill.objects.create(bill_url='http://google.com', title=title)
+        bill.legislative_subjects.add(*subjects)
+        for cosponsor in cosponsors:
+            Cosponsorship.objects.create(legislator=cosponsor, bill=bill, is_original_cosponsor=False,
+                                         cosponsorship_date=datetime.date(2017, 5, 1))
+        return bill
+
+    def test_similar_bills(self):
+        ranking = BillSignature.objects.similar_bills(self.bill.pk)
+        self.assertEqual([bill_pk for bill_pk, _ in ranking], [self.copy.pk, self.partial.pk])
+        self.assertEqual(ranking[0][1], 1.0)
+        self.assertEqual(BillSignature.objects.similar_bills(self.unrelated.pk), [])
+
+    def test_index_bills_replaces_signature(self):
+        BillSignature.objects.index_bills([self.bill.pk])
+        self.assertEqual(BillSignature.objects.count(), 4)
+        self.assertEqual(BillSignatureBand.objects.filter(bill=self.bill).count(), 2 * similarity.BAND_COUNT)
+
+    def test_similar_endpoint(self):
+        response = self.client.get('/api/bills/{pk}/similar/'.format(pk=self.bill.pk), {'limit': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(bill['bill']['title'], bill['similarity']) for bill in response.data],
+                         [(str(self.copy), 1.0)])
+        self.assertEqual(self.client.get('/api/bills/0/similar/').status_code, 404)
+        for limit in ('many', 0, -2):
+            self.assertEqual(self.client.get('/api/bills/{pk}/similar/'.format(pk=self.bill.pk),
+                                             {'limit': limit}).status_code, 400)
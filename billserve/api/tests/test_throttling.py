@@ -0,0 +1,90 @@
+from unittest import mock
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+
+from billserve.api.throttling import MemoryBucketStore
+
+
+class MemoryBucketStoreTestCase(TestCase):
+    def test_take(self):
+        store = MemoryBucketStore()
+        self.assertEqual(store.take('a', 6, 10, 2, 0), (True, 4))
+        self.assertEqual(store.take('a', 6, 10, 2, 0), (False, 4))
+        self.assertEqual(store.take('b', 6, 10, 2, 0), (True, 4))  # Buckets are independent
+        self.assertEqual(store.take('a', 6, 10, 2, 1), (True, 0))  # Refilled by 2 tokens in a second
+        self.assertEqual(store.take('a', 1, 10, 2, 100), (True, 9))  # But never past capacity
+
+
+@override_settings(API_THROTTLE_CAPACITY=20, API_THROTTLE_RATE=1, API_KEYS=['scraper'],
+                   API_THROTTLE_COSTS={'state-detail': 5, 'legislativesubject-detail': 8,
+                                       'legislativesubject-batch': 8, 'export': 15})
+class CostThrottleTestCase(TestCase):
+    fixtures = ['states.json', 'parties.json', 'policy_areas.json', 'legislative_subjects.json']
+
+    def setUp(self):
+        self.requests = 0
+
+    def statuses(self, urls, data=None, **extra):
+        """
+        Requests every URL with a query string of its own, so none is answered from the response cache.
+        """
+        statuses = []
+        for url in urls:
+            self.requests += 1
+            statuses.append(self.client.get(url, dict(data or {}, request=self.requests), **extra).status_code)
+        return statuses
+
+    @mock.patch('time.time', return_value=1000.0)
+    def test_expensive_routes_are_throttled(self, time):
+        self.assertEqual(self.statuses(['/api/legislative-subjects/1/'] * 2 + ['/api/states/32/'] * 2),
+                         [200, 200, 429, 429])
+
+        response = self.client.get('/api/states/32/', {'request': 'retry'})
+        self.assertEqual(response['Retry-After'], '1')
+
+        time.return_value = 1001.0
+        self.assertEqual(self.statuses(['/api/states/32/']), [200])
+
+    @mock.patch('time.time', return_value=1000.0)
+    def test_cheap_routes_are_not_throttled(self, time):
+        self.statuses(['/api/states/32/'] * 5)
+        self.assertEqual(set(self.statuses(['/api/states/', '/api/parties/', '/api/bills/'] * 10)), {200})
+
+    @mock.patch('time.time', return_value=1000.0)
+    def test_clients_have_buckets_of_their_own(self, time):
+        self.statuses(['/api/states/32/'] * 5)
+        self.assertEqual(self.statuses(['/api/states/32/']), [429])
+        self.assertEqual(self.statuses(['/api/states/32/'], REMOTE_ADDR='10.0.0.2'), [200])
+        self.assertEqual(self.statuses(['/api/states/32/'] * 4, HTTP_X_API_KEY='scraper'), [200] * 4)
+        self.assertEqual(self.statuses(['/api/states/32/'], HTTP_X_API_KEY='scraper', REMOTE_ADDR='10.0.0.3'), [429])
+
+    @mock.patch('time.time', return_value=1000.0)
+    def test_rotating_headers_keep_the_bucket(self, time):
+        statuses = [self.statuses(['/api/states/32/'], HTTP_X_API_KEY='made-up-{i}'.format(i=i),
+                                  HTTP_X_FORWARDED_FOR='10.1.0.{i}'.format(i=i))[0] for i in range(5)]
+        self.assertEqual(statuses, [200, 200, 200, 200, 429])
+
+        with override_settings(REST_FRAMEWORK=dict(settings.REST_FRAMEWORK, NUM_PROXIES=1)):
+            # Behind one proxy only the address it appended counts, whichever of its instances the request came through
+            statuses = [self.statuses(['/api/states/32/'], REMOTE_ADDR='10.2.0.{i}'.format(i=i),
+                                      HTTP_X_FORWARDED_FOR='10.1.0.{i}, 10.0.0.5'.format(i=i))[0] for i in range(5)]
+            self.assertEqual(statuses, [200, 200, 200, 200, 429])
+
+    @mock.patch('time.time', return_value=1000.0)
+    def test_cached_responses_are_free(self, time):
+        self.assertEqual([self.client.get('/api/states/32/').status_code for _ in range(10)], [200] * 10)
+
+    @mock.patch('time.time', return_value=1000.0)
+    def test_batches_cost_per_id(self, time):
+        self.assertEqual(self.statuses(['/api/legislative-subjects/batch/'] * 2, {'ids': '1,2'}), [200, 429])
+        self.assertEqual(self.statuses(['/api/legislative-subjects/batch/'], {'ids': '1'}), [429])
+
+    @mock.patch('time.time', return_value=1000.0)
+    def test_exports_are_throttled(self, time):
+        self.assertEqual(self.statuses(['/api/export/bills.ndjson'] * 2), [200, 429])
+
+        response = self.client.get('/api/export/legislators.csv')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '10')
+        self.assertIn('throttled', response.json()['detail'])
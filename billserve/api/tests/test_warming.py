@@ -0,0 +1,74 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from billserve.api import tasks
+from billserve.api.chains import UpdateChain
+from billserve.api.generation import bump_generation
+from billserve.api.models import *
+from billserve.api.networking.client import GovinfoClient
+from billserve.api.warming import warm_targets
+
+
+class CacheWarmingTestCase(TestCase):
+    fixtures = ['parties.json', 'policy_areas.json', 'legislative_subjects.json']
+
+    def setUp(self):
+        self.bills = [Bill.objects.create(bill_url='http://google.com', congress=115, title='Bill {i}'.format(i=i))
+                      for i in range(3)]
+
+    def url(self, bill):
+        return '/api/bills/{pk}/'.format(pk=bill.pk)
+
+    def test_targets_are_ranked_by_requests(self):
+        first, second, third = self.bills
+        for bill, requests in ((first, 1), (second, 3), (third, 2)):
+            for _ in range(requests):
+                self.client.get(self.url(bill), HTTP_ACCEPT='application/json')
+        self.client.get('/api/parties/')
+
+        self.assertEqual(warm_targets(2), [('http://testserver/api/parties/', ''),
+                                           ('http://testserver' + self.url(second), 'application/json'),
+                                           ('http://testserver' + self.url(third), 'application/json')])
+
+    def test_warmed_responses_hit(self):
+        for bill in self.bills:
+            self.client.get(self.url(bill))
+        self.client.get('/api/legislative-subjects/1/')
+        bump_generation()
+
+        with mock.patch.object(tasks, 'group') as group, self.settings(API_CACHE_WARM_CONCURRENCY=2):
+            tasks.warm_cache()
+        group.return_value.apply_async.assert_called_once_with()
+        chunks = [signature.args[0] for signature in group.call_args[0][0]]
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2])
+
+        for chunk in chunks:
+            tasks.warm_responses(chunk)
+        for url in [self.url(bill) for bill in self.bills] + ['/api/legislative-subjects/1/']:
+            self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+
+    def test_variants_are_ranked_by_requests(self):
+        url = self.url(self.bills[0])
+        for data, accept, requests in (({}, 'text/html', 1), ({}, 'application/json', 3), ({'fields': 'title'}, '', 2)):
+            for _ in range(requests):
+                self.client.get(url, data, HTTP_ACCEPT=accept)
+
+        with self.settings(API_CACHE_WARM_VARIANTS=2):
+            self.assertEqual(warm_targets(1), [('http://testserver' + url, 'application/json'),
+                                               ('http://testserver' + url + '?fields=title', '')])
+
+    def test_unrequested_objects_are_not_warmed(self):
+        self.assertEqual(warm_targets(10), [])
+
+
+class UpdateChainTestCase(TestCase):
+    def test_rebuild_waits_for_populated_bills(self):
+        urls = ['http://google.com/1', 'http://google.com/2']
+        with mock.patch.object(tasks.update, 'delay', side_effect=tasks.update), \
+                mock.patch.object(GovinfoClient, 'create_bill_url_list_from_origin', return_value=urls), \
+                mock.patch('celery.chord') as chord:
+            UpdateChain.execute('http://google.com')
+        self.assertEqual([signature.args[0] for signature in chord.call_args[0][0]], urls)
+        callback = chord.return_value.call_args[0][0]
+        self.assertEqual([task.task for task in callback.tasks], [tasks.rebuild.name, tasks.warm_cache.name])
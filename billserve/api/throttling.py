@@ -0,0 +1,193 @@
+import hashlib
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import Throttled
+from rest_framework.throttling import BaseThrottle
+
+BUCKET_KEY_PREFIX = 'api:bucket'
+API_KEY_HEADER = 'HTTP_X_API_KEY'
+
+
+class MemoryBucketStore:
+    """
+    Keeps token buckets in this process' memory. Meant for tests and local development, where every request is served
+    by the one process.
+    """
+    def __init__(self):
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def take(self, key, cost, capacity, rate, now):
+        """
+        Refills a bucket for the time since it was last taken from, then takes cost tokens from it if it holds as many.
+        :param key: The key of the bucket
+        :param cost: The number of tokens to take
+        :param capacity: The most tokens the bucket holds, which it starts out with
+        :param rate: The number of tokens the bucket is refilled with per second
+        :param now: The current time in seconds
+        :return: A tuple of whether the tokens were taken and the number of tokens left in the bucket
+        """
+        with self.lock:
+            tokens, taken_at = self.buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + max(0, now - taken_at) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self.buckets[key] = (tokens, now)
+        return allowed, tokens
+
+    def clear(self):
+        with self.lock:
+            self.buckets.clear()
+
+
+class RedisBucketStore:
+    """
+    Keeps token buckets in the Redis of the default cache, shared by every process. Each bucket is a hash that one Lua
+    script refills and takes from atomically, and that expires once it would be full again anyway.
+    """
+    script = """
+        local capacity, rate, cost, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+        local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'taken_at')
+        local tokens = tonumber(bucket[1]) or capacity
+        local taken_at = tonumber(bucket[2]) or now
+        tokens = math.min(capacity, tokens + math.max(0, now - taken_at) * rate)
+        local allowed = 0
+        if tokens >= cost then
+            tokens = tokens - cost
+            allowed = 1
+        end
+        redis.call('HMSET', KEYS[1], 'tokens', tostring(tokens), 'taken_at', tostring(now))
+        redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+        return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self):
+        self.take_script = None
+
+    def take(self, key, cost, capacity, rate, now):
+        """
+        See MemoryBucketStore.take(). Like the cache, throttling fails open when Redis can't be reached.
+        """
+        from django_redis import get_redis_connection
+        from redis.exceptions import RedisError
+
+        try:
+            if self.take_script is None:
+                self.take_script = get_redis_connection('default').register_script(self.script)
+            allowed, tokens = self.take_script(keys=[key], args=[capacity, rate, cost, now])
+        except RedisError:
+            return True, capacity
+        return bool(allowed), float(tokens)
+
+    def clear(self):
+        from django_redis import get_redis_connection
+
+        connection = get_redis_connection('default')
+        for key in connection.scan_iter('{prefix}:*'.format(prefix=BUCKET_KEY_PREFIX)):
+            connection.delete(key)
+
+
+_store = None
+_store_path = None
+_store_lock = threading.Lock()
+
+
+def bucket_store():
+    """
+    :return: This process' instance of the bucket store named by the API_THROTTLE_STORE setting
+    """
+    global _store, _store_path
+
+    path = settings.API_THROTTLE_STORE
+    if path != _store_path:
+        with _store_lock:
+            if path != _store_path:
+                _store, _store_path = import_string(path)(), path
+    return _store
+
+
+def endpoint_cost(request, view=None):
+    """
+    :param request: A request
+    :param view: The view serving the request. Views with a get_throttle_units() method, such as batches, are charged
+    the route's cost once for every unit of the request
+    :return: The number of tokens the API_THROTTLE_COSTS setting charges for the route the request was resolved
+    through. Routes it doesn't list are free
+    """
+    if request.resolver_match is None:
+        return 0
+    cost = settings.API_THROTTLE_COSTS.get(request.resolver_match.url_name, 0)
+    if cost and hasattr(view, 'get_throttle_units'):
+        cost *= view.get_throttle_units(request)
+    return cost
+
+
+class CostThrottle(BaseThrottle):
+    """
+    A token bucket per client, keyed by their API key if it's one listed in API_KEYS, or else their address. Every
+    request to an expensive route takes the route's cost in tokens, see endpoint_cost(), and is throttled once its
+    client's bucket runs short, so clients may burst up to API_THROTTLE_CAPACITY tokens but sustain no more than
+    API_THROTTLE_RATE tokens a second. Free routes are never throttled, nor are responses served from the response
+    cache, which never reach the view.
+    """
+    def __init__(self):
+        self.tokens = None
+        self.cost = 0
+
+    def get_bucket_key(self, request):
+        """
+        :param request: The request
+        :return: The key of the bucket of the client making the request. Unknown API keys are ignored, or clients could
+        get a fresh bucket with every request by making keys up, as they could by forging X-Forwarded-For if
+        get_ident() weren't limited to the NUM_PROXIES REST framework setting
+        """
+        api_key = request.META.get(API_KEY_HEADER)
+        if api_key and api_key in settings.API_KEYS:
+            ident = 'key:' + hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+        else:
+            ident = 'ip:' + self.get_ident(request)
+        return '{prefix}:{ident}'.format(prefix=BUCKET_KEY_PREFIX, ident=ident)
+
+    def allow_request(self, request, view):
+        self.cost = endpoint_cost(request, view)
+        if not self.cost or getattr(request, 'revalidating', False):
+            return True
+
+        allowed, self.tokens = bucket_store().take(self.get_bucket_key(request), self.cost,
+                                                   settings.API_THROTTLE_CAPACITY, settings.API_THROTTLE_RATE,
+                                                   time.time())
+        return allowed
+
+    def wait(self):
+        """
+        :return: The seconds until the client's bucket holds enough tokens for the request
+        """
+        if self.tokens is None:
+            return None
+        return max(0, (self.cost - self.tokens) / settings.API_THROTTLE_RATE)
+
+
+def throttled(view):
+    """
+    Throttles a plain Django view, such as one streaming its own response, as CostThrottle throttles REST framework
+    views, and answers throttled requests the same way.
+    :param view: A view function
+    :return: The throttled view function
+    """
+    @wraps(view)
+    def throttled_view(request, *args, **kwargs):
+        throttle = CostThrottle()
+        if not throttle.allow_request(request, view):
+            exception = Throttled(throttle.wait())
+            response = JsonResponse({'detail': exception.detail}, status=exception.status_code)
+            if exception.wait:
+                response['Retry-After'] = '%d' % exception.wait
+            return response
+        return view(request, *args, **kwargs)
+    return throttled_view
@@ -1,31 +1,83 @@
+from django.conf import settings
+from django.db import transaction
 from django.urls import path, re_path
 from django.conf.urls import url, include
+from django.views.decorators.cache import cache_control
 
 from rest_framework.urlpatterns import format_suffix_patterns
 from billserve.api import views
+from billserve.api.caching import cached, conditional
+from billserve.api.routers import replica_reads
+from billserve.api.throttling import throttled
+from billserve.api.warming import counted
+
+
+def read(view, stale_while_revalidate=False):
+    """
+    Serves a read-only view from the response cache, answering conditional GETs before the cache is consulted. Its
+    reads go to a replica, outside the per-request transaction, since it never writes. Requests are counted so the
+    most requested responses can be warmed after a rebuild.
+    :param view: A view function
+    :param stale_while_revalidate: See cached()
+    :return: The wrapped view function
+    """
+    view = cached(view, stale_while_revalidate)
+    return transaction.non_atomic_requests(replica_reads(counted(conditional(view))))
+
+
+def reference(view):
+    """
+    Serves a static reference list, which clients may also keep for API_REFERENCE_MAX_AGE seconds.
+    :param view: A view function
+    :return: The wrapped view function
+    """
+    return cache_control(public=True, max_age=settings.API_REFERENCE_MAX_AGE)(read(view))
 
 
 # API endpoints
 urlpatterns = format_suffix_patterns([
-    path('', views.api_root),
+    path('', read(views.api_root)),
     path('update', views.update_view, name='update'),
     path('rebuild', views.rebuild_view, name='rebuild'),
-    re_path(r'^parties/$', views.PartyList.as_view(), name='party-list'),
-    re_path(r'^states/$', views.StateList.as_view(), name='state-list'),
-    re_path(r'^districts/$', views.DistrictList.as_view(), name='district-list'),
-    re_path(r'^legislators/$', views.LegislatorList.as_view(), name='legislator-list'),
-    re_path(r'^representatives/$', views.RepresentativeList.as_view(), name='representative-list'),
-    re_path(r'^senators/$', views.SenatorList.as_view(), name='senator-list'),
-    re_path(r'^bills/$', views.BillList.as_view(), name='bill-list'),
-    re_path(r'^legislative-subjects/$', views.LegislativeSubjectList.as_view(), name='legislativesubject-list'),
-    re_path(r'^policy-areas/$', views.PolicyAreaList.as_view(), name='policyarea-list'),
-    re_path(r'^parties/(?P<pk>[0-9]+)/$', views.PartyDetail.as_view(), name='party-detail'),
-    re_path(r'^states/(?P<pk>[0-9]+)/$', views.StateDetail.as_view(), name='state-detail'),
-    re_path(r'^districts/(?P<pk>[0-9]+)/$', views.DistrictDetail.as_view(), name='district-detail'),
-    re_path(r'^representatives/(?P<pk>[0-9]+)/$', views.RepresentativeDetail.as_view(), name='representative-detail'),
-    re_path(r'^senators/(?P<pk>[0-9]+)/$', views.SenatorDetail.as_view(), name='senator-detail'),
-    re_path(r'^bills/(?P<pk>[0-9]+)/$', views.BillDetail.as_view(), name='bill-detail'),
-    re_path(r'^legislative-subjects/(?P<pk>[0-9]+)/$', views.LegislativeSubjectDetail.as_view(),
+    path('cache-metrics', views.cache_metrics_view, name='cache-metrics'),
+    re_path(r'^lookup/$', read(views.NameLookup.as_view()), name='name-lookup'),
+    re_path(r'^autocomplete/$', read(views.Autocomplete.as_view()), name='autocomplete'),
+    re_path(r'^parties/$', reference(views.PartyList.as_view()), name='party-list'),
+    re_path(r'^states/$', reference(views.StateList.as_view()), name='state-list'),
+    re_path(r'^districts/$', reference(views.DistrictList.as_view()), name='district-list'),
+    re_path(r'^legislators/$', read(views.LegislatorList.as_view()), name='legislator-list'),
+    re_path(r'^representatives/$', read(views.RepresentativeList.as_view()), name='representative-list'),
+    re_path(r'^senators/$', read(views.SenatorList.as_view()), name='senator-list'),
+    re_path(r'^bills/$', read(views.BillList.as_view()), name='bill-list'),
+    re_path(r'^bills/search/$', read(views.BillSearch.as_view()), name='bill-search'),
+    re_path(r'^legislative-subjects/$', read(views.LegislativeSubjectList.as_view()), name='legislativesubject-list'),
+    re_path(r'^policy-areas/$', read(views.PolicyAreaList.as_view()), name='policyarea-list'),
+    re_path(r'^policy-area-splits/$', read(views.PolicyAreaPartySplitList.as_view()),
+            name='policyareapartysplit-list'),
+    re_path(r'^bills/batch/$', read(views.BillBatch.as_view()), name='bill-batch'),
+    re_path(r'^senators/batch/$', read(views.SenatorBatch.as_view()), name='senator-batch'),
+    re_path(r'^representatives/batch/$', read(views.RepresentativeBatch.as_view()), name='representative-batch'),
+    re_path(r'^legislative-subjects/batch/$', read(views.LegislativeSubjectBatch.as_view()),
+            name='legislativesubject-batch'),
+    re_path(r'^parties/(?P<pk>[0-9]+)/$', read(views.PartyDetail.as_view()), name='party-detail'),
+    re_path(r'^states/(?P<pk>[0-9]+)/$', read(views.StateDetail.as_view()), name='state-detail'),
+    re_path(r'^districts/(?P<pk>[0-9]+)/$', read(views.DistrictDetail.as_view()), name='district-detail'),
+    re_path(r'^representatives/(?P<pk>[0-9]+)/$', read(views.RepresentativeDetail.as_view()),
+            name='representative-detail'),
+    re_path(r'^senators/(?P<pk>[0-9]+)/$', read(views.SenatorDetail.as_view()), name='senator-detail'),
+    re_path(r'^legislators/(?P<pk>[0-9]+)/collaborators/$', read(views.LegislatorCollaboratorList.as_view()),
+            name='legislator-collaborators'),
+    re_path(r'^bills/(?P<pk>[0-9]+)/$', read(views.BillDetail.as_view()), name='bill-detail'),
+    re_path(r'^bills/(?P<pk>[0-9]+)/family/$', read(views.BillFamilyList.as_view()), name='bill-family'),
+    re_path(r'^bills/(?P<pk>[0-9]+)/similar/$', read(views.SimilarBillList.as_view()), name='bill-similar'),
+    re_path(r'^legislative-subjects/(?P<pk>[0-9]+)/$',
+            read(views.LegislativeSubjectDetail.as_view(), stale_while_revalidate=True),
             name='legislativesubject-detail'),
-    re_path(r'^policy-areas/(?P<pk>[0-9]+)/$', views.PolicyAreaDetail.as_view(), name='policyarea-detail')
+    re_path(r'^policy-areas/(?P<pk>[0-9]+)/$', read(views.PolicyAreaDetail.as_view()), name='policyarea-detail')
 ])
+
+# Bulk exports stream their own formats, so they take no format suffixes and bypass the response cache.
+urlpatterns += [
+    re_path(r'^export/(?P<dataset>bills|legislators|cosponsorships)\.(?P<export_format>ndjson|csv)$',
+            throttled(views.export_view), name='export'),
+]
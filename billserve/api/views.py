@@ -1,14 +1,152 @@
-from django.shortcuts import render
-from django.http import HttpResponse, Http404
+import datetime
+
+import numpy as np
+from django.db.models import OuterRef, Prefetch, Count, Q
+from django.shortcuts import render, get_object_or_404
+from django.db import transaction
+from django.http import HttpResponse, Http404, StreamingHttpResponse
 
 from rest_framework.reverse import reverse
 from rest_framework import generics
 from rest_framework.decorators import api_view
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from billserve.api import caching, export
+from billserve.api.autocomplete import AutocompleteIndex, current_index
+from billserve.api.bitmaps import BillBitmapIndex, current_bitmap_index, keyset_order
+from billserve.api.managers import count_subquery
+from billserve.api.pagination import StandardResultsSetPagination, KeysetPagination
+from billserve.api.projections import ProjectionListMixin, BillShortProjection, SenatorShortProjection, \
+    RepresentativeShortProjection, LegislatorListProjection
+from billserve.api.routers import read_alias
 from billserve.api.serializers import *
-from billserve.api.tasks import update, rebuild
+from billserve.api.tasks import update, rebuild, warm_cache
+
+
+def parse_int(name, value):
+    """
+    Parses an integer query parameter.
+    :param name: The name of the query parameter
+    :param value: The raw value of the query parameter
+    :return: The parsed integer
+    """
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError({name: 'Expected an integer, got {v}.'.format(v=value)})
+
+
+def parse_limit(name, value, max_limit):
+    """
+    Parses a query parameter limiting how many results are returned.
+    :param name: The name of the query parameter
+    :param value: The raw value of the query parameter
+    :param max_limit: The most results that may be returned, which larger limits are lowered to
+    :return: The parsed limit
+    """
+    limit = parse_int(name, value)
+    if limit < 1:
+        raise ValidationError({name: 'Expected a positive integer, got {v}.'.format(v=value)})
+    return min(limit, max_limit)
+
+
+def parse_ints(name, value):
+    """
+    Parses a query parameter holding comma separated integers.
+    :param name: The name of the query parameter
+    :param value: The raw value of the query parameter
+    :return: The list of parsed integers
+    """
+    return [parse_int(name, item) for item in value.split(',')]
+
+
+def parse_float(name, value):
+    """
+    Parses a floating point query parameter.
+    :param name: The name of the query parameter
+    :param value: The raw value of the query parameter
+    :return: The parsed float
+    """
+    try:
+        return float(value)
+    except ValueError:
+        raise ValidationError({name: 'Expected a number, got {v}.'.format(v=value)})
+
+
+class BatchRetrieveMixin:
+    """
+    Retrieves several instances of a detail view at once, such as ?ids=3,1,2, with the detail view's queryset and
+    serializer, so the joins and prefetches are shared by the whole batch. Results come back in request order, each
+    with its id and status, and a detail message instead of data when the id is malformed or not found.
+    """
+    ids_query_param = 'ids'
+    max_batch_size = 100
+
+    def get_raw_ids(self, request):
+        """
+        :param request: The request
+        :return: The ids the request lists, as given
+        """
+        return [raw_id.strip() for raw_id in request.query_params.get(self.ids_query_param, '').split(',')
+                if raw_id.strip()]
+
+    def get_throttle_units(self, request):
+        """
+        Batches are throttled as many requests as they list ids, see CostThrottle.
+        :param request: The request
+        :return: The number of ids the request lists, at most max_batch_size
+        """
+        return min(len(self.get_raw_ids(request)), self.max_batch_size)
+
+    def get(self, request, *args, **kwargs):
+        raw_ids = self.get_raw_ids(request)
+        if not raw_ids:
+            raise ValidationError({self.ids_query_param: 'Expected a comma separated list of ids.'})
+        if len(raw_ids) > self.max_batch_size:
+            raise ValidationError({self.ids_query_param: 'Expected at most {count} ids, got {given}.'.format(
+                count=self.max_batch_size, given=len(raw_ids))})
+
+        pks = [int(raw_id) if raw_id.isdigit() else None for raw_id in raw_ids]
+        instances = self.filter_queryset(self.get_queryset()).in_bulk({pk for pk in pks if pk is not None})
+        found = [pk for pk in dict.fromkeys(pks) if pk in instances]
+        data = dict(zip(found, self.get_serializer([instances[pk] for pk in found], many=True).data))
+
+        results = []
+        for raw_id, pk in zip(raw_ids, pks):
+            if pk is None:
+                results.append({'id': raw_id, 'status': 400, 'detail': 'Expected an integer id.'})
+            elif pk not in data:
+                results.append({'id': pk, 'status': 404, 'detail': 'Not found.'})
+            else:
+                results.append({'id': pk, 'status': 200, 'data': data[pk]})
+        return Response({'results': results})
+
+
+def parse_date(name, value):
+    """
+    Parses a date query parameter formatted as YYYY-MM-DD.
+    :param name: The name of the query parameter
+    :param value: The raw value of the query parameter
+    :return: The parsed date
+    """
+    try:
+        return datetime.datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValidationError({name: 'Expected a date formatted as YYYY-MM-DD, got {v}.'.format(v=value)})
+
+
+def parse_bool(name, value):
+    """
+    Parses a boolean query parameter.
+    :param name: The name of the query parameter
+    :param value: The raw value of the query parameter, true or false
+    :return: The parsed boolean
+    """
+    if value.lower() not in ('true', 'false'):
+        raise ValidationError({name: 'Expected true or false, got {v}.'.format(v=value)})
+    return value.lower() == 'true'
 
 
 @api_view(['GET'])
@@ -23,17 +161,81 @@ def api_root(request, format=None):
         'parties': reverse('party-list', request=request, format=format),
         # 'legislativeBodies': reverse('legislative-bodies-list', request=request, format=format),
         'districts': reverse('district-list', request=request, format=format),
-        # 'legislators': reverse('legislator-list', request=request, format=format),
+        'legislators': reverse('legislator-list', request=request, format=format),
         'senators': reverse('senator-list', request=request, format=format),
         'representatives': reverse('representative-list', request=request, format=format),
         'bills': reverse('bill-list', request=request, format=format),
+        'billSearch': reverse('bill-search', request=request, format=format),
+        'lookup': reverse('name-lookup', request=request, format=format),
+        'autocomplete': reverse('autocomplete', request=request, format=format),
         # 'committees': reverse('committee-list', request=request, format=format),
         'policyAreas': reverse('policyarea-list', request=request, format=format),
         'legislativeSubjects': reverse('legislativesubject-list', request=request, format=format),
+        'policyAreaPartySplits': reverse('policyareapartysplit-list', request=request, format=format),
         'states': reverse('state-list', request=request, format=format),
     })
 
 
+class NameLookup(APIView):
+    """
+    Fuzzily look up legislators, legislative subjects and policy areas by name.
+    """
+    default_limit = 10
+    max_limit = 50
+
+    def get(self, request, format=None):
+        """
+        Returns the best matches of each kind for ?q=, such as 'ocasio' or 'health care', at most ?limit= of each.
+        """
+        query_string = request.query_params.get('q', '').strip()
+        if not query_string:
+            raise ValidationError({'q': 'A lookup query is required.'})
+        limit = parse_limit('limit', request.query_params.get('limit', self.default_limit), self.max_limit)
+
+        context = {'request': request}
+        legislators = Legislator.objects.lookup(query_string)[:limit]
+        legislative_subjects = LegislativeSubject.objects.lookup(query_string)[:limit]
+        policy_areas = PolicyArea.objects.lookup(query_string)[:limit]
+        return Response({
+            'legislators': LegislatorMatchSerializer(legislators, many=True, context=context).data,
+            'legislativeSubjects': LegislativeSubjectMatchSerializer(legislative_subjects, many=True,
+                                                                     context=context).data,
+            'policyAreas': PolicyAreaMatchSerializer(policy_areas, many=True, context=context).data,
+        })
+
+
+class Autocomplete(APIView):
+    """
+    Complete names of legislators, legislative subjects, policy areas and committees from an in-memory index.
+    """
+    default_limit = 10
+    max_limit = 50
+    detail_view_names = {'senator': 'senator-detail', 'representative': 'representative-detail',
+                         'legislativesubject': 'legislativesubject-detail', 'policyarea': 'policyarea-detail'}
+
+    def get(self, request, format=None):
+        """
+        Returns the most active entries with a word starting with ?q=, such as 'schu', at most ?limit= of them,
+        optionally only of the comma separated ?kinds=, such as 'senator,representative'.
+        """
+        params = request.query_params
+        limit = parse_limit('limit', params.get('limit', self.default_limit), self.max_limit)
+        kinds = params.get('kinds', None)
+        if kinds is not None:
+            kinds = kinds.split(',')
+            if not set(kinds) <= set(AutocompleteIndex.kinds):
+                raise ValidationError({'kinds': 'Expected some of {k}.'.format(k=', '.join(AutocompleteIndex.kinds))})
+
+        completions = current_index().complete(params.get('q', ''), limit, kinds)
+        return Response([{
+            'kind': kind,
+            'name': name,
+            'activity': activity,
+            'url': reverse(self.detail_view_names[kind], args=[pk], request=request, format=format)
+            if kind in self.detail_view_names else None,
+        } for kind, pk, name, activity in completions])
+
+
 class PartyList(generics.ListAPIView):
     """
     List all parties.
@@ -46,9 +248,22 @@ class PartyDetail(generics.RetrieveAPIView):
     """
     Retrieve a party instance.
     """
-    queryset = Party.objects.all()
     serializer_class = PartySerializer
 
+    def get_queryset(self):
+        """
+        Counts the senators and representatives, and prefetches them only when they're expanded, such as
+        ?expand=senators
+        """
+        members = {'senators': Senator.objects.select_related('party', 'state'),
+                   'representatives': Representative.objects.select_related('party', 'state', 'district__state')}
+        expanded = expanded_fields(self.request)
+        return Party.objects.annotate(**{
+            name + '_count': count_subquery(queryset.model.objects.non_polymorphic().filter(party=OuterRef('pk')),
+                                            'party') for name, queryset in members.items()
+        }).prefetch_related(*(Prefetch(name, queryset=queryset)
+                              for name, queryset in members.items() if name in expanded))
+
 
 class StateList(generics.ListAPIView):
     """
@@ -62,9 +277,21 @@ class StateDetail(generics.RetrieveAPIView):
     """
     Retrieve a state instance.
     """
-    queryset = State.objects.all()
     serializer_class = StateSerializer
 
+    def get_queryset(self):
+        """
+        Counts the senators and representatives, and prefetches them only when they're expanded and their bills only
+        when those are expanded too, such as ?expand=senators.sponsored_bills,representatives
+        """
+        members = {'senators': Senator, 'representatives': Representative}
+        expanded = expanded_fields(self.request)
+        return State.objects.annotate(**{
+            name + '_count': count_subquery(model.objects.non_polymorphic().filter(state=OuterRef('pk')), 'state')
+            for name, model in members.items()
+        }).prefetch_related(*(Prefetch(name, queryset=model.objects.with_bills(expanded_fields(self.request, name)))
+                              for name, model in members.items() if name in expanded))
+
 
 class DistrictList(generics.ListAPIView):
     """
@@ -78,90 +305,374 @@ class DistrictDetail(generics.RetrieveAPIView):
     """
     Retrieve a district instance.
     """
-    queryset = District.objects.all()
+    queryset = District.objects.prefetch_related(
+        Prefetch('representative', queryset=Representative.objects.select_related('party', 'state', 'district__state')))
     serializer_class = DistrictSerializer
 
 
-class LegislatorList(generics.ListAPIView):
+class LegislatorList(ProjectionListMixin, generics.ListAPIView):
     """
     List all legislators.
     """
     queryset = Legislator.objects.all()
     serializer_class = LegislatorListSerializer
+    projection_class = LegislatorListProjection
+    pagination_class = KeysetPagination
+    keyset_ordering = ('last_name', 'id')
+
+
+class LegislatorCollaboratorList(generics.ListAPIView):
+    """
+    List the legislators who most often sponsor or cosponsor the same bills as a legislator.
+    """
+    serializer_class = LegislatorCollaborationSerializer
 
+    def get_queryset(self):
+        """
+        Optionally restricts the returned collaborators to a single congress, such as ?congress=115
+        """
+        legislator = get_object_or_404(Legislator.objects.non_polymorphic(), pk=self.kwargs['pk'])
+        queryset = LegislatorCollaboration.objects.filter(legislator=legislator).prefetch_related('collaborator')
+        congress = self.request.query_params.get('congress', None)
+        if congress is not None:
+            queryset = queryset.filter(congress=parse_int('congress', congress))
+        return queryset
 
-class RepresentativeList(generics.ListAPIView):
+
+class RepresentativeList(ProjectionListMixin, generics.ListAPIView):
     """
     List all representatives.
     """
-    queryset = Representative.objects.all()
+    queryset = Representative.objects.select_related('party', 'state', 'district__state')
     serializer_class = RepresentativeShortSerializer
+    projection_class = RepresentativeShortProjection
+    pagination_class = KeysetPagination
+    keyset_ordering = ('last_name', 'id')
 
 
 class RepresentativeDetail(generics.RetrieveAPIView):
     """
     Retrieve a representative instance.
     """
-    queryset = Representative.objects.all()
     serializer_class = RepresentativeSerializer
 
+    def get_queryset(self):
+        """
+        Prefetches the sponsored and cosponsored bills only when they're expanded, such as ?expand=sponsored_bills
+        """
+        return Representative.objects.with_bills(expanded_fields(self.request))
+
 
-class SenatorList(generics.ListAPIView):
+class RepresentativeBatch(BatchRetrieveMixin, RepresentativeDetail):
+    """
+    Retrieve several representatives by id.
+    """
+
+
+class SenatorList(ProjectionListMixin, generics.ListAPIView):
     """
     List all senators.
     """
-    queryset = Senator.objects.all()
+    queryset = Senator.objects.select_related('party', 'state')
     serializer_class = SenatorShortSerializer
+    projection_class = SenatorShortProjection
+    pagination_class = KeysetPagination
+    keyset_ordering = ('last_name', 'id')
 
 
 class SenatorDetail(generics.RetrieveAPIView):
     """
     Retrieve a senator instance.
     """
-    queryset = Senator.objects.all()
     serializer_class = SenatorSerializer
 
+    def get_queryset(self):
+        """
+        Prefetches the sponsored and cosponsored bills only when they're expanded, such as ?expand=sponsored_bills
+        """
+        return Senator.objects.with_bills(expanded_fields(self.request))
+
 
-class BillList(generics.ListAPIView):
+class SenatorBatch(BatchRetrieveMixin, SenatorDetail):
+    """
+    Retrieve several senators by id.
+    """
+
+
+class BillList(ProjectionListMixin, generics.ListAPIView):
     """
     List all bills.
     """
     serializer_class = BillShortSerializer
+    projection_class = BillShortProjection
+    pagination_class = KeysetPagination
+
+    orderings = ('bipartisanship_score', '-bipartisanship_score')
+
+    # Query parameters restricting bills to those with a field equal to any of the parameter's comma separated integers
+    integer_filters = {'congress': 'congress', 'policy_area': 'policy_area', 'originating_body': 'originating_body'}
+
+    # Query parameters only the bill bitmap index answers, since the database would need several joins for each
+    bitmap_filters = ('sponsor_party', 'sponsor_state', 'cosponsor_party', 'min_cosponsors')
 
     def get_queryset(self):
         """
-        Optionally restricts the returned bills to those whose title contains a string, such as 'CFPB'
+        Optionally restricts the returned bills, combining any of these filters:
+        ?title= to titles containing a string, such as 'CFPB'
+        ?congress=, ?type=, ?policy_area= and ?originating_body= to bills with any of those values, such as ?type=HR,S
+        ?legislative_subject=, ?sponsor= and ?cosponsor= to bills related to the legislative subjects or legislators
+        ?sponsor_party= and ?sponsor_state= to bills sponsored from any of those parties or states
+        ?cosponsor_party= and ?min_cosponsors= to bills with at least that many cosponsors from those parties, such as
+        ?cosponsor_party=2&min_cosponsors=10. Either defaults to at least one cosponsor from any party
+        ?min_introduction_date= and ?max_introduction_date= to bills introduced within the dates, such as 2017-05-01
+        ?has_cbo_estimate= to bills with or without a CBO cost estimate
+        ?min_bipartisanship= and ?max_bipartisanship= to bills whose bipartisanship score lies within the bounds
+
+        When any of the bitmap_filters is given, the bill bitmap index narrows the bills down to its matches along
+        with the date and score bounds, and the matches are ordered and paged in memory, see get_keyset_candidates().
+        The database then only reads the page of matching bills, still applying every filter but the bitmap_filters
+        to it, since bills may have changed since the index was built. Bills ingested since then are matched by the
+        database alone, as every bill is until an index has been saved.
         """
-        queryset = Bill.objects.all()
-        filter_string = self.request.query_params.get('title', None)
+        queryset = Bill.objects.select_related('policy_area')
+        params = self.request.query_params
+
+        index = cosponsor_parties = min_cosponsors = None
+        self.bitmap_index = self.bitmap_matches = self.unindexed_bills = None
+        if any(name in params for name in self.bitmap_filters):
+            if 'cosponsor_party' in params:
+                cosponsor_parties = parse_ints('cosponsor_party', params['cosponsor_party'])
+            if 'min_cosponsors' in params:
+                min_cosponsors = parse_int('min_cosponsors', params['min_cosponsors'])
+
+            index = current_bitmap_index()
+            if index is not None:
+                facets = {facet: params[facet].split(',') if facet == 'type' else parse_ints(facet, params[facet])
+                          for facet in BillBitmapIndex.facets if facet in params}
+                self.bitmap_index = index
+                self.bitmap_matches = index.match(facets, cosponsor_parties, min_cosponsors)
+
+        filter_string = params.get('title', None)
         if filter_string is not None:
             queryset = queryset.filter(title__icontains=filter_string)
+
+        for name, field in self.integer_filters.items():
+            if name in params:
+                queryset = queryset.filter(**{field + '__in': parse_ints(name, params[name])})
+
+        bill_type = params.get('type', None)
+        if bill_type is not None:
+            queryset = queryset.filter(type__in=bill_type.upper().split(','))
+
+        # Related filters are semi-joins, since a legislator may cosponsor the same bill more than once
+        related_bills = {'legislative_subject': (Bill.legislative_subjects.through, 'legislativesubject'),
+                         'sponsor': (Bill.sponsors.through, 'legislator'),
+                         'cosponsor': (Cosponsorship, 'legislator')}
+        for name, (model, field) in related_bills.items():
+            if name in params:
+                pks = model.objects.filter(**{field + '__in': parse_ints(name, params[name])}).values('bill')
+                queryset = queryset.filter(pk__in=pks)
+
+        bounds = {
+            'introduction_date': (parse_date('min_introduction_date', params['min_introduction_date'])
+                                  if 'min_introduction_date' in params else None,
+                                  parse_date('max_introduction_date', params['max_introduction_date'])
+                                  if 'max_introduction_date' in params else None),
+            'bipartisanship_score': (parse_float('min_bipartisanship', params['min_bipartisanship'])
+                                     if 'min_bipartisanship' in params else None,
+                                     parse_float('max_bipartisanship', params['max_bipartisanship'])
+                                     if 'max_bipartisanship' in params else None),
+        }
+        for field, (low, high) in bounds.items():
+            if self.bitmap_matches is not None:
+                keys = self.bitmap_index.ordering_key(field, self.bitmap_matches)
+                within = ~np.isnan(keys)  # Null keys lie within no bounds, as in SQL
+                for bound, compare in ((low, np.greater_equal), (high, np.less_equal)):
+                    if bound is not None:
+                        within &= compare(keys, bound.toordinal() if isinstance(bound, datetime.date) else bound)
+                if low is not None or high is not None:
+                    self.bitmap_matches = self.bitmap_matches[within]
+            if low is not None:
+                queryset = queryset.filter(**{field + '__gte': low})
+            if high is not None:
+                queryset = queryset.filter(**{field + '__lte': high})
+
+        has_cbo_estimate = params.get('has_cbo_estimate', None)
+        if has_cbo_estimate is not None:
+            queryset = queryset.filter(
+                cbo_cost_estimate__isnull=not parse_bool('has_cbo_estimate', has_cbo_estimate))
+
+        if index is None:
+            if any(name in params for name in self.bitmap_filters):
+                queryset = self.filter_without_index(queryset, cosponsor_parties, min_cosponsors)
+        else:
+            last_indexed = int(index.bill_pks[-1]) if len(index.bill_pks) else 0
+            self.unindexed_bills = self.filter_without_index(queryset.filter(pk__gt=last_indexed), cosponsor_parties,
+                                                             min_cosponsors)
+
+        return queryset
+
+    def filter_without_index(self, queryset, cosponsor_parties, min_cosponsors):
+        """
+        Answers the bitmap_filters with semi-joins, for bills the bill bitmap index doesn't cover.
+        :param queryset: The bills to restrict
+        :param cosponsor_parties: See BillBitmapIndex.match()
+        :param min_cosponsors: See BillBitmapIndex.match()
+        :return: The restricted bills
+        """
+        def legislators(**kwargs):
+            return Q(legislator__in=Senator.objects.filter(**kwargs).values('pk')) | \
+                Q(legislator__in=Representative.objects.filter(**kwargs).values('pk'))
+
+        params = self.request.query_params
+        for name, field in (('sponsor_party', 'party'), ('sponsor_state', 'state')):
+            if name in params:
+                sponsorships = Bill.sponsors.through.objects.filter(
+                    legislators(**{field + '__in': parse_ints(name, params[name])}))
+                queryset = queryset.filter(pk__in=sponsorships.values('bill'))
+
+        min_cosponsors = 1 if min_cosponsors is None else min_cosponsors
+        if (cosponsor_parties is not None or 'min_cosponsors' in params) and min_cosponsors > 0:
+            parties = {'party__isnull': False} if cosponsor_parties is None else {'party__in': cosponsor_parties}
+            bills = Cosponsorship.objects.filter(legislators(**parties)).values('bill') \
+                .annotate(cosponsors=Count('legislator', distinct=True)).filter(cosponsors__gte=min_cosponsors)
+            queryset = queryset.filter(pk__in=bills.values('bill'))
+
         return queryset
 
+    def get_keyset_candidates(self, key_name, descending):
+        """
+        :param key_name: The name of the ordering key
+        :param descending: Whether the ordering is descending
+        :return: The matches of the bill bitmap index and the matching bills ingested since it was built, in keyset
+        order, see KeysetPagination.paginate_candidates(), or None when the index wasn't used
+        """
+        if self.bitmap_matches is None:
+            return None
+        unindexed = list(self.unindexed_bills.values_list('pk', key_name))
+        if not unindexed:
+            return self.bitmap_index.order(self.bitmap_matches, key_name, descending)
+
+        key_field = Bill._meta.get_field(key_name)
+        pks = np.concatenate([self.bitmap_matches, np.array([pk for pk, _ in unindexed], dtype=np.int64)])
+        keys = np.concatenate([self.bitmap_index.ordering_key(key_name, self.bitmap_matches),
+                               np.array([np.nan if key is None else KeysetPagination.key_number(key_field, key)
+                                         for _, key in unindexed])])
+        return keyset_order(pks, keys, descending)
+
+    def get_keyset_ordering(self):
+        """
+        Orders bills by introduction date, or by score with ?ordering=bipartisanship_score or
+        ?ordering=-bipartisanship_score. Bills without a date or score come last.
+        :return: The (key, id) ordering to paginate bills by
+        """
+        ordering = self.request.query_params.get('ordering', None)
+        if ordering is None:
+            return 'introduction_date', 'id'
+        if ordering not in self.orderings:
+            raise ValidationError({'ordering': 'Expected one of {o}.'.format(o=', '.join(self.orderings))})
+        return ordering, '-id' if ordering.startswith('-') else 'id'
+
+
+class BillSearch(generics.ListAPIView):
+    """
+    Search bill titles and summaries.
+    """
+    serializer_class = BillSearchResultSerializer
+    pagination_class = StandardResultsSetPagination
+
+    def get_queryset(self):
+        """
+        Ranks the bills matching the full-text query ?q=, such as 'student loans', with highlighted headlines.
+        """
+        query_string = self.request.query_params.get('q', '').strip()
+        if not query_string:
+            raise ValidationError({'q': 'A search query is required.'})
+        return Bill.objects.search(query_string).select_related('policy_area')
+
+
+class BillFamilyList(ProjectionListMixin, generics.ListAPIView):
+    """
+    List every bill connected to a bill through related bills, including the bill itself.
+    """
+    serializer_class = BillShortSerializer
+    projection_class = BillShortProjection
+
+    def get_queryset(self):
+        bill = get_object_or_404(Bill.objects.only('pk', 'family_id'), pk=self.kwargs['pk'])
+        return bill.family().select_related('policy_area').order_by('pk')
+
+
+class SimilarBillList(generics.GenericAPIView):
+    """
+    List the bills with the most similar legislative subjects and cosponsors to a bill.
+    """
+    serializer_class = SimilarBillSerializer
+    default_limit = 10
+    max_limit = 100
+
+    def get(self, request, pk, format=None):
+        """
+        Ranks similar bills from the MinHash index, optionally returning at most ?limit= of them.
+        """
+        get_object_or_404(Bill.objects.only('pk'), pk=pk)
+        limit = parse_limit('limit', request.query_params.get('limit', self.default_limit), self.max_limit)
+
+        ranking = BillSignature.objects.similar_bills(int(pk), limit)
+        bills = Bill.objects.select_related('policy_area').in_bulk([bill_pk for bill_pk, _ in ranking])
+        serializer = self.get_serializer([{'bill': bills[bill_pk], 'similarity': score}
+                                          for bill_pk, score in ranking if bill_pk in bills], many=True)
+        return Response(serializer.data)
+
 
 class BillDetail(generics.RetrieveAPIView):
     """
     Retrieve a bill instance.
     """
-    queryset = Bill.objects.all()
+    queryset = Bill.objects.select_related('policy_area', 'originating_body').prefetch_related(
+        'sponsors', 'cosponsors', 'legislative_subjects', 'bill_summaries', 'committees',
+        Prefetch('related_bills', queryset=Bill.objects.select_related('policy_area')))
     serializer_class = BillSerializer
 
 
+class BillBatch(BatchRetrieveMixin, BillDetail):
+    """
+    Retrieve several bills by id.
+    """
+
+
 class LegislativeSubjectList(generics.ListAPIView):
     """
     List all legislative subjects.
     """
     queryset = LegislativeSubject.objects.all()
     serializer_class = LegislativeSubjectShortSerializer
+    pagination_class = KeysetPagination
+    keyset_ordering = ('name', 'id')
 
 
 class LegislativeSubjectDetail(generics.RetrieveAPIView):
     """
     Retrieve a legislative subject instance.
     """
-    queryset = LegislativeSubject.objects.all()
     serializer_class = LegislativeSubjectSerializer
 
+    def get_queryset(self):
+        """
+        Prefetches the subject's bills only when they're expanded, such as ?expand=bills, and otherwise counts them
+        """
+        queryset = LegislativeSubject.objects.select_related('support_split')
+        if 'bills' in expanded_fields(self.request):
+            return queryset.prefetch_related(Prefetch('bills', queryset=Bill.objects.select_related('policy_area')))
+        memberships = Bill.legislative_subjects.through.objects.filter(legislativesubject=OuterRef('pk'))
+        return queryset.annotate(bills_count=count_subquery(memberships, 'legislativesubject'))
+
+
+class LegislativeSubjectBatch(BatchRetrieveMixin, LegislativeSubjectDetail):
+    """
+    Retrieve several legislative subjects by id.
+    """
+
 
 class PolicyAreaList(generics.ListAPIView):
     """
@@ -175,9 +686,63 @@ class PolicyAreaDetail(generics.RetrieveAPIView):
     """
     Retrieve a policy area instance.
     """
-    queryset = PolicyArea.objects.all()
     serializer_class = PolicyAreaSerializer
 
+    def get_queryset(self):
+        """
+        Prefetches the policy area's bills only when they're expanded, such as ?expand=bills
+        """
+        queryset = PolicyArea.objects.all()
+        if 'bills' in expanded_fields(self.request):
+            queryset = queryset.prefetch_related(Prefetch('bills', queryset=Bill.objects.select_related('policy_area')))
+        return queryset
+
+
+class PolicyAreaPartySplitList(generics.ListAPIView):
+    """
+    List party split rollups by policy area, congress and month.
+    """
+    serializer_class = PolicyAreaPartySplitSerializer
+    month_format = '%Y-%m'
+
+    def get_queryset(self):
+        """
+        Optionally restricts the returned rollups to a policy area, a congress and a range of months such as
+        ?policy_area=1&congress=115&start_month=2017-01&end_month=2017-06
+        """
+        queryset = PolicyAreaPartySplit.objects.select_related('policy_area')
+        params = self.request.query_params
+
+        policy_area = params.get('policy_area', None)
+        if policy_area is not None:
+            queryset = queryset.filter(policy_area=parse_int('policy_area', policy_area))
+
+        congress = params.get('congress', None)
+        if congress is not None:
+            queryset = queryset.filter(congress=parse_int('congress', congress))
+
+        start_month = params.get('start_month', None)
+        if start_month is not None:
+            queryset = queryset.filter(month__gte=self.parse_month('start_month', start_month))
+
+        end_month = params.get('end_month', None)
+        if end_month is not None:
+            queryset = queryset.filter(month__lte=self.parse_month('end_month', end_month))
+
+        return queryset
+
+    def parse_month(self, name, value):
+        """
+        Parses a month query parameter formatted like 2017-05 into the first day of that month.
+        :param name: The name of the query parameter
+        :param value: The raw value of the query parameter
+        :return: The first day of the month as a date
+        """
+        try:
+            return datetime.datetime.strptime(value, self.month_format).date()
+        except ValueError:
+            raise ValidationError({name: 'Expected a month formatted as YYYY-MM, got {v}.'.format(v=value)})
+
 
 def update_view(request):
     """
@@ -191,11 +756,40 @@ def update_view(request):
     return HttpResponse(status=200, content='OK: Update queued.')
 
 
+@api_view(['GET'])
+def cache_metrics_view(request, format=None):
+    """
+    Returns the response cache's hit and miss counts.
+    :param request: A request object
+    :param format: Format expected by the request. E.G. JSON, XML, etc.
+    :return: A response containing the response cache metrics
+    """
+    return Response(caching.metrics())
+
+
+@transaction.non_atomic_requests
+def export_view(request, dataset, export_format):
+    """
+    Streams a whole dataset for bulk download, reading it in chunks from a server-side cursor so that memory stays
+    flat. The view is left out of ATOMIC_REQUESTS since the rows are read after it returns, and for the same reason
+    picks its replica up front rather than through replica_reads().
+    :param request: A request object
+    :param dataset: The dataset to export: bills, legislators or cosponsorships
+    :param export_format: The format to export in: ndjson or csv
+    :return: A streaming response of the dataset
+    """
+    content_type, lines = export.export(dataset, export_format, using=read_alias(request))
+    response = StreamingHttpResponse(lines, content_type=content_type)
+    response['Content-Disposition'] = 'attachment; filename="{dataset}.{format}"'.format(dataset=dataset,
+                                                                                         format=export_format)
+    return response
+
+
 def rebuild_view(request):
     """
     Rebuilds all legislative subject support splits based on data in the current database instance.
     :param request: A request object
     :return: An HTTP response stating that the rebuild has been queued
     """
-    rebuild.delay()
+    (rebuild.si() | warm_cache.si()).delay()
     return HttpResponse(status=200, content='OK: Rebuild queued.')
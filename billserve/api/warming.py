@@ -0,0 +1,159 @@
+import hashlib
+import heapq
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+
+from billserve.api.caching import fingerprint
+from billserve.api.export import chunked
+
+ACCESS_KEY_PREFIX = 'api:access'
+ACCESS_REQUEST_KEY_PREFIX = 'api:access-request'
+ACCESS_VARIANTS_KEY_PREFIX = 'api:access-variants'
+ACCESS_COUNT_CHUNK_SIZE = 1000  # Counters fetched from the cache at a time when ranking objects
+MAX_RECORDED_VARIANTS = 20  # Variants of one route or object whose requests are recorded for replay
+
+# Detail routes whose most requested objects are warmed, with the label of the model their pk belongs to
+HOT_ROUTES = {
+    'bill-detail': 'api.Bill',
+    'legislativesubject-detail': 'api.LegislativeSubject',
+    'policyarea-detail': 'api.PolicyArea',
+    'senator-detail': 'api.Senator',
+    'representative-detail': 'api.Representative',
+    'state-detail': 'api.State',
+}
+
+# Reference list routes, which are always warmed once requested
+REFERENCE_ROUTES = ('party-list', 'state-list', 'district-list', 'policyarea-list', 'legislativesubject-list')
+
+
+def access_key(route, pk=None, variant=None):
+    """
+    :param route: The name of a route
+    :param pk: The primary key of the object a detail route serves
+    :param variant: The digest of one variant of the route's or object's response, see variant_digest()
+    :return: The key of the route's or object's access counter, or of the variant's when one is given
+    """
+    key = '{prefix}:{route}:{pk}'.format(prefix=ACCESS_KEY_PREFIX, route=route, pk=pk)
+    return key if variant is None else '{key}:{variant}'.format(key=key, variant=variant)
+
+
+def request_key(route, pk, variant):
+    """
+    :param route: The name of a route
+    :param pk: The primary key of the object a detail route serves
+    :param variant: The digest of one variant of the route's or object's response
+    :return: The key of the (absolute URI, Accept header) of a request recorded for the variant
+    """
+    return '{prefix}:{route}:{pk}:{variant}'.format(prefix=ACCESS_REQUEST_KEY_PREFIX, route=route, pk=pk,
+                                                    variant=variant)
+
+
+def variants_key(route, pk=None):
+    """
+    :param route: The name of a route
+    :param pk: The primary key of the object a detail route serves
+    :return: The key of the list of variant digests recorded for the route or object
+    """
+    return '{prefix}:{route}:{pk}'.format(prefix=ACCESS_VARIANTS_KEY_PREFIX, route=route, pk=pk)
+
+
+def variant_digest(request):
+    """
+    :param request: A request
+    :return: A digest that is equal for requests the response cache answers with the same response, since it is taken
+    from the same fingerprint as the cache key
+    """
+    return hashlib.md5(fingerprint(request).encode('utf-8')).hexdigest()
+
+
+def increment(key):
+    """
+    Increments a counter, starting it at 1 when it doesn't exist. Counters start over once they expire.
+    :param key: The key of the counter
+    :return: Whether the counter was started
+    """
+    if cache.add(key, 1, settings.API_ACCESS_COUNT_TIMEOUT):
+        return True
+    try:
+        cache.incr(key)
+    except ValueError:  # Expired since it was added
+        pass
+    return False
+
+
+def record_access(request, route, pk=None):
+    """
+    Counts a request for a route, or for an object of a detail route, and for the variant of the response it asks for,
+    such as another query string or Accept header. The first request of each variant within API_ACCESS_COUNT_TIMEOUT
+    seconds is remembered so it can be replayed when warming the cache, for up to MAX_RECORDED_VARIANTS variants.
+    :param request: The request
+    :param route: The name of the route
+    :param pk: The primary key of the object a detail route serves
+    """
+    increment(access_key(route, pk))
+
+    variant = variant_digest(request)
+    if increment(access_key(route, pk, variant)):
+        variants = cache.get(variants_key(route, pk), [])
+        if len(variants) < MAX_RECORDED_VARIANTS:
+            replay = (request.build_absolute_uri(), request.META.get('HTTP_ACCEPT', ''))
+            cache.set(request_key(route, pk, variant), replay, settings.API_ACCESS_COUNT_TIMEOUT)
+            cache.set(variants_key(route, pk), variants + [variant], settings.API_ACCESS_COUNT_TIMEOUT)
+
+
+def counted(view):
+    """
+    Records every GET of a view with record_access(), under the name of the route it was resolved through.
+    :param view: A view function
+    :return: The counting view function
+    """
+    @wraps(view)
+    def counted_view(request, *args, **kwargs):
+        if request.method in ('GET', 'HEAD') and request.resolver_match is not None:
+            record_access(request, request.resolver_match.url_name, kwargs.get('pk'))
+        return view(request, *args, **kwargs)
+    return counted_view
+
+
+def hot_objects(route, model, limit):
+    """
+    Ranks the objects of a detail route by how often they were requested.
+    :param route: The name of the route
+    :param model: The model the route serves
+    :param limit: The number of objects to return
+    :return: The primary keys of the most requested objects, most requested first. Objects never requested are left out
+    """
+    counts = {}
+    for pks in chunked(model.objects.order_by('pk').values_list('pk', flat=True).iterator(), ACCESS_COUNT_CHUNK_SIZE):
+        keys = {access_key(route, pk): pk for pk in pks}
+        counts.update((keys[key], value) for key, value in cache.get_many(list(keys)).items())
+    return heapq.nlargest(limit, counts, key=lambda pk: (counts[pk], -pk))
+
+
+def warm_targets(limit):
+    """
+    Lists the requests to replay when warming the cache: those of every reference list, then those of the limit most
+    requested objects of each hot route. Each gets the requests of its API_CACHE_WARM_VARIANTS most requested
+    variants, most requested first.
+    :param limit: The number of objects to warm per hot route
+    :return: A list of (absolute URI, Accept header) tuples
+    """
+    from django.apps import apps
+
+    warmed = [(route, None) for route in REFERENCE_ROUTES]
+    for route, label in HOT_ROUTES.items():
+        warmed += [(route, pk) for pk in hot_objects(route, apps.get_model(label), limit)]
+
+    variants = cache.get_many([variants_key(route, pk) for route, pk in warmed])
+    keys = [(route, pk, variant) for route, pk in warmed for variant in variants.get(variants_key(route, pk), [])]
+    counts = cache.get_many([access_key(*key) for key in keys])
+
+    replayed = []
+    for route, pk in warmed:
+        ranked = sorted(variants.get(variants_key(route, pk), []),
+                        key=lambda variant: -counts.get(access_key(route, pk, variant), 0))
+        replayed += [(route, pk, variant) for variant in ranked[:settings.API_CACHE_WARM_VARIANTS]]
+    requests = cache.get_many([request_key(*key) for key in replayed])
+    return [tuple(requests[request_key(*key)]) for key in replayed if request_key(*key) in requests]
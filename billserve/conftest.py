@@ -1,7 +1,10 @@
 import pytest
 from django.conf import settings
+from django.core.cache import cache
 from django.test import RequestFactory
 
+from billserve.api.throttling import bucket_store
+
 from billserve.users.tests.factories import UserFactory
 
 
@@ -10,6 +13,26 @@ def media_storage(settings, tmpdir):
     settings.MEDIA_ROOT = tmpdir.strpath
 
 
+@pytest.fixture(autouse=True)
+def bill_bitmap_dir(settings, tmpdir):
+    settings.BILL_BITMAP_DIR = tmpdir.join('bitmaps').strpath
+
+
+@pytest.fixture(autouse=True)
+def analytics_snapshot_dir(settings, tmpdir):
+    settings.ANALYTICS_SNAPSHOT_DIR = tmpdir.join('analytics').strpath
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_buckets():
+    bucket_store().clear()
+
+
 @pytest.fixture
 def user() -> settings.AUTH_USER_MODEL:
     return UserFactory()
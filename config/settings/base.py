@@ -43,6 +43,18 @@ LOCALE_PATHS = [ROOT_DIR.path("locale")]
 # https://docs.djangoproject.com/en/dev/ref/settings/#databases
 DATABASES = {"default": env.db("DATABASE_URL")}
 DATABASES["default"]["ATOMIC_REQUESTS"] = True
+# Read replicas of the default database, which serve the reads of read-only API views (billserve.api.routers). Tests
+# run them as mirrors of the default database.
+DATABASE_REPLICAS = []
+for replica_url in env.list("DATABASE_REPLICA_URLS", default=[]):
+    alias = "replica{number}".format(number=len(DATABASE_REPLICAS) + 1)
+    DATABASES[alias] = env.db_url_config(replica_url)
+    DATABASES[alias]["TEST"] = {"MIRROR": "default"}
+    DATABASE_REPLICAS.append(alias)
+# https://docs.djangoproject.com/en/dev/ref/settings/#database-routers
+DATABASE_ROUTERS = ["billserve.api.routers.ReplicaRouter"]
+# Seconds a client reads from the primary after one of its requests writes, covering replication lag.
+DATABASE_REPLICA_PIN_SECONDS = env.int("DATABASE_REPLICA_PIN_SECONDS", default=5)
 
 # URLS
 # ------------------------------------------------------------------------------
@@ -62,6 +74,7 @@ DJANGO_APPS = [
     "django.contrib.staticfiles",
     # "django.contrib.humanize", # Handy template tags
     "django.contrib.admin",
+    "django.contrib.postgres",
 ]
 THIRD_PARTY_APPS = [
     "crispy_forms",
@@ -124,6 +137,7 @@ AUTH_PASSWORD_VALIDATORS = [
 # https://docs.djangoproject.com/en/dev/ref/settings/#middleware
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "billserve.api.routers.PrimaryPinningMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.locale.LocaleMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -285,3 +299,56 @@ SOCIALACCOUNT_ADAPTER = "billserve.users.adapters.SocialAccountAdapter"
 
 # Your stuff...
 # ------------------------------------------------------------------------------
+# Directory memory-mappable analytics snapshots (billserve.api.analytics) are written to and shared from.
+ANALYTICS_SNAPSHOT_DIR = env("ANALYTICS_SNAPSHOT_DIR", default=str(ROOT_DIR("analytics")))
+# Directory memory-mappable bill bitmap indexes (billserve.api.bitmaps) are written to and shared from.
+BILL_BITMAP_DIR = env("BILL_BITMAP_DIR", default=str(ROOT_DIR("bitmaps")))
+# Seconds between rebuilds of a process' autocomplete index (billserve.api.autocomplete) while ingest keeps bumping the
+# data generation.
+AUTOCOMPLETE_REBUILD_INTERVAL = env.int("AUTOCOMPLETE_REBUILD_INTERVAL", default=60)
+# Seconds a rendered GET response is kept in the cache (billserve.api.caching). Entries are also invalidated whenever
+# ingest or a rebuild bumps the data generation.
+API_RESPONSE_CACHE_TIMEOUT = env.int("API_RESPONSE_CACHE_TIMEOUT", default=60 * 60 * 24)
+# Seconds past API_RESPONSE_CACHE_TIMEOUT, or past a generation bump, that expensive views may answer with their stale
+# cached response while it's recomputed in the background.
+API_RESPONSE_STALE_TIMEOUT = env.int("API_RESPONSE_STALE_TIMEOUT", default=60 * 60 * 24)
+# Seconds a request may hold the lock on computing a response, which is also how long others wait for it.
+API_RESPONSE_LOCK_TIMEOUT = env.int("API_RESPONSE_LOCK_TIMEOUT", default=30)
+# Seconds a serialized fragment of one object (billserve.api.fragments) is kept in the cache. Fragments are also
+# invalidated whenever their object changes or a rebuild runs.
+API_FRAGMENT_CACHE_TIMEOUT = env.int("API_FRAGMENT_CACHE_TIMEOUT", default=60 * 60)
+# Seconds requests are counted for before their counters start over (billserve.api.warming).
+API_ACCESS_COUNT_TIMEOUT = env.int("API_ACCESS_COUNT_TIMEOUT", default=60 * 60 * 24 * 7)
+# The number of most requested objects per detail route whose responses are warmed after a rebuild.
+API_CACHE_WARM_LIMIT = env.int("API_CACHE_WARM_LIMIT", default=200)
+# The number of most requested variants of each warmed response, such as other query strings or Accept headers.
+API_CACHE_WARM_VARIANTS = env.int("API_CACHE_WARM_VARIANTS", default=3)
+# The most tasks warming the cache at once, so warming leaves workers free for ingestion.
+API_CACHE_WARM_CONCURRENCY = env.int("API_CACHE_WARM_CONCURRENCY", default=2)
+# Seconds clients and shared caches may reuse static reference lists (parties, states, districts) without revalidating.
+API_REFERENCE_MAX_AGE = env.int("API_REFERENCE_MAX_AGE", default=60 * 60 * 24 * 7)
+# The store of the token buckets expensive routes are throttled with (billserve.api.throttling).
+API_THROTTLE_STORE = env("API_THROTTLE_STORE", default="billserve.api.throttling.MemoryBucketStore")
+# The most tokens a client may spend at once, and how many tokens a second their bucket is refilled with.
+API_THROTTLE_CAPACITY = env.float("API_THROTTLE_CAPACITY", default=240)
+API_THROTTLE_RATE = env.float("API_THROTTLE_RATE", default=4)
+# API keys issued to clients, who are then throttled by key rather than by address.
+API_KEYS = env.list("API_KEYS", default=[])
+# The tokens a request to each expensive route costs, in proportion to the queries serving it takes at its most
+# expanded (see billserve/api/tests/test_query_counts.py). Batch routes cost as much per id they list, and exports
+# a quarter of a full bucket. Routes left out are free and never throttled.
+API_THROTTLE_COSTS = {
+    "state-detail": 7,
+    "legislativesubject-detail": 12,
+    "legislativesubject-batch": 12,
+    "export": 60,
+}
+# https://www.django-rest-framework.org/api-guide/settings/
+REST_FRAMEWORK = {
+    # Leaves the transactions of non-atomic read views alone when they answer with an error
+    "EXCEPTION_HANDLER": "billserve.api.routers.exception_handler",
+    "DEFAULT_THROTTLE_CLASSES": ["billserve.api.throttling.CostThrottle"],
+    # The proxies in front of the app, whose X-Forwarded-For entries throttling trusts. Anything further left in the
+    # header was sent by the client. Zero trusts none and throttles by REMOTE_ADDR
+    "NUM_PROXIES": env.int("DJANGO_NUM_PROXIES", default=0),
+}
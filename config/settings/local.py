@@ -13,6 +13,14 @@ SECRET_KEY = env(
 # https://docs.djangoproject.com/en/dev/ref/settings/#allowed-hosts
 ALLOWED_HOSTS = ["localhost", "0.0.0.0", "127.0.0.1"]
 
+# DATABASES
+# ------------------------------------------------------------------------------
+# Without configured replicas, a second connection to the default database stands in for one, so the replica routing
+# of read-only views is exercised locally.
+if not DATABASE_REPLICAS:  # noqa F405
+    DATABASES["replica"] = dict(DATABASES["default"], ATOMIC_REQUESTS=False, TEST={"MIRROR": "default"})  # noqa F405
+    DATABASE_REPLICAS = ["replica"]
+
 # CACHES
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#caches
@@ -13,6 +13,8 @@ ALLOWED_HOSTS = env.list("DJANGO_ALLOWED_HOSTS", default=["billserve.herokuapp.c
 DATABASES["default"] = env.db("DATABASE_URL")  # noqa F405
 DATABASES["default"]["ATOMIC_REQUESTS"] = True  # noqa F405
 DATABASES["default"]["CONN_MAX_AGE"] = env.int("CONN_MAX_AGE", default=60)  # noqa F405
+for alias in DATABASE_REPLICAS:  # noqa F405
+    DATABASES[alias]["CONN_MAX_AGE"] = env.int("CONN_MAX_AGE", default=60)  # noqa F405
 
 # CACHES
 # ------------------------------------------------------------------------------
@@ -28,6 +30,10 @@ CACHES = {
         },
     }
 }
+# Token buckets (billserve.api.throttling) live in the cache's Redis, shared by every worker
+API_THROTTLE_STORE = env("API_THROTTLE_STORE", default="billserve.api.throttling.RedisBucketStore")
+# The Heroku router appends the address it was connected from to X-Forwarded-For
+REST_FRAMEWORK["NUM_PROXIES"] = env.int("DJANGO_NUM_PROXIES", default=1)  # noqa F405
 
 # SECURITY
 # ------------------------------------------------------------------------------
@@ -51,3 +51,9 @@ EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
 
 # Your stuff...
 # ------------------------------------------------------------------------------
+
+# DATABASES
+# ------------------------------------------------------------------------------
+# A mirror of the default database that tests of replica routing can stand in for a read replica, by declaring it in
+# their databases and DATABASE_REPLICAS.
+DATABASES["replica"] = dict(DATABASES["default"], ATOMIC_REQUESTS=False, TEST={"MIRROR": "default"})  # noqa F405